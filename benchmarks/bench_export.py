@@ -0,0 +1,187 @@
+# benchmarks/bench_export.py
+"""
+Đo thời gian các bước export trên CSDL thay thế (xem benchmarks/seed.py) ở nhiều quy mô kết quả.
+
+Ví dụ:
+    python -m benchmarks.seed --storefronts 20 --keywords 5000 --months 10 --samples-per-month 1
+    python -m benchmarks.bench_export --sizes 10000,50000,1000000 --json bench.json
+    python -m benchmarks.bench_export --baseline bench.json --tolerance 0.2   # exit 1 nếu chậm hơn 20%
+
+Các bước được đo:
+    get_count       DataManager.get_count
+    get_data        DataManager.get_data (truy vấn + dựng DataFrame + compact_frame)
+    iter_data       DataManager.iter_data (server-side cursor theo chunk)
+    frame           dựng DataFrame từ các dòng thô + compact_frame (phần Python của get_data)
+    to_csv          convert_df_to_csv
+    spool_<format>  export_to_spool với từng định dạng trong --formats
+
+Cache kết quả mặc định bị tắt để mỗi lần đo đều chạy truy vấn thật (--cache để bật lại).
+"""
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+import time
+from sqlalchemy import text
+from benchmarks.standin import DEFAULT_URL, install
+from benchmarks.seed import WORKSPACE_ID, EID_OFFSET
+
+DEFAULT_SIZES = "10000,50000,1000000"
+
+
+def _scale(engine) -> dict:
+    """Đọc quy mô dữ liệu đã seed từ chính CSDL."""
+    with engine.connect() as connection:
+        def scalar(sql):
+            return connection.execute(text(sql)).scalar() or 0
+        storefronts = scalar("SELECT COUNT(*) FROM onsite_storefront")
+        first, last = connection.execute(text("SELECT MIN(created_datetime), MAX(created_datetime) FROM kw_discovery_storefront_keyword_perf")).one()
+        return {
+            "storefronts": storefronts,
+            "keywords": scalar("SELECT COUNT(*) FROM onsite_keyword"),
+            "products": scalar("SELECT COUNT(*) FROM onsite_product") // max(storefronts, 1),
+            "product_keywords": scalar("SELECT COUNT(DISTINCT keyword_id) FROM metric_share_of_search_product"),
+            "first_day": str(first)[:10],
+            "last_day": str(last)[:10],
+        }
+
+
+def plan_params(data_source: str, scale: dict, size: int) -> dict:
+    """Chọn số storefront và số tháng để kết quả có khoảng `size` dòng (bị chặn bởi quy mô đã seed)."""
+    from utils.dates import split_date_range
+    months = split_date_range(scale["first_day"], scale["last_day"])
+    if data_source == 'pt':
+        # Product tracking không phụ thuộc khoảng ngày: số dòng = storefront x product x keyword
+        per_storefront = max(scale["products"] * scale["product_keywords"], 1)
+        storefronts, month_count = min(scale["storefronts"], math.ceil(size / per_storefront)), len(months)
+    else:
+        units = math.ceil(size / max(scale["keywords"], 1))
+        storefronts = min(scale["storefronts"], units)
+        month_count = min(len(months), math.ceil(units / max(storefronts, 1)))
+    params = {
+        "workspace_id": WORKSPACE_ID,
+        "storefront_ids": [EID_OFFSET + i for i in range(1, max(storefronts, 1) + 1)],
+        "start_date": months[0][0],
+        "end_date": months[month_count - 1][1],
+        "data_source": data_source,
+    }
+    if data_source == 'kw_pfm':
+        params.update(device_type=None, display_type=None, product_position=None)
+    return params
+
+
+def _time(func, repeat: int):
+    """Chạy `func` `repeat` lần; trả về (danh sách thời gian, kết quả lần cuối)."""
+    timings, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return timings, result
+
+
+def run(data_sources, sizes, repeat: int, formats, log=print) -> list:
+    import pandas as pd
+    from utils.database import DatabaseManager
+    from utils.export import convert_df_to_csv, export_to_spool, discard_spool
+    from utils.frames import compact_frame
+    from utils.managers import DataManager
+
+    scale = _scale(DatabaseManager().engine)
+    log(f"seeded scale: {scale}")
+    results = []
+    for data_source in data_sources:
+        data_manager = DataManager(data_source)
+        for size in sizes:
+            params = plan_params(data_source, scale, size)
+            timings = {}
+            timings["get_count"], num_rows = _time(lambda: data_manager.get_count(params), repeat)
+            timings["get_data"], df = _time(lambda: data_manager.get_data(params), repeat)
+            timings["iter_data"], _ = _time(lambda: sum(len(chunk) for chunk in data_manager.iter_data(params)), repeat)
+            records = list(df.itertuples(index=False, name=None))
+            columns = list(df.columns)
+            timings["frame"], _ = _time(lambda: compact_frame(pd.DataFrame.from_records(records, columns=columns), data_manager.schema), repeat)
+            timings["to_csv"], csv_bytes = _time(lambda: convert_df_to_csv(df), repeat)
+            for export_format in formats:
+                def spool():
+                    info = export_to_spool(DataManager._slice(df, 10000), f"bench_{data_source}", export_format, data_manager.schema)
+                    discard_spool(info)
+                    return info
+                timings[f"spool_{export_format}"], _ = _time(spool, repeat)
+
+            for step, values in timings.items():
+                row = {
+                    "data_source": data_source, "size": size, "rows": len(df), "step": step,
+                    "p50_s": round(statistics.median(values), 4), "best_s": round(min(values), 4),
+                    "rows_per_s": round(len(df) / statistics.median(values)) if statistics.median(values) else None,
+                }
+                results.append(row)
+            log(f"{data_source} target={size:,} rows={len(df):,} (count={int(num_rows):,}, csv={len(csv_bytes) / 1024 ** 2:.1f} MB, "
+                f"{len(params['storefront_ids'])} storefronts, {params['start_date']}..{params['end_date']})")
+            if len(df) < size:
+                log(f"  note: seeded data only yields {len(df):,} rows; seed a larger scale to reach {size:,}")
+    return results
+
+
+def print_table(results):
+    header = f"{'source':<8}{'size':>10}{'rows':>10}  {'step':<16}{'p50 (s)':>10}{'best (s)':>10}{'rows/s':>12}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['data_source']:<8}{r['size']:>10,}{r['rows']:>10,}  {r['step']:<16}{r['p50_s']:>10.4f}{r['best_s']:>10.4f}{(r['rows_per_s'] or 0):>12,}")
+
+
+def compare(results, baseline_path: str, tolerance: float) -> list:
+    """Các bước chậm hơn baseline quá `tolerance` (tỉ lệ), so theo p50."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r["data_source"], r["size"], r["step"]): r for r in json.load(f)["results"]}
+    regressions = []
+    for r in results:
+        before = baseline.get((r["data_source"], r["size"], r["step"]))
+        if before and before["p50_s"] > 0 and r["p50_s"] > before["p50_s"] * (1 + tolerance):
+            regressions.append({**r, "baseline_p50_s": before["p50_s"], "slowdown": round(r["p50_s"] / before["p50_s"], 2)})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark export steps against a seeded stand-in database.")
+    parser.add_argument("--url", default=DEFAULT_URL, help=f"SQLAlchemy URL of the seeded stand-in database (default: {DEFAULT_URL}).")
+    parser.add_argument("--sources", default="kwl,kw_pfm,pt", help="Data sources to benchmark (default: kwl,kw_pfm,pt).")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"Target result sizes in rows (default: {DEFAULT_SIZES}).")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per step; p50 and best are reported (default: 3).")
+    parser.add_argument("--formats", default="csv,parquet", help="Spool formats to benchmark (default: csv,parquet).")
+    parser.add_argument("--cache", action="store_true", help="Keep the result/partition caches enabled.")
+    parser.add_argument("--json", help="Write results to this JSON file (usable as a later --baseline).")
+    parser.add_argument("--baseline", help="Compare with a previous --json output and exit 1 on regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p50 slowdown vs. baseline (default: 0.2 = 20%%).")
+    args = parser.parse_args(argv)
+
+    if not args.cache:
+        # Phải đặt trước khi utils.config được import
+        os.environ["RESULT_CACHE_ENABLED"] = "0"
+        os.environ["PARTITION_CACHE_ENABLED"] = "0"
+    install(args.url)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    data_sources = [s.strip() for s in args.sources.split(",") if s.strip()]
+    formats = [f.strip() for f in args.formats.split(",") if f.strip()]
+    results = run(data_sources, sizes, args.repeat, formats)
+    print()
+    print_table(results)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"url": args.url, "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, f, indent=2)
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['data_source']} size={r['size']:,} {r['step']}: {r['baseline_p50_s']}s -> {r['p50_s']}s (x{r['slowdown']})")
+        if regressions:
+            sys.exit(1)
+        print(f"No step slower than baseline by more than {args.tolerance:.0%}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+# benchmarks/load_test.py
+"""
+Giả lập N phiên người dùng đồng thời đi qua toàn bộ các stage của ExportProcessManager
+(Get Data -> preview -> Export Full -> download_ready) trên trang Streamlit thật, bằng streamlit.testing.
+
+Ví dụ:
+    python -m benchmarks.seed
+    python -m benchmarks.load_test --sessions 8 --iterations 3
+    python -m benchmarks.load_test --source kw_pfm --sessions 16 --storefronts-per-export 5 --json load.json
+
+Báo cáo: thông lượng (export hoàn tất / phút), p50/p95 thời gian đến khi có preview và đến khi tải được,
+mức sử dụng connection pool (trung bình, đỉnh, tỉ lệ thời gian pool bị dùng hết) và thời gian chờ checkout.
+"""
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from datetime import date
+from pathlib import Path
+from benchmarks.standin import DEFAULT_URL, install
+from benchmarks.seed import WORKSPACE_ID, EID_OFFSET
+
+_PAGES_DIR = Path(__file__).resolve().parent.parent / "pages"
+PAGES = {'kwl': "1_Keyword_Lab.py", 'kw_pfm': "2_Digital_Shelf_Analytics.py", 'pt': "2_Digital_Shelf_Analytics.py"}
+_DONE_STAGES = ('loaded', 'download_ready', 'initial')
+# AppTest dùng chung một Streamlit Runtime toàn cục nên việc tạo AppTest và mỗi lần chạy script phải tuần tự.
+# Việc nặng (truy vấn, ghi file) vẫn chạy song song trong các job nền của JobManager như trên server thật.
+_SCRIPT_LOCK = threading.Lock()
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+class PoolSampler:
+    """Lấy mẫu số kết nối đang được dùng của connection pool trong suốt bài test."""
+    def __init__(self, db_manager, interval: float = 0.02):
+        self.db_manager = db_manager
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="pool-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.samples.append(self.db_manager.engine.pool.checkedout())
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self._start_stats = self.db_manager.pool_stats()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def summary(self) -> dict:
+        capacity = self.db_manager.max_connections
+        end = self.db_manager.pool_stats()
+        waits = end["wait_count"] - self._start_stats["wait_count"]
+        return {
+            "max_connections": capacity,
+            "checked_out_mean": round(sum(self.samples) / len(self.samples), 2) if self.samples else 0,
+            "checked_out_peak": max(self.samples, default=0),
+            "saturated_ratio": round(sum(1 for s in self.samples if s >= capacity) / len(self.samples), 3) if self.samples else 0,
+            "checkouts": waits,
+            "checkout_wait_mean_ms": round((end["wait_sum_ms"] - self._start_stats["wait_sum_ms"]) / waits, 2) if waits else 0,
+            "connects": end["connects"] - self._start_stats["connects"],
+        }
+
+
+def _run(at):
+    with _SCRIPT_LOCK:
+        at.run()
+    if at.exception:
+        raise RuntimeError(f"page raised: {at.exception[0].value}")
+
+
+def _wait_for(at, stages, deadline: float):
+    while at.session_state.stage not in stages:
+        if time.perf_counter() > deadline:
+            raise TimeoutError(f"stuck in stage '{at.session_state.stage}'")
+        _run(at)
+
+
+def _has(at, widget: str, key: str) -> bool:
+    try:
+        getattr(at, widget)(key=key)
+        return True
+    except KeyError:
+        return False
+
+
+def _act(at, action, done, what: str):
+    """Thao tác trên trang, chạy lại script và kiểm tra thao tác đã có tác dụng."""
+    action()
+    _run(at)
+    if not done():
+        raise RuntimeError(f"{what} had no effect (stage '{at.session_state.stage}')")
+
+
+def _page_driver(page_path: str, session_id: str):
+    """Chạy trang với session id riêng (AppTest dùng chung một id cho mọi phiên, khiến các phiên dọn dữ liệu của nhau)."""
+    import runpy
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    get_script_run_ctx().session_id = session_id
+    runpy.run_path(page_path, run_name="__main__")
+
+
+def run_session(session_id: str, data_source: str, storefront_ids: list, start: date, end: date, timeout: float) -> dict:
+    """Một lần export đầy đủ như người dùng thao tác trên trang; trả về thời gian từng giai đoạn."""
+    from streamlit.testing.v1 import AppTest
+    with _SCRIPT_LOCK:
+        at = AppTest.from_function(_page_driver, args=(str(_PAGES_DIR / PAGES[data_source]), session_id), default_timeout=timeout)
+    _run(at)
+
+    def fill_form():
+        at.text_input(key=f"ws_id_{data_source}").input(str(WORKSPACE_ID))
+        at.text_input(key=f"sf_id_{data_source}").input(",".join(str(s) for s in storefront_ids))
+        at.selectbox(key=f"date_preset_{data_source}").select("Custom time range")
+    _act(at, fill_form, lambda: _has(at, "date_input", f"start_date_{data_source}"), "custom date range")
+
+    def get_data():
+        at.date_input(key=f"start_date_{data_source}").set_value(start)
+        at.date_input(key=f"end_date_{data_source}").set_value(end)
+        at.button(key=f"get_data_{data_source}").click()
+    started = time.perf_counter()
+    deadline = started + timeout
+    _act(at, get_data, lambda: at.session_state.stage != 'initial' or at.session_state.get('user_message'), "Get Data")
+    _wait_for(at, _DONE_STAGES, deadline)
+    if at.session_state.stage != 'loaded':
+        messages = [e.value for e in at.error] + [str(at.session_state.get('user_message'))]
+        raise RuntimeError(f"no preview (stage '{at.session_state.stage}'): {messages}")
+    preview_s = time.perf_counter() - started
+
+    def export_full():
+        next(b for b in at.button if "Export Full" in b.label).click()
+    _act(at, export_full, lambda: at.session_state.stage != 'loaded', "Export Full Data")
+    _wait_for(at, ('download_ready', 'initial'), deadline)
+    if at.session_state.stage != 'download_ready':
+        raise RuntimeError(f"export did not finish: {at.session_state.get('user_message')}")
+    info = at.session_state.download_info
+    return {"preview_s": preview_s, "download_s": time.perf_counter() - started, "rows": info.get("rows")}
+
+
+def run_load(data_source: str, sessions: int, iterations: int, storefronts: int, per_export: int,
+             start: date, end: date, timeout: float, log=print) -> dict:
+    from utils.database import DatabaseManager
+    results, errors = [], []
+    lock = threading.Lock()
+
+    def user(index: int):
+        for i in range(iterations):
+            # Mỗi phiên xoay vòng một nhóm storefront khác nhau để truy vấn không hoàn toàn giống nhau
+            first = (index * iterations + i) % storefronts
+            ids = [EID_OFFSET + 1 + (first + k) % storefronts for k in range(min(per_export, storefronts))]
+            try:
+                result = run_session(f"load-session-{index}", data_source, ids, start, end, timeout)
+                with lock:
+                    results.append(result)
+            except Exception as e:
+                with lock:
+                    errors.append(f"{type(e).__name__}: {e}")
+                log(f"session {index} iteration {i}: {type(e).__name__}: {e}")
+
+    db_manager = DatabaseManager()
+    db_manager.warm_up()
+    threads = [threading.Thread(target=user, args=(i,), name=f"load-session-{i}") for i in range(sessions)]
+    with PoolSampler(db_manager) as sampler:
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+
+    preview = [r["preview_s"] for r in results]
+    download = [r["download_s"] for r in results]
+    return {
+        "data_source": data_source,
+        "sessions": sessions,
+        "exports": len(results),
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "wall_s": round(wall, 2),
+        "throughput_per_min": round(len(results) / wall * 60, 2) if wall else 0,
+        "rows_per_s": round(sum(r["rows"] or 0 for r in results) / wall) if wall else 0,
+        "preview_p50_s": round(_percentile(preview, 0.5) or 0, 3),
+        "preview_p95_s": round(_percentile(preview, 0.95) or 0, 3),
+        "download_p50_s": round(_percentile(download, 0.5) or 0, 3),
+        "download_p95_s": round(_percentile(download, 0.95) or 0, 3),
+        "pool": sampler.summary(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate concurrent export sessions against a seeded stand-in database.")
+    parser.add_argument("--url", default=DEFAULT_URL, help=f"SQLAlchemy URL of the seeded stand-in database (default: {DEFAULT_URL}).")
+    parser.add_argument("--source", default="kwl", choices=sorted(PAGES), help="Data source (page) to drive (default: kwl).")
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent user sessions (default: 8).")
+    parser.add_argument("--iterations", type=int, default=2, help="Exports per session (default: 2).")
+    parser.add_argument("--storefronts-per-export", type=int, default=3)
+    parser.add_argument("--months", type=int, default=1, help="Months of data per export, ending with the last seeded month (default: 1).")
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds allowed per export (default: 300).")
+    parser.add_argument("--cache", action="store_true", help="Keep the result/partition caches enabled.")
+    parser.add_argument("--json", help="Write the report to this JSON file.")
+    args = parser.parse_args(argv)
+
+    # Chu kỳ tự cập nhật của vùng kết quả khi có job chạy nền (AppTest không tự chạy fragment theo chu kỳ)
+    os.environ.setdefault("JOB_POLL_INTERVAL", "0.02")
+    # Các phiên giả lập không được ghi vào nhật ký sử dụng dùng để prewarm cache
+    os.environ.setdefault("USAGE_LOG_PATH", "")
+    if not args.cache:
+        # Phải đặt trước khi utils.config được import
+        os.environ["RESULT_CACHE_ENABLED"] = "0"
+        os.environ["PARTITION_CACHE_ENABLED"] = "0"
+    install(args.url)
+
+    from sqlalchemy import text
+    from utils.database import DatabaseManager
+    from utils.dates import split_date_range
+    with DatabaseManager().engine.connect() as connection:
+        storefronts = connection.execute(text("SELECT COUNT(*) FROM onsite_storefront")).scalar()
+        first, last = connection.execute(text("SELECT MIN(created_datetime), MAX(created_datetime) FROM kw_discovery_storefront_keyword_perf")).one()
+    months = split_date_range(str(first)[:10], str(last)[:10])[-max(1, args.months):]
+    start, end = date.fromisoformat(months[0][0]), date.fromisoformat(months[-1][1])
+
+    print(f"{args.sessions} sessions x {args.iterations} exports of '{args.source}' ({args.storefronts_per_export} storefronts, {start}..{end})")
+    report = run_load(args.source, args.sessions, args.iterations, storefronts, args.storefronts_per_export, start, end, args.timeout)
+    pool = report["pool"]
+    print(f"exports: {report['exports']} ok, {report['errors']} failed in {report['wall_s']}s "
+          f"-> {report['throughput_per_min']} exports/min, {report['rows_per_s']:,} rows/s")
+    print(f"time to preview:  p50 {report['preview_p50_s']}s, p95 {report['preview_p95_s']}s")
+    print(f"time to download: p50 {report['download_p50_s']}s, p95 {report['download_p95_s']}s")
+    print(f"pool: mean {pool['checked_out_mean']} / peak {pool['checked_out_peak']} of {pool['max_connections']} connections, "
+          f"saturated {pool['saturated_ratio']:.1%} of the time, mean checkout wait {pool['checkout_wait_mean_ms']} ms over {pool['checkouts']} checkouts")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# benchmarks/plans.py
+"""
+Snapshot EXPLAIN plan của mọi câu lệnh (data_source, query_type) trong data_logic/registry.py với các bộ tham số đại diện,
+và báo hồi quy khi plan thay đổi theo hướng xấu (quét toàn bảng mới, broadcast join mới, chi phí ước lượng tăng mạnh).
+
+Ví dụ:
+    python -m benchmarks.seed --storefronts 20 --keywords 5000 --months 10 --samples-per-month 1
+    python -m benchmarks.plans --snapshot plans.json --update        # ghi snapshot (sau khi đã kiểm tra plan)
+    python -m benchmarks.plans --snapshot plans.json                 # exit 1 nếu có hồi quy so với snapshot
+    python -m benchmarks.plans --url mysql+pymysql://root@127.0.0.1/bench --show kw_pfm.data.large
+
+Bộ tham số đại diện cho mỗi nguồn:
+    small     1 storefront, 1 tháng
+    large     toàn bộ storefront và khoảng ngày đã seed
+    columns   như large nhưng chỉ chọn vài cột (câu lệnh đã bỏ các block không cần)
+    filtered  như large với mọi bộ lọc tùy chọn được chọn (kw_pfm)
+
+SQLite không có ước lượng chi phí nên chỉ so sánh các thao tác tốn kém; dùng CSDL tương thích MySQL để có chi phí.
+"""
+import argparse
+import json
+import sys
+import time
+from benchmarks.standin import DEFAULT_URL, install
+from benchmarks.bench_export import _scale, plan_params
+
+# Giá trị đại diện cho các bộ lọc tùy chọn (marker filter:<tham số> trong file SQL)
+FILTER_VALUES = {"device_type": "Mobile", "display_type": "Paid", "product_position": 1}
+
+
+def cases(data_manager, scale: dict) -> dict:
+    """Tên bộ tham số -> params cho một nguồn dữ liệu."""
+    source = data_manager.data_source
+    large = plan_params(source, scale, 10 ** 12)
+    result = {"small": plan_params(source, scale, 1), "large": large}
+    columns = data_manager.available_columns(source)
+    if columns:
+        result["columns"] = {**large, "columns": columns[:3]}
+    filters = {name: value for name, value in FILTER_VALUES.items() if name in large}
+    if filters:
+        result["filtered"] = {**large, **filters}
+    return result
+
+
+def capture(data_sources, log=print) -> dict:
+    from data_logic.registry import statements
+    from utils.database import DatabaseManager
+    from utils.managers import DataManager
+    from utils.plans import explain
+
+    db_manager = DatabaseManager()
+    scale = _scale(db_manager.engine)
+    plans = {}
+    for data_source in data_sources:
+        data_manager = DataManager(data_source)
+        for query_type, sql in data_manager.MODULE_MAP[data_source].query_params.items():
+            if not sql or not sql.strip():
+                continue
+            for case, params in cases(data_manager, scale).items():
+                if case == "columns" and query_type != 'data':
+                    continue
+                query_str, bound = statements.compile(data_source, query_type, params, data_manager._columns(query_type, params.get('columns')))
+                with db_manager.get_session() as db:
+                    plans[f"{data_source}.{query_type}.{case}"] = explain(db.connection(), query_str, bound)
+        log(f"{data_source}: captured plans")
+    return plans
+
+
+def check(plans: dict, snapshot: dict, tolerance: float):
+    """(hồi quy, thay đổi không phải hồi quy) so với snapshot."""
+    from utils.plans import compare
+    regressions, changes = [], []
+    for key, plan in plans.items():
+        before = snapshot.get(key)
+        if before is None:
+            changes.append(f"{key}: not in snapshot")
+            continue
+        found = compare(before, plan, tolerance)
+        regressions.extend(f"{key}: {message}" for message in found)
+        if not found and plan['plan'] != before['plan']:
+            sql_note = "SQL changed" if plan['sql_digest'] != before['sql_digest'] else "same SQL"
+            changes.append(f"{key}: plan changed ({sql_note}), no new full scan/broadcast")
+    changes.extend(f"{key}: no longer captured" for key in snapshot if key not in plans)
+    return regressions, changes
+
+
+def print_table(plans: dict):
+    header = f"{'statement':<28}{'cost':>14}  findings"
+    print(header)
+    print("-" * len(header))
+    for key, plan in plans.items():
+        cost = f"{plan['cost']:,.0f}" if plan['cost'] is not None else "-"
+        print(f"{key:<28}{cost:>14}  {', '.join(plan['findings']) or '-'}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Capture EXPLAIN plans of every registered query and detect plan regressions.")
+    parser.add_argument("--url", default=DEFAULT_URL, help=f"SQLAlchemy URL of the seeded stand-in database (default: {DEFAULT_URL}).")
+    parser.add_argument("--sources", default="kwl,kw_pfm,pt", help="Data sources to capture (default: kwl,kw_pfm,pt).")
+    parser.add_argument("--snapshot", default="plans.json", help="Plan snapshot file (default: plans.json).")
+    parser.add_argument("--update", action="store_true", help="Write the captured plans to the snapshot instead of comparing.")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed increase of the estimated cost (default: 0.5 = 50%%).")
+    parser.add_argument("--show", help="Print the full plan of one statement (e.g. kw_pfm.data.large).")
+    args = parser.parse_args(argv)
+
+    install(args.url)
+    data_sources = [s.strip() for s in args.sources.split(",") if s.strip()]
+    plans = capture(data_sources)
+    print()
+    print_table(plans)
+
+    if args.show:
+        plan = plans.get(args.show)
+        if plan is None:
+            print(f"Unknown statement '{args.show}'. Captured: {', '.join(plans)}")
+            sys.exit(2)
+        print(f"\n{args.show} ({plan['dialect']}, sql {plan['sql_digest']}):")
+        print("\n".join(plan['raw']))
+    if args.update:
+        with open(args.snapshot, 'w', encoding='utf-8') as f:
+            json.dump({"url": args.url, "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "plans": plans}, f, indent=2)
+        print(f"\nSnapshot written to {args.snapshot} ({len(plans)} statements).")
+        return
+    try:
+        with open(args.snapshot, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)["plans"]
+    except FileNotFoundError:
+        print(f"\nNo snapshot at {args.snapshot}; run with --update to create one.")
+        return
+    regressions, changes = check(plans, snapshot, args.tolerance)
+    print()
+    for message in changes:
+        print(f"CHANGED {message}")
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    if regressions:
+        sys.exit(1)
+    print(f"No plan regressions against {args.snapshot}.")
+
+
+if __name__ == "__main__":
+    main()
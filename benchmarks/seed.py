@@ -0,0 +1,348 @@
+# benchmarks/seed.py
+"""
+Tạo dữ liệu tổng hợp cho benchmark với đúng các bảng mà sql/*.sql truy vấn.
+
+Ví dụ:
+    python -m benchmarks.seed                                  # SQLite: benchmarks/bench.sqlite
+    python -m benchmarks.seed --storefronts 20 --keywords 5000 --months 12
+    python -m benchmarks.seed --url mysql+pymysql://root:pw@127.0.0.1:3306/bench
+
+Quy mô kết quả (mỗi nguồn dữ liệu, toàn bộ khoảng thời gian):
+    kwl:    storefronts x keywords x months dòng
+    kw_pfm: storefronts x keywords x months dòng (mỗi cặp keyword/storefront có một tổ hợp display/device/position)
+    pt:     storefronts x products x product_keywords dòng
+
+Dữ liệu dùng workspace 1, storefront id 1..N với EID (ads_ops_storefront_id) 1001..1000+N
+và kết thúc ở tháng trước để form ngày trên trang web chọn được.
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+from sqlalchemy import MetaData, Table, Column, Integer, BigInteger, String, Float, Date, Index
+from benchmarks.standin import DEFAULT_URL, create_standin_engine
+
+WORKSPACE_ID = 1
+# EID của storefront i là EID_OFFSET + i
+EID_OFFSET = 1000
+_DEVICE_TYPES = ("Mobile", "Desktop")
+_DISPLAY_TYPES = ("Paid", "Organic", "Top")
+_KEYWORD_TYPES = ("branded", "generic", "competitor")
+
+metadata = MetaData()
+
+passport_workspace = Table("passport_workspace", metadata, Column("id", Integer, primary_key=True))
+global_company = Table("global_company", metadata, Column("id", Integer, primary_key=True), Column("name", String(100)))
+ads_ops_storefront = Table("ads_ops_storefront", metadata, Column("id", Integer, primary_key=True))
+onsite_storefront = Table(
+    "onsite_storefront", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("ads_ops_storefront_id", Integer, index=True),
+    Column("global_company_id", Integer),
+    Column("storefront_name", String(100)),
+    Column("storefront_type", String(30)),
+    Column("storefront_sid", String(30)),
+    Column("storefront_url", String(200)),
+    Column("storefront_division", String(30)),
+    Column("marketplace_code", String(10)),
+    Column("marketplace_name", String(30)),
+    Column("country_code", String(5)),
+    Column("country_name", String(30)),
+    Column("operational_status", String(20)),
+    Column("category_name", String(50)),
+    Column("active_skus", Integer),
+    Column("shop_ads_status", String(20)),
+    Column("product_ads_status", String(20)),
+    Column("brand_name", String(50)),
+)
+kw_discovery_storefront_workspace = Table(
+    "kw_discovery_storefront_workspace", metadata,
+    Column("storefront_id", Integer, primary_key=True),
+    Column("workspace_id", Integer, primary_key=True),
+)
+onsite_storefront_workspace = Table(
+    "onsite_storefront_workspace", metadata,
+    Column("storefront_id", Integer, primary_key=True),
+    Column("workspace_id", Integer, primary_key=True),
+    Column("ads_ops_storefront_id", Integer),
+)
+onsite_keyword = Table("onsite_keyword", metadata, Column("id", Integer, primary_key=True), Column("keyword", String(100)))
+onsite_keyword_sharded = Table(
+    "onsite_keyword_sharded", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("keyword", String(100)),
+    Column("keyword_type", String(20)),
+    Column("country_name", String(30)),
+    Column("status", String(20)),
+    Column("first_interaction_at", Date),
+)
+onsite_keyword_workspace = Table(
+    "onsite_keyword_workspace", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("workspace_id", Integer, index=True),
+    Column("keyword_id", Integer, index=True),
+)
+onsite_workspace_tag = Table("onsite_workspace_tag", metadata, Column("id", Integer, primary_key=True), Column("name", String(50)))
+onsite_keyword_workspace_tag = Table(
+    "onsite_keyword_workspace_tag", metadata,
+    Column("keyword_workspace_id", Integer, primary_key=True),
+    Column("workspace_tag_id", Integer, primary_key=True),
+)
+kw_discovery_storefront_keyword = Table(
+    "kw_discovery_storefront_keyword", metadata,
+    Column("storefront_id", Integer, primary_key=True),
+    Column("keyword_id", Integer, primary_key=True),
+    Column("keyword_type", String(20)),
+    Column("translation", String(100)),
+    Column("tag_1", String(30)),
+    Column("tag_2", String(30)),
+    Column("tag_3", String(30)),
+    Column("note_1", String(50)),
+    Column("note_2", String(50)),
+    Column("company_competitor", String(50)),
+    Column("product_competitor", String(50)),
+    Column("storefront_competitor", String(50)),
+)
+kw_discovery_storefront_keyword_perf = Table(
+    "kw_discovery_storefront_keyword_perf", metadata,
+    Column("storefront_id", Integer),
+    Column("keyword_id", Integer),
+    Column("created_datetime", Date),
+    Column("est_daily_search_volume", Integer),
+    Column("ads_gmv", Float),
+    Column("cost", Float),
+    Column("click", Integer),
+    Column("impression", Integer),
+    Column("ads_item_sold", Integer),
+    Column("current_avg_bidding_price", Float),
+    Column("suggested_bidding_price", Float),
+    Column("peak_day_ads_gmv", Float),
+    Column("peak_day_bau_ads_gmv", Float),
+    Index("ix_kw_perf_sf_kw_date", "storefront_id", "keyword_id", "created_datetime"),
+)
+metric_share_of_search_storefront = Table(
+    "metric_share_of_search_storefront", metadata,
+    Column("storefront_id", Integer),
+    Column("keyword_id", Integer),
+    Column("created_datetime", Date),
+    Column("timing", String(10)),
+    Column("display_type", String(20)),
+    Column("device_type", String(20)),
+    Column("product_position", Integer),
+    Column("share_of_search", Float),
+    Column("suggested_bidding_price", Float),
+    Column("search_volume", Integer),
+    Index("ix_sos_sf_kw_date", "storefront_id", "keyword_id", "created_datetime"),
+)
+onsite_storefront_keyword_ads_performance = Table(
+    "onsite_storefront_keyword_ads_performance", metadata,
+    Column("ads_ops_storefront_id", Integer),
+    Column("keyword_id", Integer),
+    Column("tool_id", Integer),
+    Column("created_datetime", Date),
+    Column("timing", String(10)),
+    *(Column(name, Integer) for name in (
+        "ads_order", "direct_order", "direct_atc", "direct_item_sold", "click", "atc", "ads_item_sold",
+        "impression", "active_skus", "direct_conversion", "conversion", "active_shops",
+    )),
+    *(Column(name, Float) for name in ("cost", "ads_gmv", "direct_gmv")),
+    Index("ix_ads_aos_kw_date", "ads_ops_storefront_id", "keyword_id", "created_datetime"),
+)
+onsite_product = Table(
+    "onsite_product", metadata,
+    Column("id", BigInteger, primary_key=True),
+    Column("storefront_id", Integer, index=True),
+    Column("product_name", String(200)),
+    Column("product_url", String(200)),
+    Column("brand_name", String(50)),
+    Column("marketplace_name", String(30)),
+    Column("historical_sold", Integer),
+    Column("sold", Integer),
+    Column("selling_price", Float),
+    Column("discount", Float),
+)
+metric_share_of_search_product = Table(
+    "metric_share_of_search_product", metadata,
+    Column("keyword_id", Integer),
+    Column("product_id", BigInteger),
+    Column("created_datetime", Date),
+    Column("timing", String(10)),
+    Column("display_type", String(20)),
+    Column("device_type", String(20)),
+    Column("slot", Integer),
+    Index("ix_sos_product_kw_product", "keyword_id", "product_id", "created_datetime"),
+)
+
+
+def month_starts(months: int, end: date = None):
+    """Ngày đầu của `months` tháng liên tiếp, kết thúc ở tháng trước tháng của `end` (mặc định hôm nay)."""
+    end = (end or date.today()).replace(day=1)
+    starts = []
+    for _ in range(months):
+        end = (end - timedelta(days=1)).replace(day=1)
+        starts.append(end)
+    return sorted(starts)
+
+
+def _days(month_start: date, samples: int):
+    """`samples` ngày rải đều trong tháng (tối đa 28 để tháng nào cũng có)."""
+    step = max(1, 28 // samples)
+    return [month_start + timedelta(days=i * step) for i in range(min(samples, 28))]
+
+
+class _Inserter:
+    """Gom dòng theo lô rồi insert nhiều dòng một lần."""
+    def __init__(self, connection, batch_size: int):
+        self.connection = connection
+        self.batch_size = batch_size
+        self._pending = {}
+        self.rows = 0
+
+    def add(self, table, row: dict):
+        batch = self._pending.setdefault(table, [])
+        batch.append(row)
+        self.rows += 1
+        if len(batch) >= self.batch_size:
+            self._flush(table)
+
+    def _flush(self, table):
+        batch = self._pending.pop(table, [])
+        if batch:
+            self.connection.execute(table.insert(), batch)
+
+    def close(self):
+        for table in list(self._pending):
+            self._flush(table)
+
+
+def seed(engine, storefronts: int = 10, keywords: int = 2000, months: int = 6, samples_per_month: int = 2,
+         products: int = 50, product_keywords: int = 20, batch_size: int = 5000, random_seed: int = 42, log=print):
+    """Tạo lại toàn bộ bảng benchmark và trả về thông tin quy mô đã tạo."""
+    rng = random.Random(random_seed)
+    started = time.perf_counter()
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    days = [day for start in month_starts(months) for day in _days(start, samples_per_month)]
+
+    with engine.begin() as connection:
+        rows = _Inserter(connection, batch_size)
+        rows.add(passport_workspace, {"id": WORKSPACE_ID})
+        for company_id in range(1, 6):
+            rows.add(global_company, {"id": company_id, "name": f"Company {company_id}"})
+        for tag_id in range(1, 6):
+            rows.add(onsite_workspace_tag, {"id": tag_id, "name": f"Tag {tag_id}"})
+
+        for sf in range(1, storefronts + 1):
+            eid = EID_OFFSET + sf
+            rows.add(ads_ops_storefront, {"id": eid})
+            rows.add(onsite_storefront, {
+                "id": sf, "ads_ops_storefront_id": eid, "global_company_id": sf % 5 + 1,
+                "storefront_name": f"Storefront {sf}", "storefront_type": rng.choice(("mall", "official", "normal")),
+                "storefront_sid": f"SID{sf:06d}", "storefront_url": f"https://shop.example/{sf}",
+                "storefront_division": rng.choice(("Beauty", "Home", "Food")), "marketplace_code": rng.choice(("SHOPEE", "LAZADA")),
+                "marketplace_name": "Marketplace", "country_code": "VN", "country_name": "Vietnam",
+                "operational_status": "active", "category_name": rng.choice(("Skincare", "Haircare", "Snacks")),
+                "active_skus": rng.randint(10, 500), "shop_ads_status": "on", "product_ads_status": "on",
+                "brand_name": f"Brand {sf % 7}",
+            })
+            rows.add(kw_discovery_storefront_workspace, {"storefront_id": sf, "workspace_id": WORKSPACE_ID})
+            rows.add(onsite_storefront_workspace, {"storefront_id": sf, "workspace_id": WORKSPACE_ID, "ads_ops_storefront_id": eid})
+
+        for kw in range(1, keywords + 1):
+            keyword = f"keyword {kw}"
+            rows.add(onsite_keyword, {"id": kw, "keyword": keyword})
+            rows.add(onsite_keyword_sharded, {
+                "id": kw, "keyword": keyword, "keyword_type": rng.choice(_KEYWORD_TYPES), "country_name": "Vietnam",
+                "status": "active", "first_interaction_at": days[0],
+            })
+            rows.add(onsite_keyword_workspace, {"id": kw, "workspace_id": WORKSPACE_ID, "keyword_id": kw})
+            rows.add(onsite_keyword_workspace_tag, {"keyword_workspace_id": kw, "workspace_tag_id": kw % 5 + 1})
+        log(f"dimensions: {storefronts} storefronts, {keywords} keywords, {len(days)} days")
+
+        for sf in range(1, storefronts + 1):
+            eid = EID_OFFSET + sf
+            for kw in range(1, keywords + 1):
+                rows.add(kw_discovery_storefront_keyword, {
+                    "storefront_id": sf, "keyword_id": kw, "keyword_type": rng.choice(_KEYWORD_TYPES),
+                    "translation": f"translation {kw}", "tag_1": f"t{kw % 3}", "tag_2": f"t{kw % 5}", "tag_3": None,
+                    "note_1": None, "note_2": None, "company_competitor": f"Company {kw % 5}",
+                    "product_competitor": None, "storefront_competitor": f"Storefront {kw % storefronts + 1}",
+                })
+                # Một tổ hợp display/device/position cố định cho mỗi cặp để số dòng kw_pfm dự đoán được
+                display_type, device_type = _DISPLAY_TYPES[kw % 3], _DEVICE_TYPES[(kw + sf) % 2]
+                position = kw % 10 + 1
+                for day in days:
+                    clicks = rng.randint(1, 500)
+                    cost = round(clicks * rng.uniform(0.1, 2.0), 2)
+                    gmv = round(cost * rng.uniform(0.5, 8.0), 2)
+                    rows.add(kw_discovery_storefront_keyword_perf, {
+                        "storefront_id": sf, "keyword_id": kw, "created_datetime": day,
+                        "est_daily_search_volume": rng.randint(1, 20000), "ads_gmv": gmv, "cost": cost, "click": clicks,
+                        "impression": clicks * rng.randint(5, 50), "ads_item_sold": rng.randint(0, clicks),
+                        "current_avg_bidding_price": round(rng.uniform(0.1, 3.0), 2),
+                        "suggested_bidding_price": round(rng.uniform(0.1, 3.0), 2),
+                        "peak_day_ads_gmv": gmv * 2, "peak_day_bau_ads_gmv": gmv * 1.5,
+                    })
+                    rows.add(metric_share_of_search_storefront, {
+                        "storefront_id": sf, "keyword_id": kw, "created_datetime": day, "timing": "daily",
+                        "display_type": display_type, "device_type": device_type, "product_position": position,
+                        "share_of_search": round(rng.random(), 4), "suggested_bidding_price": round(rng.uniform(0.1, 3.0), 2),
+                        "search_volume": rng.randint(1, 20000),
+                    })
+                    rows.add(onsite_storefront_keyword_ads_performance, {
+                        "ads_ops_storefront_id": eid, "keyword_id": kw, "tool_id": 1, "created_datetime": day, "timing": "daily",
+                        "ads_order": rng.randint(0, 50), "direct_order": rng.randint(0, 50), "direct_atc": rng.randint(0, 50),
+                        "direct_item_sold": rng.randint(0, 50), "click": clicks, "atc": rng.randint(0, 80),
+                        "ads_item_sold": rng.randint(0, 50), "impression": clicks * 20, "active_skus": rng.randint(1, 100),
+                        "direct_conversion": rng.randint(0, 20), "conversion": rng.randint(0, 20), "active_shops": 1,
+                        "cost": cost, "ads_gmv": gmv, "direct_gmv": gmv / 2,
+                    })
+            log(f"storefront {sf}/{storefronts}: {rows.rows:,} rows written")
+
+        for sf in range(1, storefronts + 1):
+            for p in range(1, products + 1):
+                product_id = sf * 1_000_000 + p
+                rows.add(onsite_product, {
+                    "id": product_id, "storefront_id": sf, "product_name": f"Product {sf}-{p}",
+                    "product_url": f"https://shop.example/{sf}/{p}", "brand_name": f"Brand {sf % 7}",
+                    "marketplace_name": "Marketplace", "historical_sold": rng.randint(0, 100000),
+                    "sold": rng.randint(0, 5000), "selling_price": round(rng.uniform(1, 500), 2), "discount": round(rng.random() / 2, 2),
+                })
+                for kw in range(1, min(product_keywords, keywords) + 1):
+                    display_type, device_type = _DISPLAY_TYPES[(kw + p) % 3], _DEVICE_TYPES[kw % 2]
+                    for day in days:
+                        rows.add(metric_share_of_search_product, {
+                            "keyword_id": kw, "product_id": product_id, "created_datetime": day, "timing": "daily",
+                            "display_type": display_type, "device_type": device_type, "slot": rng.randint(1, 60),
+                        })
+        rows.close()
+
+    info = {
+        "storefronts": storefronts, "keywords": keywords, "months": months, "products": products,
+        "product_keywords": min(product_keywords, keywords), "rows_inserted": rows.rows,
+        "seconds": round(time.perf_counter() - started, 1),
+    }
+    log(f"done: {rows.rows:,} rows in {info['seconds']}s")
+    return info
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed a stand-in database with synthetic export data.")
+    parser.add_argument("--url", default=DEFAULT_URL, help=f"SQLAlchemy URL of the stand-in database (default: {DEFAULT_URL}).")
+    parser.add_argument("--storefronts", type=int, default=10)
+    parser.add_argument("--keywords", type=int, default=2000, help="Keywords tracked by every storefront.")
+    parser.add_argument("--months", type=int, default=6, help="Months of data, ending last month.")
+    parser.add_argument("--samples-per-month", type=int, default=2, help="Days with metrics in each month.")
+    parser.add_argument("--products", type=int, default=50, help="Products per storefront (product tracking).")
+    parser.add_argument("--product-keywords", type=int, default=20, help="Keywords tracked per product.")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42, help="Random seed.")
+    args = parser.parse_args(argv)
+
+    engine = create_standin_engine(args.url)
+    seed(engine, args.storefronts, args.keywords, args.months, args.samples_per_month,
+         args.products, args.product_keywords, args.batch_size, args.seed)
+
+
+if __name__ == "__main__":
+    main()
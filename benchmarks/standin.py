@@ -0,0 +1,71 @@
+# benchmarks/standin.py
+"""
+CSDL thay thế cho SingleStore khi benchmark: một CSDL tương thích MySQL bất kỳ (qua DATABASE_URL),
+hoặc SQLite chạy ngay trong process (không cần cài server).
+
+SQLite không có hàm month() và không bind được danh sách cho `IN :storefront_ids`,
+nên engine SQLite được bổ sung hai điểm này để các file SQL trong sql/ chạy được nguyên vẹn.
+"""
+import os
+import sqlite3
+from sqlalchemy import bindparam, create_engine, event
+from sqlalchemy.sql.elements import TextClause
+
+DEFAULT_URL = "sqlite:///benchmarks/bench.sqlite"
+
+
+def _month(value):
+    # Ngày được lưu dạng 'YYYY-MM-DD' (có thể kèm giờ)
+    return int(str(value)[5:7]) if value else None
+
+
+def _add_sqlite_functions(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function("month", 1, _month, deterministic=True)
+
+
+def _expand_list_params(conn, clauseelement, multiparams, params, execution_options):
+    """Đổi các tham số kiểu danh sách của text() thành bindparam expanding (`IN :ids` -> `IN (?, ?, ...)`)."""
+    if isinstance(clauseelement, TextClause):
+        values = params or (multiparams[0] if multiparams and isinstance(multiparams[0], dict) else {})
+        expanding = [name for name, value in values.items() if isinstance(value, (list, tuple))]
+        if expanding:
+            clauseelement = clauseelement.bindparams(*(bindparam(name, expanding=True) for name in expanding))
+    return clauseelement, multiparams, params
+
+
+def is_sqlite(url: str) -> bool:
+    return str(url).startswith("sqlite")
+
+
+def create_standin_engine(url: str = DEFAULT_URL, **kwargs):
+    """Engine dùng cho script seed (không qua connection pool của ứng dụng)."""
+    if is_sqlite(url):
+        kwargs.setdefault("connect_args", {"check_same_thread": False})
+    engine = create_engine(url, **kwargs)
+    if is_sqlite(url):
+        attach_sqlite_shims(engine)
+    return engine
+
+
+def attach_sqlite_shims(engine):
+    event.listen(engine, "connect", _add_sqlite_functions)
+    event.listen(engine, "before_execute", _expand_list_params, retval=True)
+
+
+def install(url: str = DEFAULT_URL):
+    """
+    Trỏ DatabaseManager của ứng dụng sang CSDL thay thế và trả về instance của nó.
+    Phải gọi trước khi có truy vấn nào; connection pool giữ nguyên cấu hình DB_POOL_* như khi chạy thật.
+    """
+    if is_sqlite(url) and "check_same_thread" not in url:
+        # Connection pool chia sẻ kết nối giữa các thread (job, shard, prefetch)
+        url += ("&" if "?" in url else "?") + "check_same_thread=false"
+    os.environ["DATABASE_URL"] = url
+    from utils.database import DatabaseManager
+    db_manager = DatabaseManager()
+    if is_sqlite(url):
+        attach_sqlite_shims(db_manager.engine)
+        # Kết nối kiểm tra lúc khởi tạo được mở trước khi có hàm month(); bỏ đi để pool tạo kết nối mới
+        db_manager.engine.dispose()
+    return db_manager
@@ -1,25 +1,69 @@
-from pathlib import Path
-import streamlit as st
+from data_logic.registry import load_sql
+from utils.projection import select_columns
 
-def _get_query_from_file(file_path: str) -> str:
-    """Helper function to read SQL file safely."""
-    try:
-        # Xây dựng đường dẫn tuyệt đối từ file hiện tại để đảm bảo luôn đúng
-        path = Path(__file__).resolve().parent.parent / "sql" / file_path
-        if not path.is_file():
-            raise FileNotFoundError(f"SQL file not found at the constructed path: {path}")
-        
-        with open(path, 'r', encoding='utf-8') as f:
-            return f.read()
-    except FileNotFoundError as e:
-        # Hiển thị lỗi ngay trên giao diện để dễ dàng debug
-        st.error(f"Fatal Error: Could not read a critical SQL file. Details: {e}")
-        return "" 
+# Không chia shard theo tháng: ads_metrics được LEFT JOIN theo (keyword, storefront) chứ không theo tháng, nên mỗi dòng
+# tháng nhận MAX() của dữ liệu ads trên toàn bộ khoảng ngày. Một shard chỉ thấy tháng của nó và cho ra giá trị khác.
+# Cùng lý do đó, kw_pfm không có partition cache theo tháng và không hỗ trợ export delta.
+SHARD_BY = None
+# Kết quả vẫn có một dòng cho mỗi tháng (group theo month(sos_date)), dùng khi ước lượng số dòng
+PERIOD = "month"
+# Thứ tự sắp xếp (tương ứng ORDER BY trong SQL)
+ORDER_BY = ("search_volume", False)
+
+# Kiểu dữ liệu gọn cho DataFrame kết quả (xem utils.frames.compact_frame); 'float32' chỉ áp dụng cho preview (session_frame)
+SCHEMA = {
+    "storefront_name": "category",
+    "marketplace_code": "category",
+    "aos_id": "int",
+    "display_type": "category",
+    "device_type": "category",
+    "product_position": "int",
+    "created_datetime": "int",
+    "search_volume": "float",
+    "atc": "int",
+    "cost": "float",
+    "click": "int",
+    "ads_order": "int",
+    "conversion": "float",
+    "direct_atc": "int",
+    "direct_gmv": "float",
+    "impression": "int",
+    "active_skus": "float",
+    "active_shops": "float",
+    "direct_order": "int",
+    "ads_item_sold": "int",
+    "direct_item_sold": "int",
+    "direct_conversion": "float",
+    "escore": "float32",
+    "ads_gmv": "float",
+    "benchmark_CPC": "float",
+    "cpc": "float",
+}
 
 query_params = {
-    "count": _get_query_from_file("kw_pfm_count.sql"),
-    "data": _get_query_from_file("kw_pfm_data.sql"),
+    "count": load_sql("kw_pfm_count.sql"),
+    "data": load_sql("kw_pfm_data.sql"),
+}
+
+# Các cột người dùng có thể chọn (theo thứ tự trong SELECT cuối cùng của file SQL)
+COLUMNS = select_columns(query_params["data"])
+# Cột phụ thuộc CTE ads_metrics (LEFT JOIN): nếu không chọn cột nào trong số này thì bỏ luôn CTE và join
+COLUMN_BLOCKS = {
+    "ads": (
+        "atc", "cost", "click", "ads_order", "conversion", "direct_atc", "direct_gmv", "impression",
+        "active_skus", "active_shops", "direct_order", "ads_item_sold", "direct_item_sold",
+        "direct_conversion", "ads_gmv", "cpc",
+    ),
 }
+# Giá trị của form cho biết bộ lọc tùy chọn không được dùng; được đổi thành None để bỏ điều kiện khỏi câu lệnh
+FILTER_ANY = {"device_type": "All", "display_type": "All", "product_position": -1}
+# Các cột xác định duy nhất một dòng kết quả, dùng làm key cho phân trang keyset
+PAGE_KEY = ("aos_id", "keyword", "created_datetime", "display_type", "device_type", "product_position")
+# Thời gian chạy tối đa của một truy vấn (giây). Nhiều CTE và join lớn nên cho phép chạy lâu hơn
+STATEMENT_TIMEOUT = 900
+# Ước lượng ban đầu cho AdmissionController (số dòng / storefront / kỳ, byte / dòng); được hiệu chỉnh theo các lần export thực tế
+EST_ROWS_PER_STOREFRONT = 5000
+AVG_ROW_BYTES = 300
 
 def get_query(query_name: str) -> str:
     """Gets a query by name from the pre-loaded dictionary."""
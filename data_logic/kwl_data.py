@@ -1,26 +1,60 @@
-from pathlib import Path
-import streamlit as st
+from data_logic.registry import load_sql
+from utils.projection import select_columns
 
-def _get_query_from_file(file_path: str) -> str:
-    """Helper function to read SQL file safely."""
-    try:
-        # Xây dựng đường dẫn tuyệt đối từ file hiện tại để đảm bảo luôn đúng
-        path = Path(__file__).resolve().parent.parent / "sql" / file_path
-        if not path.is_file():
-            raise FileNotFoundError(f"SQL file not found at the constructed path: {path}")
-        
-        with open(path, 'r', encoding='utf-8') as f:
-            return f.read()
-    except FileNotFoundError as e:
-        # Hiển thị lỗi ngay trên giao diện để dễ dàng debug
-        st.error(f"Fatal Error: Could not read a critical SQL file. Details: {e}")
-        return "" 
+# Kết quả được group theo month(created_datetime) nên có thể chia khoảng ngày theo tháng và chạy song song
+SHARD_BY = "month"
+
+# Kiểu dữ liệu gọn cho DataFrame kết quả (xem utils.frames.compact_frame); 'float32' chỉ áp dụng cho preview (session_frame)
+SCHEMA = {
+    "marketplace_code": "category",
+    "country_code": "category",
+    "storefront_name": "category",
+    "storefront_id": "int",
+    "operational_status": "category",
+    "category_name": "category",
+    "active_skus": "int",
+    "shop_ads_status": "category",
+    "product_ads_status": "category",
+    "brand_name": "category",
+    "tag_1": "category",
+    "tag_2": "category",
+    "tag_3": "category",
+    "keyword_type": "category",
+    "month(created_datetime)": "int",
+    "storefront_division": "category",
+    "search_volume": "int",
+    "ads_gmv": "float",
+    "cost": "float",
+    "click": "int",
+    "impression": "int",
+    "ads_item_sold": "int",
+    "bidding_price": "float",
+    "suggested_bidding_price": "float",
+    "roas": "float32",
+    "cr": "float32",
+    "ctr": "float32",
+    "cpc": "float",
+}
 
 query_params = {
-    "count": _get_query_from_file("kwl_count.sql"),
-    "data": _get_query_from_file("kwl_data.sql"),
+    "count": load_sql("kwl_count.sql"),
+    "data": load_sql("kwl_data.sql"),
+    # Ngày dữ liệu mới nhất trong phạm vi export, dùng làm watermark cho export delta (utils/delta.py)
+    "watermark": load_sql("kwl_watermark.sql"),
 }
 
+# Các cột người dùng có thể chọn (theo thứ tự trong SELECT cuối cùng của file SQL)
+COLUMNS = select_columns(query_params["data"])
+# Không có join tùy chọn: mọi join đều là INNER JOIN và ảnh hưởng đến số dòng kết quả
+COLUMN_BLOCKS = {}
+# Các cột xác định duy nhất một dòng kết quả, dùng làm key cho phân trang keyset
+PAGE_KEY = ("storefront_id", "keyword", "month(created_datetime)")
+# Thời gian chạy tối đa của một truy vấn (giây). Truy vấn đơn, group theo tháng
+STATEMENT_TIMEOUT = 600
+# Ước lượng ban đầu cho AdmissionController (số dòng / storefront / kỳ, byte / dòng); được hiệu chỉnh theo các lần export thực tế
+EST_ROWS_PER_STOREFRONT = 3000
+AVG_ROW_BYTES = 400
+
 def get_query(query_name: str) -> str:
     """Gets a query by name from the pre-loaded dictionary."""
     return query_params.get(query_name, "")
\ No newline at end of file
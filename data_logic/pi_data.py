@@ -1,3 +1,5 @@
+# Tham số dùng cùng kiểu với các nguồn khác: `:name`, tham số danh sách viết `IN :storefront_ids` / `IN :tags`
+# (được mở rộng thành danh sách placeholder bởi data_logic/registry.py), không dùng placeholder .format
 query_params = {
     "count": """
 
@@ -7,19 +9,6 @@ query_params = {
     """
 }
 
-def get_query(query_name, storefront_placeholders, tag_placeholders):
-    """
-    Get a query by name and format it with storefront and tag placeholders
-    
-    Args:
-        query_name (str): Name of the query to retrieve ('count' or 'data')
-        storefront_placeholders (str): Placeholder string for storefront IDs (e.g., '%s, %s')
-        tag_placeholders (str): Placeholder string for tags (e.g., '%s, %s')
-        
-    Returns:
-        str: Formatted SQL query
-    """
-    return query_params[query_name].format(
-        storefront_placeholders=storefront_placeholders,
-        tag_placeholders=tag_placeholders
-    )
+def get_query(query_name: str) -> str:
+    """Gets a query by name from the pre-loaded dictionary."""
+    return query_params.get(query_name, "")
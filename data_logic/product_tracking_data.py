@@ -1,26 +1,38 @@
-from pathlib import Path
-import streamlit as st
+from data_logic.registry import load_sql
+from utils.projection import select_columns
 
-def _get_query_from_file(file_path: str) -> str:
-    """Helper function to read SQL file safely."""
-    try:
-        # Xây dựng đường dẫn tuyệt đối từ file hiện tại để đảm bảo luôn đúng
-        path = Path(__file__).resolve().parent.parent / "sql" / file_path
-        if not path.is_file():
-            raise FileNotFoundError(f"SQL file not found at the constructed path: {path}")
-        
-        with open(path, 'r', encoding='utf-8') as f:
-            return f.read()
-    except FileNotFoundError as e:
-        # Hiển thị lỗi ngay trên giao diện để dễ dàng debug
-        st.error(f"Fatal Error: Could not read a critical SQL file. Details: {e}")
-        return "" 
+# Slot được tính trung bình trên toàn bộ khoảng ngày nên không thể chia shard
+SHARD_BY = None
+
+# Kiểu dữ liệu gọn cho DataFrame kết quả (xem utils.frames.compact_frame)
+SCHEMA = {
+    "global_company": "category",
+    "storefront_name": "category",
+    "item_sold_LT": "int",
+    "item_sold_l30d": "int",
+    "selling_price": "float",
+    "product_slot": "int",
+    "device_type": "category",
+    "display_type": "category",
+}
 
 query_params = {
-    "count": _get_query_from_file("product_tracking_count.sql"),
-    "data": _get_query_from_file("product_tracking_data.sql"),
+    "count": load_sql("product_tracking_count.sql"),
+    "data": load_sql("product_tracking_data.sql"),
 }
 
+# Các cột người dùng có thể chọn (theo thứ tự trong SELECT cuối cùng của file SQL)
+COLUMNS = select_columns(query_params["data"])
+# Cột global_company cần LEFT JOIN global_company
+COLUMN_BLOCKS = {"company": ("global_company",)}
+# Các cột xác định duy nhất một dòng kết quả, dùng làm key cho phân trang keyset
+PAGE_KEY = ("storefront_name", "keyword", "product_name", "device_type", "display_type")
+# Thời gian chạy tối đa của một truy vấn (giây). Phạm vi dữ liệu nhỏ, truy vấn lâu hơn mức này thường là bất thường
+STATEMENT_TIMEOUT = 300
+# Ước lượng ban đầu cho AdmissionController (số dòng / storefront / kỳ, byte / dòng); được hiệu chỉnh theo các lần export thực tế
+EST_ROWS_PER_STOREFRONT = 2000
+AVG_ROW_BYTES = 250
+
 def get_query(query_name: str) -> str:
     """Gets a query by name from the pre-loaded dictionary."""
     return query_params.get(query_name, "")
\ No newline at end of file
@@ -0,0 +1,147 @@
+import logging
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from sqlalchemy import text
+from utils.config import STATEMENT_CACHE_SIZE
+from utils.projection import project_query, filter_names, specialize_filters
+
+SQL_DIR = Path(__file__).resolve().parent.parent / "sql"
+# Tham số LIMIT được bind thay vì ghép vào chuỗi SQL để câu lệnh không đổi theo số dòng
+LIMIT_PARAM = "_limit"
+_PARAM_RE = re.compile(r"(?<![:\w]):(\w+)")
+
+def load_sql(file_name: str) -> str:
+    """Helper function to read an SQL file from the sql/ directory once, at import time."""
+    path = SQL_DIR / file_name
+    try:
+        if not path.is_file():
+            raise FileNotFoundError(f"SQL file not found at the constructed path: {path}")
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError as e:
+        # DataManager sẽ báo lỗi khi truy vấn rỗng được sử dụng
+        logging.getLogger(__name__).error(f"Fatal Error: Could not read a critical SQL file. Details: {e}")
+        return ""
+
+def bucket_size(count: int) -> int:
+    """Số placeholder cho một danh sách `count` phần tử: lũy thừa của 2 nhỏ nhất không nhỏ hơn `count`."""
+    size = 1
+    while size < count:
+        size *= 2
+    return size
+
+def _list_param(name: str, i: int) -> str:
+    return f"{name}_{i}"
+
+def expand_list_params(sql: str, sizes: dict) -> str:
+    """Thay `:name` của các tham số danh sách bằng `(:name_0, ..., :name_{n-1})` với n = sizes[name]."""
+    for name, size in sizes.items():
+        placeholders = ", ".join(f":{_list_param(name, i)}" for i in range(size))
+        sql = re.sub(rf"(?<![:\w]):{name}\b", f"({placeholders})", sql)
+    return sql
+
+def bind_list_params(params: dict, sizes: dict) -> dict:
+    """
+    Tham số tương ứng với expand_list_params. Danh sách ngắn hơn bucket được lặp lại phần tử cuối
+    (giá trị trùng trong IN không làm thay đổi kết quả).
+    """
+    bound = {k: v for k, v in params.items() if k not in sizes}
+    for name, size in sizes.items():
+        values = list(params[name])
+        for i in range(size):
+            bound[_list_param(name, i)] = values[min(i, len(values) - 1)]
+    return bound
+
+class StatementRegistry:
+    """
+    Nơi duy nhất giữ SQL của các nguồn dữ liệu và các câu lệnh đã biên dịch.
+    Câu lệnh được cache theo (data_source, query_type, cột được chọn, bộ lọc tùy chọn đang dùng, có LIMIT hay không,
+    bucket của các tham số danh sách)
+    nên SQL gửi đi ổn định giữa các lần export: SQLAlchemy dùng lại bản biên dịch, CSDL dùng lại plan đã biên dịch.
+    """
+
+    def __init__(self, max_statements: int = STATEMENT_CACHE_SIZE):
+        self.max_statements = max_statements
+        self._sources = {}
+        self._statements = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def register(self, data_source: str, queries: dict, column_blocks: dict = None):
+        """Đăng ký SQL (query_type -> SQL) của một nguồn dữ liệu; gọi lại với cùng nguồn không có tác dụng."""
+        names = {query_type: set(_PARAM_RE.findall(sql or "")) for query_type, sql in queries.items()}
+        filters = {query_type: filter_names(sql or "") for query_type, sql in queries.items()}
+        with self._lock:
+            self._sources.setdefault(data_source, (dict(queries), dict(column_blocks or {}), names, filters))
+
+    def _source(self, data_source: str):
+        return self._sources.get(data_source, ({}, {}, {}, {}))
+
+    def sql(self, data_source: str, query_type: str) -> str:
+        queries = self._source(data_source)[0]
+        query_str = queries.get(query_type, "")
+        if not query_str or not query_str.strip():
+            raise FileNotFoundError(f"SQL query for '{data_source}' ('{query_type}') is empty.")
+        return query_str
+
+    def compile(self, data_source: str, query_type: str, params: dict, columns=None, limit: int = None):
+        """
+        Trả về (chuỗi SQL đã mở rộng, tham số để bind) cho `params`.
+        Tham số danh sách được mở rộng theo bucket; `limit` (nếu có) được bind vào :_limit.
+        Bộ lọc tùy chọn có giá trị None được bỏ khỏi câu lệnh (xem utils/projection.specialize_filters).
+        """
+        entry, bound = self._prepare(data_source, query_type, params, columns, limit)
+        return entry[0], bound
+
+    def statement(self, data_source: str, query_type: str, params: dict, columns=None, limit: int = None):
+        """Như compile() nhưng trả về text() dùng chung giữa các lần gọi thay vì chuỗi SQL."""
+        entry, bound = self._prepare(data_source, query_type, params, columns, limit)
+        return entry[1], bound
+
+    def _prepare(self, data_source: str, query_type: str, params: dict, columns, limit: int):
+        _, _, all_names, all_filters = self._source(data_source)
+        names = all_names.get(query_type, set())
+        active = tuple(sorted(name for name in all_filters.get(query_type, ()) if params.get(name) is not None))
+        # Chỉ các tham số danh sách được dùng trong SQL (params còn chứa các giá trị khác như danh sách cột)
+        sizes = {name: bucket_size(len(value)) for name, value in params.items()
+                 if name in names and isinstance(value, (list, tuple)) and value}
+        # project_query giữ thứ tự cột như trong file SQL nên thứ tự người dùng chọn không ảnh hưởng câu lệnh
+        key = (data_source, query_type, tuple(sorted(columns or ())), active, bool(limit), tuple(sorted(sizes.items())))
+        with self._lock:
+            entry = self._statements.get(key)
+            if entry is not None:
+                self._statements.move_to_end(key)
+                self.hits += 1
+        if entry is None:
+            entry = self._compile(data_source, query_type, columns, active, bool(limit), sizes)
+            with self._lock:
+                self.misses += 1
+                self._statements[key] = entry
+                while len(self._statements) > self.max_statements:
+                    self._statements.popitem(last=False)
+        # Chỉ bind các tham số có trong câu lệnh (đã bỏ các bộ lọc không dùng)
+        bound = bind_list_params({name: value for name, value in params.items() if name in entry[2]}, sizes)
+        if limit:
+            bound[LIMIT_PARAM] = int(limit)
+        return entry, bound
+
+    def _compile(self, data_source: str, query_type: str, columns, active: tuple, limited: bool, sizes: dict):
+        column_blocks = self._source(data_source)[1]
+        query_str = self.sql(data_source, query_type)
+        if columns:
+            query_str = project_query(query_str, columns, column_blocks)
+        query_str = specialize_filters(query_str, active)
+        names = set(_PARAM_RE.findall(query_str))
+        query_str = expand_list_params(query_str, sizes)
+        if limited:
+            query_str += f" LIMIT :{LIMIT_PARAM}"
+        return query_str, text(query_str), names
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"statements": len(self._statements), "hits": self.hits, "misses": self.misses}
+
+statements = StatementRegistry()
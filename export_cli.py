@@ -0,0 +1,91 @@
+# export_cli.py
+"""
+Export hàng loạt không cần giao diện Streamlit.
+
+Ví dụ:
+    python export_cli.py manifest.json --output exports/2024-05 --workers 4
+    python export_cli.py manifest.json --output exports/weekly --delta   # chỉ lấy dữ liệu mới kể từ lần chạy trước
+    python export_cli.py prewarm --top 20 --workers 2 --window 01:00-06:00  # tính trước cache cho các export phổ biến
+
+manifest.json:
+    {
+        "defaults": {"start_date": "2024-05-01", "end_date": "2024-05-31", "export_format": "csv.gz"},
+        "jobs": [
+            {"data_source": "kwl", "workspace_id": 123, "storefront_ids": [456, 789],
+             "columns": ["keyword", "storefront_name", "search_volume"]},
+            {"data_source": "kw_pfm", "workspace_id": 123, "storefront_ids": "456",
+             "options": {"device_type": "Mobile", "display_type": "Paid", "product_position": -1}}
+        ]
+    }
+
+Với --delta (hoặc "delta": true trong manifest), mỗi job ghi nhớ watermark created_datetime theo
+(nguồn, workspace, tập storefront) và lần sau chỉ tính lại các tháng có dữ liệu mới. Mỗi file kèm
+<file>.manifest.json cho biết các tháng (replaces_months) thay thế dữ liệu trong các file trước đó.
+"""
+import argparse
+import json
+import sys
+from utils.config import MAX_EXPORT_ROWS, EXPORT_WORKERS, DELTA_STATE_PATH, PREWARM_TOP_N, PREWARM_WORKERS, PREWARM_WINDOW
+from utils.batch import load_manifest, run_batch
+
+def prewarm_main(argv=None):
+    from utils.prewarm import prewarm, run_scheduler
+    from utils.usage import usage_log
+    parser = argparse.ArgumentParser(prog="export_cli.py prewarm", description="Precompute the most used exports into the result cache during off-peak hours.")
+    parser.add_argument("--top", type=int, default=PREWARM_TOP_N, help=f"Number of most used combinations to prewarm (default: {PREWARM_TOP_N}).")
+    parser.add_argument("-w", "--workers", type=int, default=PREWARM_WORKERS, help=f"Queries to run at the same time (default: {PREWARM_WORKERS}).")
+    parser.add_argument("--window", default=PREWARM_WINDOW, help=f"Daily off-peak window, local time HH:MM-HH:MM (default: {PREWARM_WINDOW}).")
+    parser.add_argument("--once", action="store_true", help="Run a single window and exit instead of running every day.")
+    parser.add_argument("--now", action="store_true", help="Prewarm immediately, ignoring the window.")
+    parser.add_argument("--list", action="store_true", help="Only print the most used combinations.")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for count, combo in usage_log.top(args.top):
+            print(f"{count:>5}  {json.dumps(combo, sort_keys=True)}")
+        return 0
+    if args.now:
+        results = prewarm(usage_log.top(args.top), args.workers)
+    else:
+        results = run_scheduler(args.top, args.workers, args.window, once=args.once)
+    failed = sum(1 for r in results or [] if r['status'] == 'failed')
+    return 1 if failed else 0
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "prewarm":
+        return prewarm_main(argv[1:])
+    parser = argparse.ArgumentParser(description="Run data exports from a manifest without the web UI.")
+    parser.add_argument("manifest", help="Path to the JSON manifest of export jobs.")
+    parser.add_argument("-o", "--output", default="exports", help="Output directory (default: exports).")
+    parser.add_argument("-w", "--workers", type=int, default=EXPORT_WORKERS, help=f"Jobs to run in parallel (default: {EXPORT_WORKERS}).")
+    parser.add_argument("--max-rows", type=int, default=MAX_EXPORT_ROWS, help=f"Row limit per job (default: {MAX_EXPORT_ROWS}).")
+    parser.add_argument("--delta", action="store_true", help="Only export data newer than the previous run's watermark.")
+    parser.add_argument("--state", default=DELTA_STATE_PATH, help=f"Watermark state file for --delta (default: {DELTA_STATE_PATH}).")
+    args = parser.parse_args(argv)
+
+    try:
+        jobs = load_manifest(args.manifest)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Running {len(jobs)} job(s) with {args.workers} worker(s) -> {args.output}")
+
+    def report(result):
+        if result['status'] == 'ok':
+            mode = f" ({result['mode']})" if result.get('mode') else ""
+            print(f"[ok] {result['name']}: {result['rows']:,} rows in {result['seconds']}s{mode}")
+        elif result['status'] == 'empty':
+            print(f"[empty] {result['name']}: no data found")
+        elif result['status'] == 'unchanged':
+            print(f"[unchanged] {result['name']}: no new data since {result['watermark']}")
+        else:
+            print(f"[failed] {result['name']}: {result['error']}", file=sys.stderr)
+
+    results = run_batch(jobs, args.output, workers=args.workers, max_rows=args.max_rows, on_result=report,
+                        delta=args.delta, state_path=args.state)
+    failed = sum(1 for r in results if r['status'] == 'failed')
+    print(f"Done: {len(results) - failed} succeeded, {failed} failed. See {args.output}/summary.json")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,27 @@
+# pages/3_Bundle_Export.py
+import streamlit as st
+from utils.session import initialize_session
+from utils.bundle import BUNDLE_SOURCES
+from utils.ui import create_input_form, start_bundle, render_bundle_results
+
+st.set_page_config(page_title="Bundle Export", layout="wide")
+initialize_session()
+
+DATA_SOURCE_KEY = 'bundle'
+
+st.title("📦 Bundle Export")
+st.caption("Export several reports for the same workspace, storefronts and dates as one ZIP file. The reports are fetched in parallel.")
+st.markdown("---")
+
+data_sources = st.multiselect(
+    "Reports *", options=list(BUNDLE_SOURCES), default=list(BUNDLE_SOURCES), format_func=BUNDLE_SOURCES.get, key=f"sources_{DATA_SOURCE_KEY}"
+)
+workspace_id, storefront_input, start_date, end_date, pfm_opts, export_format, _ = create_input_form(
+    source_key=DATA_SOURCE_KEY, show_kw_pfm_options='kw_pfm' in data_sources
+)
+
+if st.button("Build Bundle", key=f'get_data_{DATA_SOURCE_KEY}'):
+    inputs = {"workspace_id": workspace_id, "storefront_input": storefront_input, "start_date": start_date, "end_date": end_date, "options": pfm_opts, "export_format": export_format}
+    start_bundle(data_sources, inputs)
+
+render_bundle_results()
@@ -44,14 +44,15 @@ WITH dim_data AS (
       ON s.keyword_id = dim.dim_keyword_id 
       AND s.storefront_id = dim.storefront_id
   WHERE TRUE
-    AND (:device_type is null or s.device_type = :device_type)
-  	AND (:display_type is null or s.display_type = :display_type)
-  	AND (:product_position is null or s.product_position = :product_position)
+    AND s.device_type = :device_type -- filter:device_type
+    AND s.display_type = :display_type -- filter:display_type
+    AND s.product_position = :product_position -- filter:product_position
     AND s.timing = 'daily'
     AND created_datetime between :start_date and :end_date
   GROUP BY s.keyword_id, s.storefront_id,month(created_datetime)
   ,s.display_type,s.device_type,s.product_position
 )
+-- block:ads:begin
 ,ads_metrics AS (
   SELECT
     p.timing,
@@ -83,31 +84,40 @@ WITH dim_data AS (
     AND created_datetime between :start_date and :end_date
   GROUP BY p.ads_ops_storefront_id, p.keyword_id,month(created_datetime)
 )
+-- block:ads:end
 
 ,main_data AS (
   SELECT
     d.*,
-    s.search_volume,s.share_of_search,s.suggested_cpc,s.sos_date,s.display_type,s.device_type,s.product_position,
-    a.ads_order,a.cost,a.direct_order,
+    s.search_volume,s.share_of_search,s.suggested_cpc,s.sos_date,s.display_type,s.device_type,s.product_position
+    -- block:ads:begin
+    ,a.ads_order,a.cost,a.direct_order,
     a.ads_gmv,a.direct_atc,a.direct_gmv,
     a.direct_item_sold,a.click,a.atc,
     a.ads_item_sold,a.impression,
     a.active_skus,a.direct_conversion,
     a.conversion,a.active_shops,
     (a.cost / NULLIF(a.click, 0)) AS cpc
+    -- block:ads:end
   FROM dim_data d
     JOIN sos_metrics s ON s.sos_keyword_id = d.dim_keyword_id 
       AND s.storefront_id = d.storefront_id
+    -- block:ads:begin
     LEFT JOIN ads_metrics a ON a.ads_keyword_id = d.dim_keyword_id 
       AND a.ads_ops_storefront_id = d.aos_id
+    -- block:ads:end
 )
 
 -- Final result
-SELECT keyword,
+SELECT
+  -- columns:begin
+  keyword,
   storefront_name,
   marketplace_code,
   aos_id,
-  display_type,device_type,product_position,
+  display_type,
+  device_type,
+  product_position,
   month(sos_date) as created_datetime,
   AVG(search_volume) AS search_volume,
   MAX(atc) AS atc,
@@ -128,6 +138,7 @@ SELECT keyword,
   MAX(ads_gmv) AS ads_gmv,
   AVG(suggested_cpc) AS benchmark_CPC,
   MAX(cpc) AS cpc
+  -- columns:end
 FROM main_data
 GROUP BY
   workspace_id,
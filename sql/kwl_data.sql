@@ -1,4 +1,6 @@
-select keyword
+select
+    -- columns:begin
+    keyword
     , onsite_storefront.marketplace_code
     , onsite_storefront.country_code
     , storefront_name
@@ -35,6 +37,7 @@ select keyword
     , MAX(company_competitor) 		AS company_competitor
     , MAX(product_competitor) 		AS product_competitor
     , MAX(storefront_competitor) 	AS storefront_competitor
+    -- columns:end
 from kw_discovery_storefront_keyword
         join kw_discovery_storefront_keyword_perf
             on kw_discovery_storefront_keyword.storefront_id = kw_discovery_storefront_keyword_perf.storefront_id and
@@ -0,0 +1,8 @@
+select max(created_datetime)
+from kw_discovery_storefront_keyword_perf
+        join onsite_storefront on kw_discovery_storefront_keyword_perf.storefront_id = onsite_storefront.id
+        join kw_discovery_storefront_workspace
+            on kw_discovery_storefront_keyword_perf.storefront_id = kw_discovery_storefront_workspace.storefront_id
+where workspace_id = :workspace_id
+and ads_ops_storefront_id in :storefront_ids
+and created_datetime between :start_date and :end_date
\ No newline at end of file
@@ -17,7 +17,9 @@ WITH main_query AS (
         product.selling_price AS product____a_selling_price,
         product.sold AS product____a_sold,
         product.discount AS product____a_discount,
+        -- block:company:begin
         global_company_z.name AS storefront____global_company____a_name,
+        -- block:company:end
         storefront.id AS storefront____a_id,
         storefront.storefront_url AS storefront____a_storefront_url,
         storefront.storefront_name AS storefront____a_storefront_name,
@@ -27,7 +29,9 @@ WITH main_query AS (
         workspace.id AS workspace____a_id
     FROM passport_workspace AS workspace
         INNER JOIN onsite_storefront AS storefront ON (true)
+        -- block:company:begin
         LEFT JOIN global_company AS global_company_z ON storefront.global_company_id = global_company_z.id
+        -- block:company:end
         INNER JOIN onsite_product AS product ON (product.storefront_id = storefront.id)
         INNER JOIN onsite_keyword_sharded AS keyword ON (true)
         INNER JOIN onsite_keyword_workspace AS keyword_workspace ON (keyword_workspace.workspace_id = workspace.id)
@@ -74,6 +78,7 @@ WITH main_query AS (
         keyword.id
 )
 SELECT
+    -- columns:begin
     keyword____a_keyword as keyword,
     product____a_product_name as product_name,
     storefront____global_company____a_name as global_company,
@@ -84,6 +89,7 @@ SELECT
     round(AVG(product____m_slot),0) AS product_slot,
     product____a_device_type as device_type,
     product____a_display_type as display_type
+    -- columns:end
 FROM
     main_query
 GROUP BY
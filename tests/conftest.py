@@ -0,0 +1,35 @@
+import atexit
+import os
+import shutil
+import tempfile
+import pytest
+
+# Cache, file spool và state của ứng dụng ghi vào thư mục tạm riêng của lần chạy test (đặt trước khi utils.config được import)
+_TMP = tempfile.mkdtemp(prefix="data_exporter_tests_")
+atexit.register(shutil.rmtree, _TMP, ignore_errors=True)
+for _name in ("EXPORT_SPOOL_DIR", "RESULT_CACHE_DIR", "PARTITION_CACHE_DIR"):
+    os.environ[_name] = os.path.join(_TMP, _name.lower())
+os.environ["DELTA_STATE_PATH"] = os.path.join(_TMP, "watermarks.json")
+os.environ["USAGE_LOG_PATH"] = ""
+
+
+@pytest.fixture(scope="session")
+def standin(tmp_path_factory):
+    """
+    CSDL SQLite thay thế (benchmarks/standin.py) với một ít dữ liệu cho 2 storefront trong 2 tháng gần nhất.
+    Trả về params export phủ toàn bộ dữ liệu đã seed.
+    """
+    from benchmarks.seed import EID_OFFSET, WORKSPACE_ID, month_starts, seed
+    from benchmarks.standin import create_standin_engine, install
+    url = f"sqlite:///{tmp_path_factory.mktemp('standin') / 'standin.sqlite'}"
+    seed(create_standin_engine(url), storefronts=2, keywords=40, months=2, samples_per_month=2,
+         products=5, product_keywords=4, log=lambda *args: None)
+    install(url)
+    first, last = month_starts(2)
+    return {
+        "workspace_id": WORKSPACE_ID,
+        "storefront_ids": [EID_OFFSET + 1, EID_OFFSET + 2],
+        # Dữ liệu được seed vào các ngày <= 28 của mỗi tháng
+        "start_date": first.strftime('%Y-%m-%d'),
+        "end_date": last.replace(day=28).strftime('%Y-%m-%d'),
+    }
@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+import pytest
+from utils import admission as admission_module
+from utils.admission import AdmissionController, Decision
+from utils.config import LARGE_EXPORT_WORKERS, MAX_EXPORT_ROWS, SMALL_EXPORT_ROWS
+from utils.export import XLSX_MAX_ROWS
+
+MODULE = SimpleNamespace(PERIOD="month", EST_ROWS_PER_STOREFRONT=1000, AVG_ROW_BYTES=100, COLUMNS=["a", "b", "c", "d"])
+IDLE = {"large_active": 0, "pool_ratio": 0}
+
+
+def _params(storefronts=1, start="2024-01-01", end="2024-01-31", **extra):
+    return {"storefront_ids": list(range(storefronts)), "start_date": start, "end_date": end, "export_format": "csv", **extra}
+
+
+@pytest.fixture(autouse=True)
+def no_memory_pressure(monkeypatch):
+    monkeypatch.setattr(admission_module, "_rss_bytes", lambda: None)
+
+
+def test_estimate_scales_with_storefronts_months_and_columns():
+    controller = AdmissionController()
+    assert controller.estimate("src", MODULE, _params(2, end="2024-03-15")) == (6000, 600000)
+    assert controller.estimate("src", MODULE, _params(2, columns=["a"]))[1] == 2000 * 25
+
+
+def test_small_export_is_admitted_on_the_small_lane():
+    decision = AdmissionController().decide("src", MODULE, _params(), IDLE)
+    assert (decision.action, decision.lane) == (Decision.ADMIT, "small")
+
+
+def test_counted_rows_over_the_limit_are_rejected():
+    decision = AdmissionController().decide("src", MODULE, _params(), IDLE, num_rows=MAX_EXPORT_ROWS + 1)
+    assert decision.action == Decision.REJECT
+    assert "too large" in decision.reason
+
+
+def test_estimate_alone_does_not_reject():
+    rows = MAX_EXPORT_ROWS // 1000 + 1
+    decision = AdmissionController().decide("src", MODULE, _params(rows), IDLE)
+    assert decision.estimated_rows > MAX_EXPORT_ROWS
+    assert decision.action != Decision.REJECT
+
+
+def test_large_export_waits_when_the_large_lane_is_full():
+    load = {"large_active": LARGE_EXPORT_WORKERS, "pool_ratio": 0}
+    decision = AdmissionController().decide("src", MODULE, _params(), load, num_rows=SMALL_EXPORT_ROWS + 1)
+    assert (decision.action, decision.lane, decision.shard_workers) == (Decision.QUEUE, "large", 1)
+
+
+def test_xlsx_over_the_sheet_limit_is_downgraded(monkeypatch):
+    monkeypatch.setattr(admission_module, "MAX_EXPORT_ROWS", XLSX_MAX_ROWS * 2)
+    decision = AdmissionController().decide("src", MODULE, _params(export_format="xlsx"), IDLE, num_rows=XLSX_MAX_ROWS + 1)
+    assert decision.action == Decision.DOWNGRADE
+    assert decision.export_format == "csv.gz"
+
+
+def test_observe_moves_the_estimate_towards_actual_rows():
+    controller = AdmissionController()
+    controller.observe("src", MODULE, _params(), 11000)
+    assert controller.estimate("src", MODULE, _params())[0] == 11000
+    controller.observe("src", MODULE, _params(), 1000)
+    assert controller.estimate("src", MODULE, _params())[0] == pytest.approx(8000, abs=1)
@@ -0,0 +1,51 @@
+import zipfile
+from datetime import datetime
+import pytest
+from utils import bundle as bundle_module
+from utils.admission import Decision
+from utils.bundle import BundleExport
+from utils.database import DatabaseManager
+from utils.export import discard_spool
+from utils.jobs import Job
+from utils.managers import DataManager, ExportTooLargeError
+
+
+def _inputs(standin, export_format="csv"):
+    return {
+        "workspace_id": str(standin["workspace_id"]),
+        "storefront_input": ",".join(str(s) for s in standin["storefront_ids"]),
+        "start_date": datetime.strptime(standin["start_date"], "%Y-%m-%d").date(),
+        "end_date": datetime.strptime(standin["end_date"], "%Y-%m-%d").date(),
+        "export_format": export_format,
+        "options": {"device_type": "All", "display_type": "All", "product_position": -1},
+    }
+
+
+def test_bundle_zips_one_file_per_source(standin):
+    sources = ["kwl", "kw_pfm", "pt"]
+    bundle = BundleExport(sources, _inputs(standin, "parquet"))
+    assert bundle.admit().action != Decision.REJECT
+    job = Job("bundle", ",".join(sources))
+    info = bundle.run(job)
+    try:
+        with zipfile.ZipFile(info["path"]) as archive:
+            names = archive.namelist()
+            assert sorted(names) == sorted(f"{source}.parquet" for source in sources)
+            assert all(item.compress_type == zipfile.ZIP_STORED for item in archive.infolist())
+        assert [f["data_source"] for f in info["files"]] == sources
+        expected = {source: len(DataManager(source).get_data(bundle.params[source])) for source in sources}
+        assert {f["data_source"]: f["rows"] for f in info["files"]} == expected
+        assert info["rows"] == job.rows == sum(expected.values())
+    finally:
+        discard_spool(info)
+
+
+def test_failed_bundle_removes_its_files_and_returns_connections(standin, monkeypatch, tmp_path):
+    monkeypatch.setattr(bundle_module, "MAX_EXPORT_ROWS", 10)
+    monkeypatch.setattr(bundle_module, "EXPORT_SPOOL_DIR", str(tmp_path))
+    bundle = BundleExport(["kwl", "pt"], _inputs(standin))
+    bundle.admit()
+    with pytest.raises(ExportTooLargeError):
+        bundle.run(Job("bundle", "kwl,pt"))
+    assert list(tmp_path.iterdir()) == []
+    assert DatabaseManager().engine.pool.checkedout() == 0
@@ -0,0 +1,70 @@
+import os
+import time
+import pandas as pd
+from utils.cache import ResultCache, make_cache_key
+
+
+def _cache(tmp_path, **kwargs):
+    options = {"ttl": 3600, "max_bytes": 10 ** 9, **kwargs}
+    return ResultCache(str(tmp_path), **options)
+
+
+def test_writer_caches_chunks_whose_first_chunk_has_an_all_null_column(tmp_path):
+    cache = _cache(tmp_path)
+    writer = cache.writer("k", {"cost": "float"})
+    writer.write(pd.DataFrame({"keyword": ["a"], "note": [None], "cost": [None], "peak": [1]}))
+    writer.write(pd.DataFrame({"keyword": ["b"], "note": ["x"], "cost": [1.5], "peak": [2.5]}))
+    writer.commit()
+    df = cache.get("k")
+    assert df["note"].isna().tolist() == [True, False] and df["note"][1] == "x"
+    assert df["cost"].tolist()[1] == 1.5
+    assert df["peak"].tolist() == [1.0, 2.5]
+
+
+def test_aborted_writer_leaves_no_entry(tmp_path):
+    cache = _cache(tmp_path)
+    writer = cache.writer("k")
+    writer.write(pd.DataFrame({"a": [1]}))
+    writer.abort()
+    assert cache.get("k") is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cache_key_ignores_storefront_and_column_order():
+    params = {"workspace_id": 1, "storefront_ids": [2, 1], "columns": ["b", "a"], "export_format": "csv"}
+    same = {"workspace_id": 1, "storefront_ids": [1, 2], "columns": ["a", "b"], "export_format": "xlsx"}
+    assert make_cache_key("kwl", "data", params) == make_cache_key("kwl", "data", same)
+    assert make_cache_key("kwl", "data", params) != make_cache_key("kwl", "data", params, limit=10)
+
+
+def test_iter_chunks_streams_an_entry(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put("k", pd.DataFrame({"a": range(5)}))
+    chunks = cache.iter_chunks("k", 2)
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert cache.iter_chunks("missing", 2) is None
+
+
+def test_entries_expire_after_the_ttl(tmp_path):
+    cache = _cache(tmp_path, ttl=60)
+    cache.put("k", pd.DataFrame({"a": [1]}))
+    path = cache._path("k")
+    old = time.time() - 120
+    os.utime(path, (old, old))
+    assert cache.get("k") is None
+    assert not os.path.exists(path)
+
+
+def test_least_recently_used_entry_is_evicted_first(tmp_path):
+    cache = _cache(tmp_path)
+    frame = pd.DataFrame({"a": range(100)})
+    cache.put("a", frame)
+    cache.put("b", frame)
+    size = os.path.getsize(cache._path("a"))
+    now = time.time()
+    os.utime(cache._path("a"), (now - 10, now))
+    os.utime(cache._path("b"), (now - 100, now))
+    cache.max_bytes = int(size * 2.5)
+    cache.put("c", frame)
+    assert cache.contains("a") and cache.contains("c")
+    assert not cache.contains("b")
@@ -0,0 +1,26 @@
+from sqlalchemy import create_engine, event
+from utils.cancellation import QueryRegistry
+
+
+def _engine(statements):
+    engine = create_engine("sqlite://", pool_size=1)
+    # Giả lập dialect hỗ trợ CONNECTION_ID() trên SQLite
+    engine.dialect.name = "mysql"
+    event.listen(engine, "connect", lambda dbapi_connection, record: dbapi_connection.create_function("CONNECTION_ID", 0, lambda: 42))
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    return engine
+
+
+def test_server_id_is_queried_once_per_pooled_connection():
+    statements = []
+    engine = _engine(statements)
+    registry = QueryRegistry(interval=60)
+    for _ in range(3):
+        with engine.connect() as connection:
+            assert registry._server_id(connection) == 42
+    assert len(statements) == 1
+    with engine.connect() as connection:
+        connection.invalidate()
+    with engine.connect() as connection:
+        assert registry._server_id(connection) == 42
+    assert len(statements) == 2
@@ -0,0 +1,37 @@
+from datetime import date
+from utils.dates import date_presets, split_date_range
+
+
+def test_range_within_one_month_is_a_single_shard():
+    assert split_date_range("2024-05-03", "2024-05-20") == [("2024-05-03", "2024-05-20")]
+
+
+def test_single_day():
+    assert split_date_range("2024-05-31", "2024-05-31") == [("2024-05-31", "2024-05-31")]
+
+
+def test_range_is_split_at_month_boundaries():
+    assert split_date_range("2024-01-15", "2024-03-10") == [
+        ("2024-01-15", "2024-01-31"),
+        ("2024-02-01", "2024-02-29"),
+        ("2024-03-01", "2024-03-10"),
+    ]
+
+
+def test_range_across_a_year_boundary():
+    assert split_date_range("2023-12-30", "2024-01-02") == [
+        ("2023-12-30", "2023-12-31"),
+        ("2024-01-01", "2024-01-02"),
+    ]
+
+
+def test_non_leap_february():
+    assert split_date_range("2023-02-01", "2023-03-01") == [("2023-02-01", "2023-02-28"), ("2023-03-01", "2023-03-01")]
+
+
+def test_empty_when_start_is_after_end():
+    assert split_date_range("2024-02-01", "2024-01-31") == []
+
+
+def test_last_month_preset_across_a_year_boundary():
+    assert date_presets(date(2024, 1, 10))["Last month"] == (date(2023, 12, 1), date(2023, 12, 31))
@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+import pytest
+from utils import delta
+from utils.delta import WatermarkStore, delta_key, plan_delta
+
+PARAMS = {"workspace_id": 1, "storefront_ids": [1002, 1001], "start_date": "2024-01-01", "end_date": "2024-06-30",
+          "columns": ["keyword"], "data_source": "kwl", "export_format": "csv"}
+
+
+@pytest.fixture(autouse=True)
+def settle_days(monkeypatch):
+    monkeypatch.setattr(delta, "PARTITION_SETTLE_DAYS", 2)
+
+
+def _manager(watermark):
+    return SimpleNamespace(data_source="kwl", get_watermark=lambda params: watermark)
+
+
+def test_key_ignores_dates_and_storefront_order_but_not_columns():
+    moved = {**PARAMS, "start_date": "2024-02-01", "storefront_ids": [1001, 1002], "export_format": "xlsx"}
+    assert delta_key("kwl", PARAMS) == delta_key("kwl", moved)
+    assert delta_key("kwl", PARAMS) != delta_key("kwl", {**PARAMS, "columns": ["keyword", "cost"]})
+
+
+def test_first_export_is_full(tmp_path):
+    plan = plan_delta(_manager("2024-03-10"), PARAMS, WatermarkStore(str(tmp_path / "w.json")))
+    assert plan["mode"] == "full"
+    assert plan["start_date"] == "2024-01-01"
+    assert plan["months"] == ["2024-01", "2024-02", "2024-03", "2024-04", "2024-05", "2024-06"]
+
+
+def test_new_data_recomputes_from_the_month_of_the_old_watermark(tmp_path):
+    store = WatermarkStore(str(tmp_path / "w.json"))
+    store.set(delta_key("kwl", PARAMS), {"watermark": "2024-03-01 10:00:00"})
+    plan = plan_delta(_manager("2024-04-15 08:00:00"), PARAMS, store)
+    assert plan["mode"] == "delta"
+    # Lùi PARTITION_SETTLE_DAYS ngày từ 2024-03-01 rơi vào tháng 2
+    assert plan["start_date"] == "2024-02-01"
+    assert plan["months"][0] == "2024-02"
+
+
+def test_unchanged_and_empty(tmp_path):
+    store = WatermarkStore(str(tmp_path / "w.json"))
+    store.set(delta_key("kwl", PARAMS), {"watermark": "2024-03-10"})
+    assert plan_delta(_manager("2024-03-10"), PARAMS, store)["mode"] == "unchanged"
+    assert plan_delta(_manager(None), PARAMS, store)["mode"] == "empty"
+
+
+def test_store_keeps_other_keys(tmp_path):
+    store = WatermarkStore(str(tmp_path / "w.json"))
+    store.set("a", {"watermark": "1"})
+    store.set("b", {"watermark": "2"})
+    assert store.get("a") == {"watermark": "1"}
+    assert WatermarkStore(store.path).get("b") == {"watermark": "2"}
@@ -0,0 +1,80 @@
+import gzip
+import io
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+import pytest
+from utils import export
+from utils.export import discard_spool, export_to_spool
+
+SCHEMA = {"storefront_id": "int", "cost": "float", "roas": "float32", "device_type": "category"}
+
+
+def _chunks():
+    # Chunk đầu: cột note toàn NULL, peak_gmv toàn số nguyên, cost toàn NULL
+    first = pd.DataFrame({
+        "storefront_id": [1, 2],
+        "device_type": pd.Categorical(["Mobile", "PC"]),
+        "note": [None, None],
+        "peak_gmv": [10, 20],
+        "cost": [np.nan, np.nan],
+        "roas": [1.0, 2.0],
+    })
+    second = pd.DataFrame({
+        "storefront_id": [3, 4],
+        "device_type": pd.Categorical(["PC", None]),
+        "note": ["a", None],
+        "peak_gmv": [1.5, None],
+        "cost": [2.5, 3.0],
+        "roas": [np.nan, 0.5],
+    })
+    return [first, second]
+
+
+@pytest.fixture(autouse=True)
+def spool_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_SPOOL_DIR", str(tmp_path))
+
+
+@pytest.mark.parametrize("export_format, read", [("parquet", pq.read_table), ("feather", feather.read_table)])
+def test_arrow_formats_accept_chunks_with_changing_types(export_format, read):
+    info = export_to_spool(iter(_chunks()), "kwl", export_format, SCHEMA)
+    try:
+        table = read(info["path"])
+        assert info["rows"] == table.num_rows == 4
+        df = table.to_pandas()
+        assert df["note"].tolist()[2] == "a"
+        assert df["peak_gmv"].tolist()[:3] == [10.0, 20.0, 1.5]
+        assert df["cost"].tolist()[2:] == [2.5, 3.0]
+        assert str(table.schema.field("storefront_id").type) == "int64"
+        assert str(table.schema.field("roas").type) == "double"
+    finally:
+        discard_spool(info)
+
+
+def test_csv_gz_writes_one_header():
+    info = export_to_spool(iter(_chunks()), "kwl", "csv.gz", SCHEMA)
+    try:
+        with gzip.open(info["path"], "rb") as f:
+            df = pd.read_csv(io.BytesIO(f.read()), encoding="utf-8-sig")
+        assert list(df.columns) == list(_chunks()[0].columns)
+        assert df["storefront_id"].tolist() == [1, 2, 3, 4]
+    finally:
+        discard_spool(info)
+
+
+def test_failed_export_removes_the_spool_file(tmp_path):
+    def chunks():
+        yield _chunks()[0]
+        raise RuntimeError("boom")
+    with pytest.raises(RuntimeError):
+        export_to_spool(chunks(), "kwl", "parquet", SCHEMA)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_xlsx_rejects_more_rows_than_a_sheet_holds(monkeypatch):
+    pytest.importorskip("xlsxwriter")
+    monkeypatch.setattr(export, "XLSX_MAX_ROWS", 3)
+    with pytest.raises(ValueError):
+        export_to_spool(iter(_chunks()), "kwl", "xlsx", SCHEMA)
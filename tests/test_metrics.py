@@ -0,0 +1,32 @@
+import time
+from utils.metrics import MetricsRecorder
+
+
+def test_stage_records_rss_delta_and_process_peak():
+    recorder = MetricsRecorder()
+    with recorder.stage("encode", "kwl") as record:
+        record["rows"] = 3
+    (record,) = recorder.records
+    assert record["status"] == "ok" and record["rows"] == 3
+    assert "rss_delta_mb" in record and "process_peak_rss_mb" in record
+
+
+def test_prometheus_file_is_rewritten_at_most_once_per_interval(tmp_path, monkeypatch):
+    prom_path = tmp_path / "export.prom"
+    recorder = MetricsRecorder(prom_path=str(prom_path), prom_interval=60)
+    writes = []
+    to_prometheus = recorder.to_prometheus
+    monkeypatch.setattr(recorder, "to_prometheus", lambda: writes.append(1) or to_prometheus())
+    for _ in range(20):
+        recorder.add({"stage": "encode", "data_source": "kwl", "wall_ms": 1.0})
+    deadline = time.monotonic() + 5
+    while not prom_path.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.1)
+    assert len(writes) == 1
+    assert 'export_stage_duration_ms_count{stage="encode",data_source="kwl"}' in prom_path.read_text()
+    assert [p.name for p in tmp_path.iterdir()] == ["export.prom"]
+    # Bản ghi mới chỉ hẹn một lần ghi tiếp theo sau prom_interval
+    recorder.add({"stage": "encode", "data_source": "kwl", "wall_ms": 1.0})
+    assert recorder._prom_timer is not None
+    recorder._prom_timer.cancel()
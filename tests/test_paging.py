@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.managers import DataManager
+
+
+def _params(standin, data_source):
+    params = dict(standin)
+    if data_source == 'kw_pfm':
+        params.update(device_type=None, display_type=None, product_position=None)
+    return params
+
+
+def _keys(df, keys):
+    return [tuple(None if pd.isna(v) else v for v in row) for row in df[list(keys)].itertuples(index=False, name=None)]
+
+
+def _walk(data_manager, params, page_size):
+    pages, cursor = [], None
+    while True:
+        df, cursor = data_manager.get_page(params, cursor, page_size)
+        pages.append(df)
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("data_source", ["kwl", "kw_pfm", "pt"])
+@pytest.mark.parametrize("cached", [False, True], ids=["sql", "cached"])
+def test_pages_cover_every_row_once_in_key_order(standin, data_source, cached, monkeypatch):
+    data_manager = DataManager(data_source)
+    params = _params(standin, data_source)
+    keys = data_manager.page_key
+    full = data_manager.get_data(params)
+    assert len(full) > 20
+    if cached:
+        assert data_manager._cached_result(params) is not None
+    else:
+        monkeypatch.setattr(data_manager, "_cached_result", lambda params: None)
+    pages = _walk(data_manager, params, 7)
+    seen = [key for page in pages for key in _keys(page, keys)]
+    assert len(seen) == len(full) == len(set(seen))
+    assert set(seen) == set(_keys(full, keys))
+    assert seen == sorted(seen)
+    assert all(len(page) == 7 for page in pages[:-1])
+
+
+def test_frame_paging_puts_null_keys_first(standin):
+    data_manager = DataManager("pt")
+    keys = list(data_manager.page_key)
+    df = pd.DataFrame({key: ["a", "b", None, "a", None] for key in keys})
+    df[keys[-1]] = ["x", "y", "z", None, None]
+    df["value"] = np.arange(5)
+    rows, cursor = [], None
+    while True:
+        page = data_manager._page_from_frame(df, cursor, 2)
+        rows.extend(page["value"].tolist())
+        if len(page) < 2:
+            break
+        cursor = tuple(None if pd.isna(v) else v for v in page.iloc[-1][keys])
+    assert sorted(rows) == [0, 1, 2, 3, 4]
+    assert rows[:2] == [4, 2]
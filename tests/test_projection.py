@@ -0,0 +1,66 @@
+import pytest
+from data_logic import kw_pfm_data, kwl_data, product_tracking_data
+from data_logic.registry import _PARAM_RE
+from utils.projection import filter_names, project_query, select_columns, specialize_filters
+
+MODULES = {"kwl": kwl_data, "kw_pfm": kw_pfm_data, "pt": product_tracking_data}
+
+
+@pytest.mark.parametrize("data_source", sorted(MODULES))
+def test_projection_keeps_selected_columns_in_sql_order(data_source):
+    module = MODULES[data_source]
+    columns = module.COLUMNS
+    assert columns
+    chosen = [columns[-1], columns[0]]
+    sql = project_query(module.query_params["data"], chosen, module.COLUMN_BLOCKS)
+    assert select_columns(sql) == [columns[0], columns[-1]]
+    # Bỏ cột không được làm mất tham số cần bind
+    assert set(_PARAM_RE.findall(sql)) <= set(_PARAM_RE.findall(module.query_params["data"]))
+
+
+@pytest.mark.parametrize("data_source", sorted(MODULES))
+def test_projection_without_columns_returns_the_full_query(data_source):
+    module = MODULES[data_source]
+    assert project_query(module.query_params["data"], None, module.COLUMN_BLOCKS) == module.query_params["data"]
+
+
+@pytest.mark.parametrize("data_source", sorted(MODULES))
+def test_blocks_are_kept_only_when_a_dependent_column_is_selected(data_source):
+    module = MODULES[data_source]
+    sql = module.query_params["data"]
+    for block, depends in module.COLUMN_BLOCKS.items():
+        independent = [c for c in module.COLUMNS if c not in depends][:2]
+        without = project_query(sql, independent, module.COLUMN_BLOCKS)
+        assert f"block:{block}:begin" not in without
+        with_block = project_query(sql, independent + [depends[0]], module.COLUMN_BLOCKS)
+        assert with_block.count(f"block:{block}:begin") == sql.count(f"block:{block}:begin")
+
+
+def test_kw_pfm_drops_ads_metrics_without_ads_columns():
+    sql = project_query(kw_pfm_data.query_params["data"], ["keyword", "search_volume"], kw_pfm_data.COLUMN_BLOCKS)
+    assert "ads_metrics" not in sql
+    assert "onsite_storefront_keyword_ads_performance" not in sql
+
+
+def test_unknown_column_is_rejected():
+    with pytest.raises(ValueError):
+        project_query(kwl_data.query_params["data"], ["not_a_column"], kwl_data.COLUMN_BLOCKS)
+
+
+def test_kw_pfm_declares_its_optional_filters():
+    expected = {"device_type", "display_type", "product_position"}
+    assert filter_names(kw_pfm_data.query_params["data"]) == expected
+    assert filter_names(kw_pfm_data.query_params["count"]) == expected
+    assert filter_names(kwl_data.query_params["data"]) == set()
+
+
+@pytest.mark.parametrize("query_type", ["data", "count"])
+def test_specialize_filters_drops_inactive_filter_lines(query_type):
+    sql = kw_pfm_data.query_params[query_type]
+    none = specialize_filters(sql, ())
+    assert "filter:" not in none
+    assert not {"device_type", "display_type", "product_position"} & set(_PARAM_RE.findall(none))
+    one = specialize_filters(sql, ("device_type",))
+    assert "AND s.device_type = :device_type" in one
+    assert ":display_type" not in one and ":product_position" not in one
+    assert specialize_filters(sql, ("device_type", "display_type", "product_position")) == sql
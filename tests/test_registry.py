@@ -0,0 +1,58 @@
+from data_logic.registry import LIMIT_PARAM, StatementRegistry, bind_list_params, bucket_size, expand_list_params
+
+
+def test_bucket_size_rounds_up_to_power_of_two():
+    assert [bucket_size(n) for n in (0, 1, 2, 3, 4, 5, 8, 9)] == [1, 1, 2, 4, 4, 8, 8, 16]
+
+
+def test_expand_list_params_only_touches_the_named_parameter():
+    sql = "WHERE id IN :ids AND other = :ids_extra AND cast_col = x::ids"
+    assert expand_list_params(sql, {"ids": 4}) == (
+        "WHERE id IN (:ids_0, :ids_1, :ids_2, :ids_3) AND other = :ids_extra AND cast_col = x::ids"
+    )
+
+
+def test_bind_list_params_pads_with_the_last_value():
+    bound = bind_list_params({"ids": [7, 8, 9], "ws": 1}, {"ids": 4})
+    assert bound == {"ws": 1, "ids_0": 7, "ids_1": 8, "ids_2": 9, "ids_3": 9}
+
+
+def _registry():
+    registry = StatementRegistry(max_statements=8)
+    registry.register("src", {
+        "data": "SELECT * FROM t\nWHERE id IN :ids\n  AND ws = :ws\n  AND kind = :kind -- filter:kind\n",
+    })
+    return registry
+
+
+def test_compile_binds_only_parameters_used_by_the_sql():
+    sql, bound = _registry().compile("src", "data", {"ids": [1, 2, 3], "ws": 5, "kind": "a", "columns": ["x"], "extra": 1})
+    assert "id IN (:ids_0, :ids_1, :ids_2, :ids_3)" in sql
+    assert bound == {"ws": 5, "kind": "a", "ids_0": 1, "ids_1": 2, "ids_2": 3, "ids_3": 3}
+
+
+def test_limit_is_bound_not_inlined():
+    sql, bound = _registry().compile("src", "data", {"ids": [1], "ws": 5, "kind": "a"}, limit=100)
+    assert sql.endswith(f" LIMIT :{LIMIT_PARAM}")
+    assert bound[LIMIT_PARAM] == 100
+
+
+def test_statements_are_reused_per_bucket():
+    registry = _registry()
+    first, _ = registry.statement("src", "data", {"ids": [1, 2, 3], "ws": 5, "kind": "a"})
+    same_bucket, bound = registry.statement("src", "data", {"ids": [4, 5, 6, 7], "ws": 6, "kind": "b"})
+    other_bucket, _ = registry.statement("src", "data", {"ids": [1], "ws": 5, "kind": "a"})
+    assert first is same_bucket
+    assert other_bucket is not first
+    assert bound["ids_3"] == 7
+    assert registry.stats() == {"statements": 2, "hits": 1, "misses": 2}
+
+
+def test_inactive_filter_is_dropped_from_the_statement():
+    registry = _registry()
+    sql, bound = registry.compile("src", "data", {"ids": [1], "ws": 5, "kind": None})
+    assert ":kind" not in sql
+    assert "kind" not in bound
+    filtered, _ = registry.compile("src", "data", {"ids": [1], "ws": 5, "kind": "a"})
+    assert "AND kind = :kind" in filtered
+    assert registry.stats()["statements"] == 2
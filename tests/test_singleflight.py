@@ -0,0 +1,45 @@
+import threading
+import time
+from utils.singleflight import SingleFlight
+
+
+def test_second_caller_waits_for_the_first(tmp_path):
+    flight = SingleFlight(str(tmp_path))
+    order, entered = [], threading.Event()
+
+    def leader():
+        with flight.exclusive("k"):
+            entered.set()
+            time.sleep(0.1)
+            order.append("leader")
+
+    thread = threading.Thread(target=leader)
+    thread.start()
+    entered.wait()
+    with flight.exclusive("k"):
+        order.append("follower")
+    thread.join()
+    assert order == ["leader", "follower"]
+    assert flight.waits >= 1
+    assert flight._locks == {}
+
+
+def test_different_keys_do_not_wait(tmp_path):
+    flight = SingleFlight(str(tmp_path))
+    with flight.exclusive("a"):
+        with flight.exclusive("b"):
+            pass
+    assert flight.waits == 0
+
+
+def test_lock_is_released_when_the_body_raises(tmp_path):
+    flight = SingleFlight(str(tmp_path))
+    try:
+        with flight.exclusive("k"):
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert flight._locks == {}
+    with flight.exclusive("k"):
+        pass
+    assert flight.waits == 0
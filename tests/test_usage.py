@@ -0,0 +1,36 @@
+import json
+import time
+from utils import usage as usage_module
+from utils.usage import UsageLog
+
+PARAMS = {"workspace_id": 1, "storefront_ids": [1002, 1001], "columns": ["keyword"], "start_date": "2024-01-01"}
+
+
+def _write(path, timestamps):
+    with open(path, "w", encoding="utf-8") as f:
+        for ts in timestamps:
+            f.write(json.dumps({"timestamp": ts, "data_source": "kwl", "preset": "Last 7 days"}) + "\n")
+        f.write("not json\n")
+
+
+def test_read_stops_at_the_first_entry_older_than_since(tmp_path, monkeypatch):
+    monkeypatch.setattr(usage_module, "_READ_BLOCK", 64)
+    path = tmp_path / "usage.jsonl"
+    _write(path, range(100))
+    log = UsageLog(str(path))
+    assert [e["timestamp"] for e in log.read(since=95)] == [95, 96, 97, 98, 99]
+    assert len(log.read()) == 100
+
+
+def test_log_is_compacted_to_the_recent_window(tmp_path):
+    path = tmp_path / "usage.jsonl"
+    old = time.time() - 100 * 86400
+    _write(path, [old] * 50)
+    log = UsageLog(str(path), max_bytes=4096, lookback_days=35)
+    for _ in range(60):
+        log.record("kwl", PARAMS, preset="Last 7 days")
+    assert path.stat().st_size <= 4096
+    entries = log.read()
+    assert entries and all(e["timestamp"] > old for e in entries)
+    assert log.top(5)[0][1]["storefront_ids"] == [1001, 1002]
+    assert [p.name for p in tmp_path.iterdir()] == ["usage.jsonl"]
@@ -0,0 +1,20 @@
+from datetime import date
+from utils.managers import ValidationManager
+
+
+def _errors(start, end):
+    return ValidationManager("1", "1001", start, end).validate()
+
+
+def test_twelve_calendar_months_are_allowed():
+    assert _errors(date(2023, 2, 1), date(2024, 1, 31)) == []
+
+
+def test_same_month_of_two_years_is_rejected():
+    # Kết quả group theo month(...) sẽ gộp tháng 1/2023 và tháng 1/2024 thành một dòng
+    assert _errors(date(2023, 1, 15), date(2024, 1, 14)) == ["The period can cover at most 12 calendar months."]
+    assert _errors(date(2023, 1, 31), date(2024, 1, 1)) == ["The period can cover at most 12 calendar months."]
+
+
+def test_start_after_end_is_rejected():
+    assert _errors(date(2024, 2, 1), date(2024, 1, 1)) == ["Start date cannot be after end date."]
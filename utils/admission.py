@@ -0,0 +1,118 @@
+# utils/admission.py
+import threading
+from utils.config import (
+    SMALL_EXPORT_ROWS, MAX_EXPORT_ROWS, LARGE_EXPORT_WORKERS, SHARD_WORKERS, ADMISSION_BUSY_RATIO,
+    DOWNGRADE_BYTES, PROCESS_MEMORY_BUDGET
+)
+from utils.dates import split_date_range
+from utils.export import XLSX_MAX_ROWS
+from utils.metrics import current_rss_bytes as _rss_bytes
+
+# Trọng số của lần quan sát mới khi cập nhật ước lượng (trung bình trượt theo hàm mũ)
+_EWMA_WEIGHT = 0.3
+
+
+class Decision:
+    """Kết quả tiếp nhận một export: hành động, lane chạy, định dạng và mức song song được phép."""
+    ADMIT, QUEUE, SHARD, DOWNGRADE, REJECT = 'admit', 'queue', 'shard', 'downgrade', 'reject'
+
+    def __init__(self, action: str, lane: str, estimated_rows: int, estimated_bytes: int, export_format: str,
+                 shard_workers: int = SHARD_WORKERS, reason: str = ""):
+        self.action = action
+        self.lane = lane
+        self.estimated_rows = estimated_rows
+        self.estimated_bytes = estimated_bytes
+        self.export_format = export_format
+        self.shard_workers = shard_workers
+        self.reason = reason
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+
+class AdmissionController:
+    """
+    Ước tính chi phí của một export (số dòng x độ rộng dòng của nguồn dữ liệu) và so với tải hiện tại
+    (job đang chạy theo lane, mức sử dụng connection pool, bộ nhớ process) để quyết định:
+    chạy ngay, xếp hàng ở lane lớn, chia shard, hạ cấp (định dạng nén) hoặc từ chối.
+    """
+    def __init__(self):
+        self._rates = {}       # data_source -> số dòng / (storefront x kỳ)
+        self._row_bytes = {}   # data_source -> số byte / dòng
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _periods(module, params: dict) -> int:
+        """Số kỳ dữ liệu: số tháng với nguồn group theo tháng, ngược lại là 1."""
+        if getattr(module, 'PERIOD', getattr(module, 'SHARD_BY', None)) == "month":
+            return len(split_date_range(params['start_date'], params['end_date']))
+        return 1
+
+    def estimate(self, data_source: str, module, params: dict, num_rows: int = None):
+        """Trả về (số dòng, số byte) ước tính; dùng số dòng thực tế nếu đã đếm."""
+        with self._lock:
+            rate = self._rates.get(data_source, getattr(module, 'EST_ROWS_PER_STOREFRONT', 1000))
+            row_bytes = self._row_bytes.get(data_source, getattr(module, 'AVG_ROW_BYTES', 300))
+        if num_rows is None:
+            num_rows = int(rate * len(params.get('storefront_ids', [])) * self._periods(module, params))
+        columns = params.get('columns')
+        if columns and getattr(module, 'COLUMNS', None):
+            row_bytes = row_bytes * len(columns) / len(module.COLUMNS)
+        return num_rows, int(num_rows * row_bytes)
+
+    def observe(self, data_source: str, module, params: dict, num_rows: int, num_bytes: int = None):
+        """Cập nhật ước lượng theo kết quả thực tế của một lần export đầy đủ."""
+        units = len(params.get('storefront_ids', [])) * self._periods(module, params)
+        with self._lock:
+            if units:
+                rate = num_rows / units
+                previous = self._rates.get(data_source)
+                self._rates[data_source] = rate if previous is None else (1 - _EWMA_WEIGHT) * previous + _EWMA_WEIGHT * rate
+            if num_rows and num_bytes:
+                row_bytes = num_bytes / num_rows
+                if params.get('columns') and getattr(module, 'COLUMNS', None):
+                    row_bytes = row_bytes * len(module.COLUMNS) / len(params['columns'])
+                previous = self._row_bytes.get(data_source)
+                self._row_bytes[data_source] = row_bytes if previous is None else (1 - _EWMA_WEIGHT) * previous + _EWMA_WEIGHT * row_bytes
+
+    def decide(self, data_source: str, module, params: dict, load: dict, num_rows: int = None) -> Decision:
+        """
+        `load`: {'large_active': job lớn đang chạy/chờ, 'pool_ratio': tỉ lệ kết nối đang dùng}.
+        `num_rows`: số dòng thực tế nếu đã đếm, nếu không sẽ ước tính.
+        """
+        rows, size = self.estimate(data_source, module, params, num_rows)
+        export_format = params.get('export_format', 'csv')
+        if rows > MAX_EXPORT_ROWS and num_rows is not None:
+            return Decision(Decision.REJECT, 'large', rows, size, export_format,
+                            reason=f"Data is too large ({rows:,} rows). The limit is {MAX_EXPORT_ROWS:,} rows.")
+        if rows <= SMALL_EXPORT_ROWS:
+            return Decision(Decision.ADMIT, 'small', rows, size, export_format)
+
+        rss = _rss_bytes()
+        memory_ratio = rss / PROCESS_MEMORY_BUDGET if rss and PROCESS_MEMORY_BUDGET else 0
+        busy = (
+            load.get('large_active', 0) >= LARGE_EXPORT_WORKERS
+            or load.get('pool_ratio', 0) >= ADMISSION_BUSY_RATIO
+            or memory_ratio >= ADMISSION_BUSY_RATIO
+        )
+        action, reasons = Decision.ADMIT, []
+        shard_workers = SHARD_WORKERS
+        if busy:
+            # Export lớn vẫn được nhận nhưng chờ ở lane lớn và chạy shard tuần tự để không chiếm pool
+            action, shard_workers = Decision.QUEUE, 1
+            reasons.append("the server is busy, so this large export will wait for capacity")
+        elif self._periods(module, params) > 1:
+            action = Decision.SHARD
+        if size > DOWNGRADE_BYTES or memory_ratio >= ADMISSION_BUSY_RATIO:
+            if export_format in ('csv', 'xlsx'):
+                export_format = 'csv.gz'
+                reasons.append("the file is written as gzip-compressed CSV to keep it small")
+            action = Decision.DOWNGRADE if action != Decision.QUEUE else action
+        elif export_format == 'xlsx' and rows > XLSX_MAX_ROWS:
+            export_format, action = 'csv.gz', Decision.DOWNGRADE
+            reasons.append("the result exceeds the Excel row limit, so it is written as gzip-compressed CSV")
+        reason = f"Large export (~{rows:,} rows): " + "; ".join(reasons) + "." if reasons else ""
+        return Decision(action, 'large', rows, size, export_format, shard_workers, reason)
+
+
+admission = AdmissionController()
@@ -2,6 +2,15 @@
 import streamlit as st
 import os
 import base64
+import time
+from utils.cache import result_cache, partition_cache
+from utils.metrics import metrics
+from utils.singleflight import single_flight
+from utils.governor import governor
+from utils.cancellation import query_registry
+from utils.database import DatabaseManager
+from utils.plans import slow_queries
+from data_logic.registry import statements
 
 class Authenticator:
     """Xử lý logic đăng nhập/đăng xuất và chế độ nhà phát triển."""
@@ -52,6 +61,22 @@ class Authenticator:
                 st.session_state.dev_logs = []
                 st.session_state.dev_mode_activated = False
                 st.rerun()
+
+            cache_stats = result_cache.stats()
+            st.sidebar.caption(f"Result cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses")
+            partition_stats = partition_cache.stats()
+            st.sidebar.caption(f"Partition cache: {partition_stats['hits']} hits / {partition_stats['misses']} misses")
+            st.sidebar.caption(f"Coalesced queries (waited on an identical in-flight query): {single_flight.waits}")
+            if DatabaseManager._instance is not None:
+                pool = DatabaseManager._instance.pool_stats()
+                st.sidebar.caption(f"DB pool: {pool['checked_out']}/{pool['max_connections']} checked out, {pool['overflow']} overflow, {pool['connects']} connects, {pool['invalidations']} invalidated")
+            statement_stats = statements.stats()
+            st.sidebar.caption(f"Compiled statements: {statement_stats['statements']} cached, {statement_stats['hits']} reused / {statement_stats['misses']} compiled")
+            st.sidebar.caption(f"Running queries: {len(query_registry.running())}, killed: {query_registry.killed}")
+            memory_stats = governor.stats()
+            st.sidebar.caption(f"Session data: {memory_stats['sessions']} sessions, {memory_stats['memory_bytes'] / 1024 ** 2:.1f} MB in memory, {memory_stats['disk_bytes'] / 1024 ** 2:.1f} MB spilled/spooled")
+            self._render_performance()
+            self._render_slow_queries()
                 
             if not st.session_state.get('dev_logs'):
                 st.sidebar.info("No technical errors have been logged.")
@@ -59,4 +84,36 @@ class Authenticator:
                 for log in st.session_state.dev_logs:
                     with st.sidebar.expander(f"**{log['timestamp']} - {log['error_type']}**"):
                         st.error(log['message'])
-                        st.code(log['traceback'], language='python')
\ No newline at end of file
+                        st.code(log['traceback'], language='python')
+
+    def _render_performance(self):
+        """Hiển thị thời gian từng bước export (p50/p95) và cho phép tải số liệu về."""
+        with st.sidebar.expander("⏱️ Export Performance"):
+            summary = metrics.summary()
+            if not summary:
+                st.caption("No export activity recorded yet.")
+                return
+            st.dataframe(summary, hide_index=True)
+            st.download_button("Download JSON lines", metrics.to_jsonl(), file_name="export_metrics.jsonl", mime="application/x-ndjson")
+            st.download_button("Download Prometheus text", metrics.to_prometheus(), file_name="export_metrics.prom", mime="text/plain")
+
+    def _render_slow_queries(self):
+        """Các truy vấn chậm gần nhất; EXPLAIN plan chỉ được lấy khi bấm xem."""
+        with st.sidebar.expander("🐢 Slow Queries"):
+            entries = slow_queries.entries()
+            if not entries:
+                st.caption(f"No query slower than {slow_queries.threshold:g}s recorded yet.")
+                return
+            for i, entry in enumerate(entries):
+                st.caption(f"{time.strftime('%H:%M:%S', time.localtime(entry['timestamp']))} - {entry['data_source']} {entry['query_type']}: {entry['seconds']}s")
+                if 'plan' in entry or st.button("Show plan", key=f"slow_query_plan_{i}_{entry['timestamp']}"):
+                    try:
+                        plan = slow_queries.explain(entry)
+                    except Exception as e:
+                        st.error(f"Could not get the plan: {e}")
+                        continue
+                    for finding in plan['findings']:
+                        st.warning(finding.replace('_', ' ').replace(':', ' on ', 1))
+                    if plan['cost'] is not None:
+                        st.caption(f"Estimated cost: {plan['cost']:,.0f}")
+                    st.code("\n".join(plan['raw']), language='text')
@@ -0,0 +1,163 @@
+# utils/batch.py
+import hashlib
+import json
+import os
+import shutil
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing
+from datetime import date
+from utils.config import MAX_EXPORT_ROWS, EXPORT_WORKERS, DELTA_STATE_PATH
+from utils.delta import WatermarkStore, plan_delta, write_manifest
+from utils.export import EXPORT_FORMATS, export_to_spool, discard_spool
+from utils.managers import ValidationManager, DataManager, ExportTooLargeError, build_params
+from utils.database import DatabaseManager, DatabaseConfigError
+
+class BatchJob:
+    """Một dòng trong manifest: một lần export cho một workspace/nguồn dữ liệu."""
+    def __init__(self, spec: dict):
+        self.spec = spec
+        self.data_source = spec.get('data_source')
+        self.name = spec.get('name')
+        storefronts = spec.get('storefront_ids', '')
+        if isinstance(storefronts, (list, tuple)):
+            storefronts = ",".join(str(s) for s in storefronts)
+        self.inputs = {
+            "workspace_id": str(spec.get('workspace_id', '')),
+            "storefront_input": str(storefronts),
+            "start_date": _parse_date(spec.get('start_date')),
+            "end_date": _parse_date(spec.get('end_date')),
+            "export_format": spec.get('export_format', 'csv'),
+            "options": spec.get('options', {}),
+            "columns": spec.get('columns', []),
+        }
+
+    def file_name(self, start_date=None, end_date=None) -> str:
+        """
+        Tên file export. Export delta truyền khoảng ngày thực tế để mỗi lần chạy ra một file mới (không ghi đè).
+        Tên mặc định kèm digest của storefront/cột/bộ lọc để các job cùng workspace và khoảng ngày không trùng tên.
+        """
+        extension = EXPORT_FORMATS.get(self.inputs['export_format'], (None, "", None))[1]
+        if self.name:
+            return f"{self.name}_{start_date}_{end_date}{extension}" if start_date else f"{self.name}{extension}"
+        ws = self.inputs['workspace_id']
+        return f"{self.data_source}_ws{ws}_{start_date or self.inputs['start_date']}_{end_date or self.inputs['end_date']}_{self.digest()}{extension}"
+
+    def digest(self) -> str:
+        scope = {
+            "storefront_ids": sorted(s.strip() for s in self.inputs['storefront_input'].split(',') if s.strip()),
+            "columns": sorted(self.inputs['columns'] or []),
+            "options": self.inputs['options'] or {},
+        }
+        return hashlib.sha256(json.dumps(scope, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:8]
+
+
+def _parse_date(value):
+    if isinstance(value, date) or value is None:
+        return value
+    return date.fromisoformat(str(value))
+
+def load_manifest(path: str):
+    """
+    Đọc manifest JSON: một danh sách job, hoặc {"defaults": {...}, "jobs": [...]}
+    (giá trị trong "defaults" được áp dụng cho mọi job chưa khai báo).
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if isinstance(manifest, list):
+        manifest = {"jobs": manifest}
+    defaults = manifest.get('defaults', {})
+    jobs = [BatchJob({**defaults, **spec}) for spec in manifest.get('jobs', [])]
+    # Hai job cùng tên file sẽ ghi đè lên nhau trong thư mục output
+    names = [job.file_name() for job in jobs]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Several jobs would write the same file: {', '.join(duplicates)}. Give them different \"name\" values.")
+    return jobs
+
+def _capped(chunks, max_rows: int):
+    rows = 0
+    for chunk in chunks:
+        rows += len(chunk)
+        if rows > max_rows:
+            raise ExportTooLargeError(rows)
+        yield chunk
+
+def run_job(job: BatchJob, output_dir: str, max_rows: int = MAX_EXPORT_ROWS, watermarks: WatermarkStore = None) -> dict:
+    """
+    Xác thực và export một job ra thư mục output. Trả về kết quả (không ném lỗi).
+    Có `watermarks`: export delta, chỉ lấy phần dữ liệu mới so với lần export trước (xem utils/delta.py).
+    """
+    result = {"name": job.file_name(), "data_source": job.data_source, "spec": job.spec}
+    started = time.perf_counter()
+    try:
+        if job.data_source not in DataManager.MODULE_MAP:
+            raise ValueError(f"Unknown data source: {job.data_source}")
+        if job.inputs['export_format'] not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {job.inputs['export_format']}")
+        if job.inputs['start_date'] is None or job.inputs['end_date'] is None:
+            raise ValueError("start_date and end_date are required.")
+        inputs = job.inputs
+        errors = ValidationManager(inputs['workspace_id'], inputs['storefront_input'], inputs['start_date'], inputs['end_date'], job.data_source).validate()
+        if errors:
+            raise ValueError(" ".join(errors))
+        params = build_params(job.data_source, inputs)
+        data_manager = DataManager(job.data_source)
+        plan = None
+        if watermarks is not None:
+            if not data_manager.supports_delta():
+                raise ValueError(f"Data source '{job.data_source}' does not support delta exports.")
+            plan = plan_delta(data_manager, params, watermarks)
+            result.update(mode=plan['mode'], watermark=plan['watermark'])
+            if plan['mode'] in ('unchanged', 'empty'):
+                result.update(status=plan['mode'], rows=0)
+                result['seconds'] = round(time.perf_counter() - started, 2)
+                return result
+            params = {**params, 'start_date': plan['start_date']}
+            # Watermark vừa được đọc từ CSDL: dữ liệu chưa chốt trong result cache có thể cũ hơn và thiếu các dòng mới
+            data_manager.refresh = True
+        with closing(data_manager.iter_data(params)) as chunks:
+            info = export_to_spool(_capped(chunks, max_rows), job.data_source, inputs['export_format'], data_manager.schema)
+        if info['rows'] == 0:
+            discard_spool(info)
+            result.update(status="empty", rows=0)
+        else:
+            file_name = job.file_name(params['start_date'], params['end_date']) if plan else job.file_name()
+            path = os.path.join(output_dir, file_name)
+            shutil.move(info['path'], path)
+            result.update(name=file_name, status="ok", rows=info['rows'], size=info['size'], path=path)
+            if plan:
+                result['manifest'] = path + ".manifest.json"
+                write_manifest(result['manifest'], plan, params, file_name, info['rows'])
+                # Chỉ lưu watermark sau khi file và manifest đã được ghi xong
+                watermarks.set(plan['key'], {"watermark": plan['watermark'], "file": file_name, "exported_at": time.strftime("%Y-%m-%dT%H:%M:%S")})
+    except Exception as e:
+        result.update(status="failed", error=f"{type(e).__name__}: {e}", traceback=traceback.format_exc())
+    result['seconds'] = round(time.perf_counter() - started, 2)
+    return result
+
+def run_batch(jobs: list, output_dir: str, workers: int = EXPORT_WORKERS, max_rows: int = MAX_EXPORT_ROWS, on_result=None,
+              delta: bool = False, state_path: str = DELTA_STATE_PATH) -> list:
+    """
+    Chạy các job song song (tối đa `workers` job cùng lúc) và ghi summary.json vào thư mục output.
+    `delta`: export delta cho mọi job (hoặc từng job khai báo "delta": true trong manifest), watermark lưu ở `state_path`.
+    """
+    watermarks = WatermarkStore(state_path)
+    os.makedirs(output_dir, exist_ok=True)
+    try:
+        # Mở sẵn đủ kết nối cho các worker trước khi chạy job đầu tiên
+        DatabaseManager().warm_up(workers)
+    except DatabaseConfigError:
+        pass  # Mỗi job sẽ báo lỗi cấu hình trong summary
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [executor.submit(run_job, job, output_dir, max_rows, watermarks if job.spec.get('delta', delta) else None) for job in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if on_result:
+                on_result(result)
+    with open(os.path.join(output_dir, "summary.json"), 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, default=str)
+    return results
@@ -0,0 +1,131 @@
+# utils/bundle.py
+import os
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing
+from utils.config import EXPORT_SPOOL_DIR, MAX_EXPORT_ROWS
+from utils.admission import admission, Decision
+from utils.cancellation import current_owner, owned_by, query_registry
+from utils.export import export_to_spool, discard_spool
+from utils.jobs import Job
+from utils.managers import DataManager, ExportTooLargeError, build_params, current_load
+from utils.metrics import metrics
+
+# Các nguồn có thể gộp trong một bundle, theo thứ tự hiển thị
+BUNDLE_SOURCES = {'kwl': "Keyword Lab", 'kw_pfm': "Keyword Performance", 'pt': "Product Tracking"}
+# Định dạng đã được nén sẵn: thêm vào zip nguyên trạng, không nén lại
+_COMPRESSED_FORMATS = ('csv.gz', 'csv.zst', 'parquet', 'feather', 'xlsx')
+
+class BundleExport:
+    """
+    Export nhiều nguồn dữ liệu cho cùng một bộ đầu vào (workspace, storefront, khoảng ngày).
+    Các nguồn được truy vấn song song, mỗi nguồn ghi ra một file spool riêng và được đưa vào
+    một file zip ngay khi xong, nên tổng thời gian gần bằng nguồn chậm nhất thay vì tổng các nguồn.
+    """
+
+    def __init__(self, data_sources: list, inputs: dict):
+        unknown = [s for s in data_sources if s not in DataManager.MODULE_MAP]
+        if unknown:
+            raise ValueError(f"Unknown data source(s): {', '.join(unknown)}")
+        self.data_sources = list(data_sources)
+        self.inputs = inputs
+        # Bộ lọc riêng của kw_pfm (device/display/position) chỉ áp dụng cho kw_pfm
+        self.params = {
+            source: build_params(source, {**inputs, 'options': inputs.get('options', {}) if source == 'kw_pfm' else {}})
+            for source in self.data_sources
+        }
+        self.decisions = {}
+
+    def admit(self) -> Decision:
+        """
+        Tiếp nhận từng nguồn qua AdmissionController. Trả về quyết định của nguồn "nặng" nhất:
+        bundle bị từ chối nếu một nguồn bị từ chối, chạy ở lane lớn nếu có một nguồn lớn.
+        """
+        load = current_load()
+        for source in self.data_sources:
+            # Số dòng đã có trong cache cho phép từ chối nguồn quá lớn trước khi stream
+            num_rows = DataManager(source).cached_count(self.params[source])
+            decision = admission.decide(source, DataManager.MODULE_MAP[source], self.params[source], load, num_rows)
+            self.decisions[source] = decision
+            if decision.action != Decision.REJECT:
+                self.params[source]['export_format'] = decision.export_format
+        rejected = [d for d in self.decisions.values() if d.action == Decision.REJECT]
+        if rejected:
+            return rejected[0]
+        large = [d for d in self.decisions.values() if d.lane == 'large']
+        return max(large or self.decisions.values(), key=lambda d: d.estimated_rows)
+
+    def file_name(self) -> str:
+        params = next(iter(self.params.values()))
+        return f"bundle_ws{params['workspace_id']}_{params['start_date']}_{params['end_date']}.zip"
+
+    def run(self, job: Job) -> dict:
+        """Chạy bundle trong job nền; trả về thông tin download của file zip (như export_to_spool)."""
+        os.makedirs(EXPORT_SPOOL_DIR, exist_ok=True)
+        fd, path = tempfile.mkstemp(suffix=".zip", dir=EXPORT_SPOOL_DIR)
+        os.close(fd)
+        owner = current_owner.get()
+        rows_lock = threading.Lock()
+        files, futures = [], []
+
+        def export_source(source: str):
+            with owned_by(owner):
+                query_registry.check()
+                data_manager = DataManager(source)
+                decision = self.decisions.get(source)
+                if decision is not None:
+                    data_manager.shard_workers = decision.shard_workers
+                params = self.params[source]
+                def tracked(chunks):
+                    rows = 0
+                    for chunk in chunks:
+                        rows += len(chunk)
+                        if rows > MAX_EXPORT_ROWS:
+                            raise ExportTooLargeError(rows)
+                        with rows_lock:
+                            job.add_rows(len(chunk))
+                        yield chunk
+                with metrics.stage("bundle_source", source) as record, closing(data_manager.iter_data(params)) as chunks:
+                    info = export_to_spool(tracked(chunks), source, params.get('export_format', 'csv'), data_manager.schema)
+                    record['rows'] = info['rows']
+                return source, info
+
+        job.update(state=Job.FETCHING)
+        try:
+            with zipfile.ZipFile(path, 'w') as bundle:
+                with ThreadPoolExecutor(max_workers=len(self.data_sources), thread_name_prefix="bundle") as executor:
+                    futures.extend(executor.submit(export_source, source) for source in self.data_sources)
+                    try:
+                        for future in as_completed(futures):
+                            source, info = future.result()
+                            # Đưa từng file vào zip ngay khi nguồn đó xong, trong lúc các nguồn khác vẫn đang chạy
+                            job.update(state=Job.ENCODING)
+                            compression = zipfile.ZIP_STORED if info['format'] in _COMPRESSED_FORMATS else zipfile.ZIP_DEFLATED
+                            bundle.write(info['path'], arcname=info['file_name'], compress_type=compression)
+                            discard_spool(info)
+                            files.append({"data_source": source, "file_name": info['file_name'], "rows": info['rows'], "format": info['format']})
+                            job.update(state=Job.FETCHING)
+                    except BaseException:
+                        # Một nguồn lỗi thì cả bundle lỗi: dừng các truy vấn còn lại thay vì chờ chúng chạy xong
+                        query_registry.cancel(owner)
+                        raise
+        except BaseException:
+            # File spool của các nguồn đã xong nhưng chưa kịp đưa vào zip
+            for future in futures:
+                if future.done() and not future.cancelled() and future.exception() is None:
+                    discard_spool(future.result()[1])
+            os.remove(path)
+            raise
+        files.sort(key=lambda f: self.data_sources.index(f['data_source']))
+        return {
+            "path": path,
+            "file_name": self.file_name(),
+            "format": "zip",
+            "label": "ZIP",
+            "mime": "application/zip",
+            "rows": sum(f['rows'] for f in files),
+            "size": os.path.getsize(path),
+            "files": files,
+        }
@@ -0,0 +1,223 @@
+# utils/cache.py
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from utils.frames import stable_arrow_table
+from utils.config import (
+    RESULT_CACHE_ENABLED, RESULT_CACHE_DIR, RESULT_CACHE_TTL, RESULT_CACHE_MAX_BYTES,
+    PARTITION_CACHE_ENABLED, PARTITION_CACHE_DIR, PARTITION_CACHE_TTL, PARTITION_CACHE_MAX_BYTES
+)
+
+# Các key trong params không ảnh hưởng đến kết quả truy vấn
+_NON_QUERY_KEYS = {'num_row', 'data_source', 'export_format'}
+
+def normalize_params(params: dict) -> dict:
+    """Chuẩn hóa params để các lần export giống nhau cho ra cùng một cache key."""
+    normalized = {}
+    for key, value in params.items():
+        if key in _NON_QUERY_KEYS:
+            continue
+        if key == 'storefront_ids':
+            value = sorted(int(v) for v in value)
+        elif key == 'columns':
+            # Thứ tự cột kết quả luôn theo file SQL nên thứ tự chọn không ảnh hưởng đến kết quả
+            value = sorted(value)
+        normalized[key] = value
+    return normalized
+
+def make_cache_key(data_source: str, query_type: str, params: dict, limit: int = None) -> str:
+    payload = {
+        "data_source": data_source,
+        "query_type": query_type,
+        "params": normalize_params(params),
+        "limit": int(limit) if limit else None,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class _CacheWriter:
+    """
+    Ghi dần các chunk DataFrame vào một file Parquet tạm, chỉ đưa vào cache khi commit().
+    `schema` (SCHEMA của nguồn dữ liệu) giữ kiểu cột giống nhau giữa các chunk, xem stable_arrow_table.
+    """
+    def __init__(self, cache, key: str, schema: dict = None):
+        self.cache = cache
+        self.key = key
+        self.schema = schema
+        self.tmp_path = f"{cache._path(key)}.{uuid.uuid4().hex}.tmp"
+        self._writer = None
+        self.failed = False
+
+    def write(self, chunk: pd.DataFrame):
+        if self.failed:
+            return
+        try:
+            table = stable_arrow_table(chunk, self.schema)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.tmp_path, table.schema)
+            else:
+                table = table.cast(self._writer.schema)
+            self._writer.write_table(table)
+        except Exception:
+            # Chunk không cast được sang schema của chunk đầu (giá trị không khớp kiểu khai báo): bỏ qua việc cache
+            self.abort()
+
+    def commit(self):
+        if self._writer is None or self.failed:
+            self.abort()
+            return
+        self._writer.close()
+        os.replace(self.tmp_path, self.cache._path(self.key))
+        self.cache._evict()
+
+    def abort(self):
+        self.failed = True
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except Exception:
+                pass
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+class ResultCache:
+    """
+    Cache kết quả truy vấn dạng file Parquet trên đĩa, dùng chung giữa các session và process.
+    Hết hạn theo TTL (mtime) và loại bỏ theo LRU (atime) khi vượt quá dung lượng cho phép.
+    """
+    def __init__(self, directory: str, ttl: int, max_bytes: int, enabled: bool = True):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.parquet")
+
+    def _record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: str):
+        """Trả về DataFrame đã cache, hoặc None nếu không có/đã hết hạn."""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+            if time.time() - stat.st_mtime > self.ttl:
+                os.remove(path)
+                raise FileNotFoundError(path)
+            df = pd.read_parquet(path)
+            # Cập nhật atime để phục vụ LRU, giữ nguyên mtime cho TTL
+            os.utime(path, (time.time(), stat.st_mtime))
+        except (FileNotFoundError, OSError, pa.ArrowException):
+            self._record(hit=False)
+            return None
+        self._record(hit=True)
+        return df
+
+    def iter_chunks(self, key: str, chunk_size: int):
+        """
+        Đọc một entry theo từng chunk (không nạp cả file vào bộ nhớ), hoặc None nếu không có/đã hết hạn.
+        File được mở ngay để entry bị xóa (LRU) sau đó vẫn đọc được.
+        """
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+            if time.time() - stat.st_mtime > self.ttl:
+                raise FileNotFoundError(path)
+            handle = open(path, 'rb')
+            os.utime(path, (time.time(), stat.st_mtime))
+        except (FileNotFoundError, OSError):
+            self._record(hit=False)
+            return None
+        self._record(hit=True)
+        return self._read_batches(handle, chunk_size)
+
+    @staticmethod
+    def _read_batches(handle, chunk_size: int):
+        with handle:
+            for batch in pq.ParquetFile(handle).iter_batches(batch_size=chunk_size):
+                yield batch.to_pandas()
+
+    def contains(self, key: str) -> bool:
+        """Kiểm tra nhanh entry có tồn tại hay không (không tính vào hit/miss)."""
+        return self.enabled and os.path.exists(self._path(key))
+
+    def row_count(self, key: str):
+        """Số dòng của một entry (đọc từ metadata Parquet, không nạp dữ liệu), hoặc None nếu không có."""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            stat = os.stat(path)
+            if time.time() - stat.st_mtime > self.ttl:
+                raise FileNotFoundError(path)
+            num_rows = pq.ParquetFile(path).metadata.num_rows
+            os.utime(path, (time.time(), stat.st_mtime))
+        except (FileNotFoundError, OSError, pa.ArrowException):
+            self._record(hit=False)
+            return None
+        self._record(hit=True)
+        return num_rows
+
+    def put(self, key: str, df: pd.DataFrame):
+        if not self.enabled:
+            return
+        writer = self.writer(key)
+        writer.write(df)
+        writer.commit()
+
+    def writer(self, key: str, schema: dict = None) -> _CacheWriter:
+        writer = _CacheWriter(self, key, schema)
+        writer.failed = not self.enabled
+        return writer
+
+    def _evict(self):
+        """Xóa các file hết hạn, sau đó xóa file ít được dùng nhất cho đến khi nằm trong giới hạn dung lượng."""
+        entries, now = [], time.time()
+        for path in glob.glob(os.path.join(self.directory, "*.parquet")):
+            try:
+                stat = os.stat(path)
+                if now - stat.st_mtime > self.ttl:
+                    os.remove(path)
+                    continue
+            except OSError:
+                continue
+            entries.append((stat.st_atime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+result_cache = ResultCache(RESULT_CACHE_DIR, RESULT_CACHE_TTL, RESULT_CACHE_MAX_BYTES, enabled=RESULT_CACHE_ENABLED)
+# Dữ liệu của các tháng đã chốt không thay đổi nên được giữ lâu hơn nhiều so với result_cache
+partition_cache = ResultCache(PARTITION_CACHE_DIR, PARTITION_CACHE_TTL, PARTITION_CACHE_MAX_BYTES, enabled=PARTITION_CACHE_ENABLED)
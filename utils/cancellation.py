@@ -0,0 +1,166 @@
+# utils/cancellation.py
+import contextvars
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+from utils.config import QUERY_WATCHDOG_INTERVAL
+
+# Chủ sở hữu (thường là id của job) của các truy vấn đang chạy trong luồng hiện tại
+current_owner = contextvars.ContextVar("query_owner", default=None)
+# Các dialect hỗ trợ CONNECTION_ID() / KILL QUERY
+_KILLABLE_DIALECTS = ('mysql', 'mariadb', 'singlestoredb')
+
+
+class QueryCancelledError(Exception):
+    """Truy vấn bị hủy (người dùng bắt đầu lại, rời trang, hoặc job bị bỏ rơi)."""
+
+
+class QueryTimeoutError(QueryCancelledError):
+    """Truy vấn chạy quá thời gian cho phép của nguồn dữ liệu và đã bị dừng."""
+    def __init__(self, timeout: int):
+        self.timeout = timeout
+        super().__init__(f"The query ran longer than {timeout:,} seconds and was stopped. Please try a shorter date range or fewer storefronts.")
+
+
+@contextmanager
+def owned_by(owner):
+    """Gán chủ sở hữu cho các truy vấn chạy trong khối lệnh (dùng khi chuyển việc sang thread khác)."""
+    token = current_owner.set(owner)
+    try:
+        yield
+    finally:
+        current_owner.reset(token)
+
+
+class QueryRegistry:
+    """
+    Theo dõi các truy vấn đang chạy (connection id phía server, chủ sở hữu, thời điểm bắt đầu).
+    Cho phép hủy theo chủ sở hữu bằng KILL QUERY và có watchdog dừng các truy vấn quá thời gian.
+    """
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._running = {}
+        self._cancelled = set()
+        self._ids = itertools.count(1)
+        self._kill_engines = {}
+        self._lock = threading.Lock()
+        self._watchdog = None
+        self.killed = 0
+
+    @staticmethod
+    def _server_id(connection):
+        """
+        Connection id phía server, hỏi một lần rồi lưu trong connection.info (đi theo kết nối DBAPI
+        trong pool và bị xóa khi kết nối bị invalidate).
+        """
+        if connection.dialect.name not in _KILLABLE_DIALECTS:
+            return None
+        server_id = connection.info.get("server_id")
+        if server_id is None:
+            try:
+                server_id = connection.execute(text("SELECT CONNECTION_ID()")).scalar()
+            except Exception:
+                return None
+            connection.info["server_id"] = server_id
+        return server_id
+
+    def check(self, owner=None):
+        """Ném QueryCancelledError nếu chủ sở hữu đã bị hủy (kiểm tra giữa các chunk/shard)."""
+        owner = owner if owner is not None else current_owner.get()
+        if owner is not None and owner in self._cancelled:
+            raise QueryCancelledError("The export was cancelled.")
+
+    @contextmanager
+    def track(self, connection, data_source: str, timeout: int = None):
+        """Đăng ký truy vấn chạy trên `connection` trong suốt khối lệnh."""
+        owner = current_owner.get()
+        self.check(owner)
+        self._ensure_watchdog()
+        entry = {
+            "owner": owner,
+            "data_source": data_source,
+            "server_id": self._server_id(connection),
+            "url": connection.engine.url,
+            "started": time.time(),
+            "timeout": timeout,
+            "reason": None,
+        }
+        query_id = next(self._ids)
+        with self._lock:
+            self._running[query_id] = entry
+        try:
+            yield
+            self.check(owner)
+        except Exception as e:
+            if entry["reason"] is not None:
+                # Kết nối vừa bị KILL QUERY: không trả lại pool ở trạng thái không rõ ràng
+                connection.invalidate()
+                if entry["reason"] == "timeout":
+                    raise QueryTimeoutError(timeout) from e
+                raise QueryCancelledError("The export was cancelled.") from e
+            raise
+        finally:
+            with self._lock:
+                self._running.pop(query_id, None)
+
+    def cancel(self, owner):
+        """Hủy mọi truy vấn đang chạy và sắp chạy của một chủ sở hữu."""
+        if owner is None:
+            return
+        with self._lock:
+            self._cancelled.add(owner)
+            targets = [entry for entry in self._running.values() if entry["owner"] == owner]
+        for entry in targets:
+            self._kill(entry, "cancelled")
+
+    def release(self, owner):
+        """Bỏ đánh dấu hủy khi chủ sở hữu đã kết thúc hẳn."""
+        with self._lock:
+            self._cancelled.discard(owner)
+
+    def _kill(self, entry: dict, reason: str):
+        if entry["reason"] is not None:
+            return
+        entry["reason"] = reason
+        if entry["server_id"] is None:
+            return
+        try:
+            # Dùng kết nối riêng (không qua pool) để vẫn hủy được khi pool đã cạn
+            engine = self._kill_engines.get(entry["url"])
+            if engine is None:
+                engine = self._kill_engines.setdefault(entry["url"], create_engine(entry["url"], poolclass=NullPool))
+            with engine.connect() as connection:
+                connection.execute(text(f"KILL QUERY {int(entry['server_id'])}"))
+            self.killed += 1
+        except Exception:
+            pass
+
+    def _ensure_watchdog(self):
+        if self._watchdog is None:
+            with self._lock:
+                if self._watchdog is None:
+                    self._watchdog = threading.Thread(target=self._watch, name="query-watchdog", daemon=True)
+                    self._watchdog.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.interval)
+            now = time.time()
+            with self._lock:
+                expired = [entry for entry in self._running.values() if entry["timeout"] and now - entry["started"] > entry["timeout"]]
+            for entry in expired:
+                self._kill(entry, "timeout")
+
+    def running(self) -> list:
+        now = time.time()
+        with self._lock:
+            return [
+                {"data_source": e["data_source"], "seconds": round(now - e["started"], 1), "timeout": e["timeout"]}
+                for e in self._running.values()
+            ]
+
+
+query_registry = QueryRegistry(QUERY_WATCHDOG_INTERVAL)
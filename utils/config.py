@@ -0,0 +1,123 @@
+# utils/config.py
+import os
+import tempfile
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def _env_int(name: str, default: int) -> int:
+    """Đọc một biến môi trường kiểu số nguyên, dùng giá trị mặc định nếu thiếu hoặc sai định dạng."""
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+# Giới hạn cứng số dòng cho một lần export; export lớn được tiếp nhận theo chi phí ước tính (utils/admission.py)
+MAX_EXPORT_ROWS = _env_int("MAX_EXPORT_ROWS", 1000000)
+# Export ước tính không quá số dòng này là export "nhỏ": chạy ở lane riêng, không phải chờ export lớn
+SMALL_EXPORT_ROWS = _env_int("SMALL_EXPORT_ROWS", 50000)
+# Khoảng thời gian tối đa của một lần export (ngày)
+MAX_EXPORT_DAYS = _env_int("MAX_EXPORT_DAYS", 366)
+# Số tháng dương lịch tối đa của một lần export. Truy vấn group theo month(...) (chỉ số tháng, không có năm)
+# nên khoảng ngày không được chứa cùng một tháng của hai năm; không cấu hình được
+MAX_EXPORT_MONTHS = 12
+# Tỉ lệ sử dụng (connection pool, bộ nhớ process) mà từ đó server được coi là đang bận
+ADMISSION_BUSY_RATIO = float(os.getenv("ADMISSION_BUSY_RATIO", "0.8"))
+# Export ước tính lớn hơn mức này (byte) được chuyển CSV/XLSX sang CSV gzip
+DOWNGRADE_BYTES = _env_int("DOWNGRADE_BYTES", 256 * 1024 ** 2)
+
+# Số dòng đọc mỗi lần từ server-side cursor khi export dạng streaming
+EXPORT_CHUNK_SIZE = _env_int("EXPORT_CHUNK_SIZE", 10000)
+
+# Thư mục chứa các file export tạm thời (spool)
+EXPORT_SPOOL_DIR = os.getenv("EXPORT_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "data_exporter_spool"))
+
+# Cache kết quả truy vấn dùng chung trên đĩa (Parquet) cho mọi session/process
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "1") == "1"
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "data_exporter_cache"))
+RESULT_CACHE_TTL = _env_int("RESULT_CACHE_TTL", 6 * 3600)  # giây
+RESULT_CACHE_MAX_BYTES = _env_int("RESULT_CACHE_MAX_BYTES", 1024 ** 3)
+
+# Số shard chạy song song tối đa cho một lần truy vấn (luôn bị chặn bởi kích thước connection pool)
+SHARD_WORKERS = _env_int("SHARD_WORKERS", 4)
+
+# Số job export nhỏ chạy đồng thời tối đa trong một process (giới hạn chung để bảo vệ CSDL)
+EXPORT_WORKERS = _env_int("EXPORT_WORKERS", 4)
+# Số job export lớn chạy đồng thời tối đa (lane riêng để export nhỏ không phải chờ)
+LARGE_EXPORT_WORKERS = _env_int("LARGE_EXPORT_WORKERS", 2)
+# Thời gian giữ lại job đã kết thúc trước khi dọn dẹp (giây)
+JOB_RETENTION = _env_int("JOB_RETENTION", 3600)
+# Chu kỳ trang web kiểm tra trạng thái job (giây)
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.5"))
+
+# Chế độ gộp: chạy truy vấn data một lần duy nhất, trả preview sớm và ghi phần còn lại ra file export
+FUSED_EXPORT = os.getenv("FUSED_EXPORT", "1") == "1"
+
+# Đo thời gian/tài nguyên theo từng bước export
+METRICS_MAX_RECORDS = _env_int("METRICS_MAX_RECORDS", 5000)
+# Nếu được đặt, mỗi bản ghi sẽ được ghi thêm vào file JSON lines này
+METRICS_JSONL_PATH = os.getenv("METRICS_JSONL_PATH")
+# Nếu được đặt, file Prometheus text (textfile collector) sẽ được cập nhật sau các bản ghi mới
+METRICS_PROM_PATH = os.getenv("METRICS_PROM_PATH")
+# Khoảng thời gian tối thiểu (giây) giữa hai lần ghi lại file Prometheus
+METRICS_PROM_INTERVAL = _env_int("METRICS_PROM_INTERVAL", 5)
+
+# Cache phân vùng theo (storefront, tháng) cho dữ liệu lịch sử đã chốt (không còn thay đổi)
+PARTITION_CACHE_ENABLED = os.getenv("PARTITION_CACHE_ENABLED", "1") == "1"
+PARTITION_CACHE_DIR = os.getenv("PARTITION_CACHE_DIR", os.path.join(tempfile.gettempdir(), "data_exporter_partitions"))
+PARTITION_CACHE_TTL = _env_int("PARTITION_CACHE_TTL", 90 * 24 * 3600)  # giây
+PARTITION_CACHE_MAX_BYTES = _env_int("PARTITION_CACHE_MAX_BYTES", 4 * 1024 ** 3)
+# Số ngày chờ trước khi coi dữ liệu của một ngày là đã chốt (dữ liệu có thể được nạp trễ)
+PARTITION_SETTLE_DAYS = _env_int("PARTITION_SETTLE_DAYS", 2)
+
+# File lưu watermark (created_datetime mới nhất đã export) cho export delta, theo (nguồn, workspace, storefront)
+DELTA_STATE_PATH = os.getenv("DELTA_STATE_PATH", os.path.join(os.path.expanduser("~"), ".data_exporter", "watermarks.json"))
+
+# Nhật ký các export đã chạy (JSON lines) để prewarm cache cho các tổ hợp phổ biến; để trống để tắt
+USAGE_LOG_PATH = os.getenv("USAGE_LOG_PATH", os.path.join(os.path.expanduser("~"), ".data_exporter", "usage.jsonl"))
+USAGE_LOOKBACK_DAYS = _env_int("USAGE_LOOKBACK_DAYS", 35)
+# Khi file nhật ký vượt quá kích thước này, chỉ giữ lại các bản ghi trong USAGE_LOOKBACK_DAYS ngày gần nhất (tối đa một nửa giới hạn)
+USAGE_LOG_MAX_BYTES = _env_int("USAGE_LOG_MAX_BYTES", 5 * 1024 * 1024)
+# Prewarm: số tổ hợp phổ biến nhất được tính trước, số truy vấn chạy đồng thời và khung giờ thấp điểm (HH:MM-HH:MM, giờ địa phương)
+PREWARM_TOP_N = _env_int("PREWARM_TOP_N", 20)
+PREWARM_WORKERS = _env_int("PREWARM_WORKERS", 2)
+PREWARM_WINDOW = os.getenv("PREWARM_WINDOW", "01:00-06:00")
+
+# Gộp các truy vấn giống hệt nhau đang chạy đồng thời (trong process và giữa các process)
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "1") == "1"
+
+# Ngân sách bộ nhớ cho dữ liệu giữ trong session (preview...); vượt quá sẽ được spill ra đĩa
+SESSION_MEMORY_BUDGET = _env_int("SESSION_MEMORY_BUDGET", 64 * 1024 ** 2)
+PROCESS_MEMORY_BUDGET = _env_int("PROCESS_MEMORY_BUDGET", 1024 ** 3)
+# DataFrame lớn hơn ngưỡng này luôn được spill ra đĩa
+SPILL_THRESHOLD_BYTES = _env_int("SPILL_THRESHOLD_BYTES", 16 * 1024 ** 2)
+# Dữ liệu của session không hoạt động quá thời gian này sẽ bị xóa (giây)
+SESSION_ARTIFACT_TTL = _env_int("SESSION_ARTIFACT_TTL", 2 * 3600)
+SESSION_SWEEP_INTERVAL = _env_int("SESSION_SWEEP_INTERVAL", 60)
+
+# Duyệt kết quả theo trang (keyset pagination): số dòng mỗi trang và số trang gần nhất giữ trong session
+PREVIEW_PAGE_SIZE = _env_int("PREVIEW_PAGE_SIZE", 500)
+PAGE_CACHE_PAGES = _env_int("PAGE_CACHE_PAGES", 5)
+
+# Số câu lệnh SQL đã biên dịch (theo nguồn, loại truy vấn, cột, bucket storefront) được giữ lại (data_logic/registry.py)
+STATEMENT_CACHE_SIZE = _env_int("STATEMENT_CACHE_SIZE", 256)
+
+# Thời gian chạy tối đa của một truy vấn (giây) nếu nguồn dữ liệu không khai báo STATEMENT_TIMEOUT riêng
+STATEMENT_TIMEOUT = _env_int("STATEMENT_TIMEOUT", 600)
+# Truy vấn chạy lâu hơn mức này (giây) được ghi lại để xem EXPLAIN plan trong chế độ nhà phát triển (utils/plans.py)
+SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_SECONDS", "10"))
+SLOW_QUERY_MAX = _env_int("SLOW_QUERY_MAX", 20)
+# Chu kỳ watchdog kiểm tra và dừng các truy vấn quá thời gian (giây)
+QUERY_WATCHDOG_INTERVAL = _env_int("QUERY_WATCHDOG_INTERVAL", 5)
+# Job không được trang web theo dõi quá thời gian này (tab đã đóng) sẽ bị hủy (giây)
+JOB_ABANDON_TIMEOUT = _env_int("JOB_ABANDON_TIMEOUT", 60)
+
+# Connection pool của CSDL
+DB_POOL_SIZE = _env_int("DB_POOL_SIZE", 10)
+DB_MAX_OVERFLOW = _env_int("DB_MAX_OVERFLOW", 5)
+DB_POOL_TIMEOUT = _env_int("DB_POOL_TIMEOUT", 30)  # giây chờ tối đa để lấy kết nối
+DB_POOL_RECYCLE = _env_int("DB_POOL_RECYCLE", 1800)  # giây
+# Kiểm tra kết nối còn sống trước khi dùng (tránh lỗi socket chết sau thời gian không hoạt động)
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+# Số kết nối được mở sẵn khi process khởi động
+DB_WARM_CONNECTIONS = _env_int("DB_WARM_CONNECTIONS", 4)
@@ -1,10 +1,53 @@
 import os
-import streamlit as st
-from sqlalchemy import create_engine
+import threading
+import time
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import QueuePool
 from contextlib import contextmanager
 from dotenv import load_dotenv
+from utils.config import (
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_WARM_CONNECTIONS
+)
+from utils.metrics import metrics
+
+# Ngưỡng (ms) của histogram thời gian chờ lấy kết nối từ pool
+CHECKOUT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000, 30000)
+
+class DatabaseConfigError(Exception):
+    """Thiếu cấu hình hoặc không thể kết nối đến CSDL."""
+
+
+class PoolTelemetry:
+    """Số liệu của connection pool: kết nối mới, kết nối bị hủy và histogram thời gian chờ checkout."""
+    def __init__(self):
+        self.connects = 0
+        self.invalidations = 0
+        self.buckets = [0] * len(CHECKOUT_BUCKETS_MS)
+        self.wait_count = 0
+        self.wait_sum_ms = 0.0
+        self._lock = threading.Lock()
+
+    def attach(self, engine):
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, *args):
+        with self._lock:
+            self.connects += 1
+
+    def _on_invalidate(self, *args):
+        with self._lock:
+            self.invalidations += 1
+
+    def observe_wait(self, wait_ms: float):
+        with self._lock:
+            self.wait_count += 1
+            self.wait_sum_ms += wait_ms
+            for i, bound in enumerate(CHECKOUT_BUCKETS_MS):
+                if wait_ms <= bound:
+                    self.buckets[i] += 1
+
 
 class DatabaseManager:
     """
@@ -12,56 +55,151 @@ class DatabaseManager:
     Sử dụng mẫu Singleton để đảm bảo chỉ có một instance được tạo.
     """
     _instance = None
+    _lock = threading.Lock()
 
     def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(DatabaseManager, cls).__new__(cls)
-            load_dotenv()
-            cls._instance._connect()
+        with cls._lock:
+            if cls._instance is None:
+                instance = super(DatabaseManager, cls).__new__(cls)
+                load_dotenv()
+                # Chỉ lưu instance khi kết nối thành công để lần gọi sau có thể thử lại
+                instance._connect()
+                cls._instance = instance
         return cls._instance
 
     def _connect(self):
         """Khởi tạo engine và SessionLocal."""
-        DB_USER = os.getenv("DB_USER")
-        DB_PASSWORD = os.getenv("DB_PASSWORD")
-        DB_HOST = os.getenv("DB_HOST")
-        DB_PORT = os.getenv("DB_PORT")
-        DB_NAME = os.getenv("DB_NAME")
+        # DATABASE_URL (nếu có) thay cho các biến DB_*, ví dụ để trỏ sang CSDL tương thích MySQL khi benchmark
+        db_url = os.getenv("DATABASE_URL")
+        if not db_url:
+            DB_USER = os.getenv("DB_USER")
+            DB_PASSWORD = os.getenv("DB_PASSWORD")
+            DB_HOST = os.getenv("DB_HOST")
+            DB_PORT = os.getenv("DB_PORT")
+            DB_NAME = os.getenv("DB_NAME")
 
-        if not all([DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME]):
-            st.error("Lỗi cấu hình CSDL: Một hoặc nhiều biến môi trường bị thiếu.")
-            st.stop()
+            if not all([DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME]):
+                raise DatabaseConfigError("Lỗi cấu hình CSDL: Một hoặc nhiều biến môi trường bị thiếu.")
 
-        db_url = f"singlestoredb://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+            db_url = f"singlestoredb://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
         try:
             self.engine = create_engine(
                 db_url,
                 poolclass=QueuePool,
-                pool_size=10,
-                max_overflow=5,
-                pool_timeout=30,
-                pool_recycle=1800
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
+                pool_timeout=DB_POOL_TIMEOUT,
+                pool_recycle=DB_POOL_RECYCLE,
+                pool_pre_ping=DB_POOL_PRE_PING
             )
+            self.telemetry = PoolTelemetry()
+            self.telemetry.attach(self.engine)
+            # Slot dùng chung cho mọi shard chạy song song trong process (mọi job, lane, bundle):
+            # shard chờ slot thay vì chờ connection pool đến DB_POOL_TIMEOUT rồi lỗi
+            self.shard_slots = threading.BoundedSemaphore(self.max_connections)
             self._SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
             # Kiểm tra kết nối
-            with self.engine.connect() as connection:
-                st.sidebar.info("Database Connected Successfully.")
+            with self.engine.connect():
+                pass
         except Exception as e:
-            st.error(f"Không thể kết nối CSDL: {e}")
-            st.stop()
+            raise DatabaseConfigError(f"Không thể kết nối CSDL: {e}") from e
+
+    def warm_up(self, connections: int = DB_WARM_CONNECTIONS):
+        """Mở sẵn một số kết nối rồi trả về pool để các truy vấn đầu tiên không phải chờ kết nối mới."""
+        connections = max(0, min(connections, self.engine.pool.size()))
+        opened = []
+        try:
+            for _ in range(connections):
+                opened.append(self.engine.connect())
+        finally:
+            for connection in opened:
+                connection.close()
+        return len(opened)
+
+    @property
+    def max_connections(self) -> int:
+        """Số kết nối tối đa mà pool có thể cấp phát (pool_size + max_overflow)."""
+        return self.engine.pool.size() + max(self.engine.pool._max_overflow, 0)
 
+    def pool_stats(self) -> dict:
+        pool = self.engine.pool
+        telemetry = getattr(self, 'telemetry', None) or PoolTelemetry()
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_connections": self.max_connections,
+            "connects": telemetry.connects,
+            "invalidations": telemetry.invalidations,
+            "wait_buckets": list(zip(CHECKOUT_BUCKETS_MS, telemetry.buckets)),
+            "wait_count": telemetry.wait_count,
+            "wait_sum_ms": round(telemetry.wait_sum_ms, 2),
+        }
 
     @contextmanager
     def get_session(self):
         """Cung cấp một session CSDL và tự động đóng nó."""
         db = self._SessionLocal()
         try:
+            # Lấy kết nối ngay để đo thời gian chờ connection pool
+            with metrics.stage("pool_checkout") as record:
+                started = time.perf_counter()
+                db.connection()
+                if getattr(self, 'telemetry', None):
+                    self.telemetry.observe_wait((time.perf_counter() - started) * 1000)
+                record['checked_out'] = self.engine.pool.checkedout()
             yield db
         finally:
             db.close()
 
+def _pool_prometheus_lines():
+    """Số liệu connection pool theo định dạng Prometheus (rỗng nếu chưa kết nối CSDL)."""
+    if DatabaseManager._instance is None:
+        return []
+    stats = DatabaseManager._instance.pool_stats()
+    lines = []
+    for name, key, kind, help_text in (
+        ("db_pool_size", "size", "gauge", "Configured pool size."),
+        ("db_pool_checked_out", "checked_out", "gauge", "Connections currently checked out."),
+        ("db_pool_overflow", "overflow", "gauge", "Overflow connections currently open."),
+        ("db_pool_connects_total", "connects", "counter", "New DBAPI connections opened."),
+        ("db_pool_invalidations_total", "invalidations", "counter", "Connections invalidated (dead or killed)."),
+    ):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {stats[key]}"]
+    lines += ["# HELP db_pool_checkout_wait_ms Time waiting for a pooled connection.", "# TYPE db_pool_checkout_wait_ms histogram"]
+    lines += [f'db_pool_checkout_wait_ms_bucket{{le="{bound}"}} {count}' for bound, count in stats["wait_buckets"]]
+    lines += [
+        f'db_pool_checkout_wait_ms_bucket{{le="+Inf"}} {stats["wait_count"]}',
+        f"db_pool_checkout_wait_ms_sum {stats['wait_sum_ms']}",
+        f"db_pool_checkout_wait_ms_count {stats['wait_count']}",
+    ]
+    return lines
+
+metrics.register_collector(_pool_prometheus_lines)
+
+_warm_up_started = False
+_warm_up_lock = threading.Lock()
+
+def start_warm_up():
+    """
+    Tạo engine và mở sẵn kết nối trong một thread nền, một lần cho mỗi process.
+    Lỗi cấu hình sẽ được báo lại khi trang web thực sự cần truy vấn.
+    """
+    global _warm_up_started
+    with _warm_up_lock:
+        if _warm_up_started:
+            return
+        _warm_up_started = True
+    def run():
+        try:
+            DatabaseManager().warm_up()
+        except Exception:
+            pass
+    threading.Thread(target=run, name="db-warm-up", daemon=True).start()
+
 # Cách sử dụng:
 # db_manager = DatabaseManager()
 # with db_manager.get_session() as session:
-    # thực hiện truy vấn
\ No newline at end of file
+    # thực hiện truy vấn
@@ -0,0 +1,30 @@
+# utils/dates.py
+from datetime import date, datetime, timedelta
+
+DATE_FORMAT = '%Y-%m-%d'
+
+def split_date_range(start_date: str, end_date: str):
+    """Chia khoảng ngày [start_date, end_date] thành các đoạn theo tháng dương lịch, giữ nguyên thứ tự."""
+    start = datetime.strptime(start_date, DATE_FORMAT).date()
+    end = datetime.strptime(end_date, DATE_FORMAT).date()
+    shards = []
+    while start <= end:
+        next_month = (start.replace(day=1) + timedelta(days=32)).replace(day=1)
+        shard_end = min(end, next_month - timedelta(days=1))
+        shards.append((start.strftime(DATE_FORMAT), shard_end.strftime(DATE_FORMAT)))
+        start = next_month
+    return shards
+
+# Lựa chọn khoảng ngày tự nhập trong form (không phải preset)
+CUSTOM_RANGE = "Custom time range"
+
+def date_presets(today: date = None) -> dict:
+    """Các preset khoảng ngày của form export: tên -> (ngày bắt đầu, ngày kết thúc), tính theo ngày `today`."""
+    today = today or datetime.now().date()
+    yesterday = today - timedelta(days=1)
+    last_month_end = today.replace(day=1) - timedelta(days=1)
+    return {
+        "Last 30 days": (today - timedelta(days=30), yesterday),
+        "This month": (today.replace(day=1), yesterday),
+        "Last month": (last_month_end.replace(day=1), last_month_end),
+    }
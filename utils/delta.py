@@ -0,0 +1,106 @@
+# utils/delta.py
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from utils.cache import normalize_params
+from utils.config import DELTA_STATE_PATH, PARTITION_SETTLE_DAYS
+from utils.dates import DATE_FORMAT, split_date_range
+
+def delta_key(data_source: str, params: dict) -> str:
+    """
+    Key của watermark: nguồn dữ liệu, workspace, tập storefront và các lựa chọn ảnh hưởng đến nội dung file
+    (cột, bộ lọc). Không gồm khoảng ngày: các lần export delta nối tiếp nhau dùng chung một watermark.
+    """
+    scope = {k: v for k, v in normalize_params(params).items() if k not in ('start_date', 'end_date')}
+    digest = hashlib.sha256(json.dumps(scope, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:12]
+    storefronts = "-".join(str(s) for s in scope.get('storefront_ids', []))
+    return f"{data_source}:ws{params['workspace_id']}:sf{storefronts}:{digest}"
+
+class WatermarkStore:
+    """Watermark của các lần export delta, lưu trong một file JSON (key -> thông tin lần export gần nhất)."""
+
+    def __init__(self, path: str = DELTA_STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def get(self, key: str):
+        with self._lock:
+            return self._read().get(key)
+
+    def set(self, key: str, entry: dict):
+        with self._lock:
+            state = self._read()
+            state[key] = entry
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            # Ghi ra file tạm rồi đổi tên để file trạng thái không bao giờ bị ghi dở
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+def plan_delta(data_manager, params: dict, store: WatermarkStore) -> dict:
+    """
+    So watermark hiện tại của CSDL với watermark đã lưu và chọn phần cần export:
+        full       chưa có watermark: export toàn bộ khoảng ngày
+        delta      có dữ liệu mới: chỉ tính lại các tháng từ watermark cũ (lùi PARTITION_SETTLE_DAYS ngày cho dữ liệu nạp trễ)
+        unchanged  không có dữ liệu mới hơn watermark đã lưu
+        empty      không có dữ liệu trong khoảng ngày
+    """
+    key = delta_key(data_manager.data_source, params)
+    previous = store.get(key)
+    watermark = data_manager.get_watermark(params)
+    plan = {
+        "key": key,
+        "previous_watermark": previous['watermark'] if previous else None,
+        "watermark": watermark,
+        "start_date": params['start_date'],
+        "end_date": params['end_date'],
+    }
+    if watermark is None:
+        plan['mode'] = 'empty'
+    elif previous is None:
+        plan['mode'] = 'full'
+    elif watermark <= previous['watermark']:
+        plan['mode'] = 'unchanged'
+    else:
+        plan['mode'] = 'delta'
+        # Kết quả group theo tháng nên phải tính lại trọn tháng chứa dữ liệu mới
+        since = datetime.strptime(previous['watermark'][:10], DATE_FORMAT).date() - timedelta(days=PARTITION_SETTLE_DAYS)
+        plan['start_date'] = max(params['start_date'], since.replace(day=1).strftime(DATE_FORMAT))
+    if plan['mode'] in ('full', 'delta'):
+        plan['months'] = [start[:7] for start, _ in split_date_range(plan['start_date'], plan['end_date'])]
+    return plan
+
+def write_manifest(path: str, plan: dict, params: dict, file_name: str, rows: int) -> dict:
+    """
+    Manifest đi kèm file delta. Các dòng thuộc `replaces_months` trong những file trước đó (cùng key)
+    đã được tính lại trong file này; các tháng khác được giữ nguyên.
+    """
+    manifest = {
+        "key": plan['key'],
+        "data_source": params['data_source'],
+        "workspace_id": params['workspace_id'],
+        "storefront_ids": sorted(params['storefront_ids']),
+        "mode": plan['mode'],
+        "file": file_name,
+        "rows": rows,
+        "start_date": plan['start_date'],
+        "end_date": plan['end_date'],
+        "replaces_months": plan.get('months', []) if plan['mode'] == 'delta' else [],
+        "previous_watermark": plan['previous_watermark'],
+        "watermark": plan['watermark'],
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
@@ -0,0 +1,182 @@
+# utils/export.py
+import codecs
+import gzip
+import os
+import tempfile
+import time
+import pyarrow as pa
+import pyarrow.parquet as pq
+from utils.config import EXPORT_SPOOL_DIR
+from utils.frames import stable_arrow_table
+from utils.metrics import metrics
+
+# Định dạng export: key -> (nhãn hiển thị, đuôi file, MIME type)
+EXPORT_FORMATS = {
+    'csv': ("CSV", ".csv", "text/csv"),
+    'csv.gz': ("CSV (gzip)", ".csv.gz", "application/gzip"),
+    'csv.zst': ("CSV (zstd)", ".csv.zst", "application/zstd"),
+    'parquet': ("Parquet", ".parquet", "application/vnd.apache.parquet"),
+    'feather': ("Feather", ".feather", "application/vnd.apache.arrow.file"),
+    'xlsx': ("Excel (XLSX)", ".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+# Định dạng cần thư viện tùy chọn
+_OPTIONAL_MODULES = {'csv.zst': 'zstandard', 'xlsx': 'xlsxwriter'}
+# Giới hạn số dòng của một sheet Excel (trừ dòng tiêu đề)
+XLSX_MAX_ROWS = 1048575
+
+def available_formats():
+    """Danh sách định dạng export dùng được trong môi trường hiện tại."""
+    formats = []
+    for key in EXPORT_FORMATS:
+        module = _OPTIONAL_MODULES.get(key)
+        if module:
+            try:
+                __import__(module)
+            except ImportError:
+                continue
+        formats.append(key)
+    return formats
+
+def convert_df_to_csv(df):
+    """Chuyển toàn bộ DataFrame thành CSV bytes (UTF-8 BOM) trong bộ nhớ."""
+    return df.to_csv(index=False, encoding='utf-8-sig').encode('utf-8-sig')
+
+class _CsvWriter:
+    """Ghi CSV (UTF-8 BOM) theo từng chunk vào một file object nhị phân."""
+    def __init__(self, file_obj):
+        self.file_obj = file_obj
+        self.file_obj.write(codecs.BOM_UTF8)
+        self.rows = 0
+        self._header = True
+
+    def write(self, chunk):
+        self.file_obj.write(chunk.to_csv(index=False, header=self._header).encode('utf-8'))
+        self._header = False
+        self.rows += len(chunk)
+
+    def close(self):
+        self.file_obj.close()
+
+
+class _ArrowWriter:
+    """
+    Ghi Parquet hoặc Feather (Arrow IPC) theo từng chunk. Kiểu cột lấy theo schema của data_logic (xem stable_arrow_table)
+    để chunk đầu tiên có cột toàn NULL hoặc toàn số nguyên không làm các chunk sau bị lỗi khi cast.
+    """
+    def __init__(self, path: str, export_format: str, schema: dict = None):
+        self.path = path
+        self.export_format = export_format
+        self.schema = schema
+        self._writer = None
+        self._schema = None
+        self.rows = 0
+
+    def write(self, chunk):
+        table = stable_arrow_table(chunk, self.schema)
+        if self._writer is None:
+            self._schema = table.schema
+            if self.export_format == 'parquet':
+                self._writer = pq.ParquetWriter(self.path, table.schema, compression='zstd')
+            else:
+                options = pa.ipc.IpcWriteOptions(compression='zstd')
+                self._writer = pa.ipc.new_file(self.path, table.schema, options=options)
+        else:
+            table = table.cast(self._schema)
+        self._writer.write_table(table)
+        self.rows += len(chunk)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+class _XlsxWriter:
+    """Ghi XLSX ở chế độ constant_memory: mỗi dòng được đẩy thẳng ra file, không giữ cả sheet trong bộ nhớ."""
+    def __init__(self, path: str):
+        import xlsxwriter
+        self.workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+        self.worksheet = self.workbook.add_worksheet("data")
+        self.rows = 0
+
+    def write(self, chunk):
+        if self.rows + len(chunk) > XLSX_MAX_ROWS:
+            raise ValueError(f"XLSX supports at most {XLSX_MAX_ROWS:,} rows per sheet.")
+        if self.rows == 0:
+            self.worksheet.write_row(0, 0, [str(c) for c in chunk.columns])
+        values = chunk.astype(object).where(chunk.notna(), None)
+        for offset, row in enumerate(values.itertuples(index=False, name=None), start=self.rows + 1):
+            self.worksheet.write_row(offset, 0, row)
+        self.rows += len(chunk)
+
+    def close(self):
+        self.workbook.close()
+
+
+def _open_writer(export_format: str, path: str, schema: dict = None):
+    if export_format == 'csv':
+        return _CsvWriter(open(path, 'wb'))
+    if export_format == 'csv.gz':
+        return _CsvWriter(gzip.open(path, 'wb', compresslevel=6))
+    if export_format == 'csv.zst':
+        import zstandard
+        return _CsvWriter(zstandard.ZstdCompressor(level=3).stream_writer(open(path, 'wb'), closefd=True))
+    if export_format in ('parquet', 'feather'):
+        return _ArrowWriter(path, export_format, schema)
+    if export_format == 'xlsx':
+        return _XlsxWriter(path)
+    raise ValueError(f"Unknown export format: {export_format}")
+
+def export_to_spool(chunks, base_name: str, export_format: str = 'csv', schema: dict = None):
+    """
+    Mã hóa dữ liệu theo từng chunk (nén/ghi ngay khi dữ liệu về) ra một file tạm trên đĩa
+    thay vì giữ toàn bộ kết quả trong session.
+    `schema` là SCHEMA của nguồn dữ liệu (data_logic), dùng cho kiểu cột của Parquet/Feather.
+    Trả về thông tin download (đường dẫn, tên file, MIME, số dòng, dung lượng).
+    """
+    label, extension, mime = EXPORT_FORMATS[export_format]
+    os.makedirs(EXPORT_SPOOL_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=extension, dir=EXPORT_SPOOL_DIR)
+    os.close(fd)
+    started, encode_seconds = time.perf_counter(), 0.0
+    try:
+        writer = _open_writer(export_format, path, schema)
+        try:
+            for chunk in chunks:
+                encode_started = time.perf_counter()
+                writer.write(chunk)
+                encode_seconds += time.perf_counter() - encode_started
+        finally:
+            writer.close()
+    except BaseException:
+        os.remove(path)
+        raise
+    # Tách thời gian mã hóa khỏi thời gian chờ dữ liệu (fetch) vì hai bước chạy đan xen
+    size = os.path.getsize(path)
+    total_ms = (time.perf_counter() - started) * 1000
+    metrics.add({"stage": "encode", "data_source": base_name, "format": export_format, "rows": writer.rows, "bytes": size, "wall_ms": round(encode_seconds * 1000, 2), "status": "ok"})
+    metrics.add({"stage": "stream_fetch", "data_source": base_name, "rows": writer.rows, "wall_ms": round(total_ms - encode_seconds * 1000, 2), "status": "ok"})
+    return {
+        "path": path,
+        "file_name": f"{base_name}{extension}",
+        "format": export_format,
+        "label": label,
+        "mime": mime,
+        "rows": writer.rows,
+        "size": size,
+    }
+
+def open_spool(path: str):
+    """
+    Mở file spool ở chế độ đọc nhị phân (chỉ được gọi khi người dùng bấm Download).
+    Handle được đưa thẳng cho st.download_button, Streamlit tự đọc từ đĩa; handle được đóng khi không còn tham chiếu.
+    """
+    return open(path, 'rb')
+
+def discard_spool(download_info: dict):
+    """Xóa file spool của lần export trước nếu còn tồn tại."""
+    path = (download_info or {}).get('path')
+    if path and os.path.exists(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
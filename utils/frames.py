@@ -0,0 +1,72 @@
+# utils/frames.py
+import pandas as pd
+import pyarrow as pa
+
+def compact_frame(df: pd.DataFrame, schema: dict) -> pd.DataFrame:
+    """
+    Chuyển các cột của DataFrame sang kiểu dữ liệu gọn hơn theo schema khai báo ở data_logic:
+    'category' cho cột chiều ít giá trị, 'int' cho cột số nguyên (có downcast), 'float'/'float32' cho cột số thực.
+    Số thực luôn giữ float64 vì frame này được ghi ra file export và cache (xem session_frame cho 'float32').
+    Cột không chuyển được sẽ được giữ nguyên.
+    """
+    if not schema or df.empty:
+        return df
+    for column, kind in schema.items():
+        if column not in df.columns:
+            continue
+        try:
+            if kind == 'category':
+                df[column] = df[column].astype('category')
+            elif kind == 'int':
+                df[column] = pd.to_numeric(df[column], downcast='integer')
+            elif kind in ('float', 'float32'):
+                df[column] = pd.to_numeric(df[column])
+        except (TypeError, ValueError):
+            continue
+    return df
+
+def session_frame(df: pd.DataFrame, schema: dict) -> pd.DataFrame:
+    """
+    Frame được giữ trong session state (preview, trang đang xem): các cột 'float32' của schema được downcast
+    để giảm bộ nhớ. Chỉ dùng để hiển thị, không dùng cho dữ liệu được export.
+    """
+    columns = [column for column, kind in (schema or {}).items() if kind == 'float32' and column in df.columns]
+    if not columns or df.empty:
+        return df
+    df = df.copy()
+    for column in columns:
+        try:
+            df[column] = pd.to_numeric(df[column], downcast='float')
+        except (TypeError, ValueError):
+            continue
+    return df
+
+def _arrow_type(field_type: pa.DataType, kind: str = None, widen: bool = False) -> pa.DataType:
+    if pa.types.is_dictionary(field_type):
+        field_type = field_type.value_type
+    if kind == 'int':
+        return pa.int64()
+    if kind in ('float', 'float32'):
+        return pa.float64()
+    if pa.types.is_null(field_type):
+        # Cột toàn NULL trong chunk này: chưa biết kiểu thật, dùng kiểu mà mọi chunk sau đều cast được sang
+        return pa.string()
+    if pa.types.is_integer(field_type):
+        # Cột không khai báo trong schema có thể là số nguyên ở chunk này và số thực ở chunk sau
+        return pa.float64() if widen and kind != 'category' else pa.int64()
+    if pa.types.is_floating(field_type):
+        return pa.float64()
+    if pa.types.is_large_string(field_type):
+        return pa.string()
+    return field_type
+
+def stable_arrow_table(df: pd.DataFrame, schema: dict = None) -> pa.Table:
+    """
+    Chuyển DataFrame thành Arrow Table với kiểu ổn định giữa các chunk, vì kiểu gọn được suy ra riêng cho từng chunk:
+    kiểu lấy theo schema của data_logic ('int' -> int64, 'float'/'float32' -> float64, 'category' -> giá trị gốc),
+    cột toàn NULL -> string. Khi có schema (ghi nhiều chunk), cột số nguyên không khai báo được nới thành float64.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    fields = [pa.field(field.name, _arrow_type(field.type, (schema or {}).get(field.name), schema is not None))
+              for field in table.schema]
+    return table.cast(pa.schema(fields))
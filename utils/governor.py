@@ -0,0 +1,140 @@
+# utils/governor.py
+import glob
+import os
+import tempfile
+import threading
+import time
+import pandas as pd
+from utils.config import (
+    EXPORT_SPOOL_DIR, SESSION_MEMORY_BUDGET, PROCESS_MEMORY_BUDGET, SPILL_THRESHOLD_BYTES,
+    SESSION_ARTIFACT_TTL, SESSION_SWEEP_INTERVAL
+)
+
+class SpilledFrame:
+    """DataFrame đã được ghi ra file Parquet; chỉ được đọc lại (memory-mapped) khi cần hiển thị."""
+    def __init__(self, path: str, rows: int, columns: int):
+        self.path = path
+        self.rows = rows
+        self.columns = columns
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def load(self) -> pd.DataFrame:
+        return pd.read_parquet(self.path, memory_map=True)
+
+def as_frame(obj):
+    """Trả về DataFrame từ một DataFrame hoặc SpilledFrame (None nếu file đã bị dọn)."""
+    if isinstance(obj, SpilledFrame):
+        return obj.load() if obj.exists() else None
+    return obj
+
+
+class MemoryGovernor:
+    """
+    Theo dõi dung lượng dữ liệu mỗi session giữ trong bộ nhớ và trên đĩa.
+    Vượt ngân sách (theo session hoặc toàn process) thì spill DataFrame ra đĩa;
+    session không hoạt động quá TTL sẽ bị xóa toàn bộ file tạm.
+    """
+    def __init__(self, spool_dir: str, session_budget: int, process_budget: int, spill_threshold: int, ttl: int):
+        self.spool_dir = spool_dir
+        self.session_budget = session_budget
+        self.process_budget = process_budget
+        self.spill_threshold = spill_threshold
+        self.ttl = ttl
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    def _session(self, session_id: str):
+        return self._sessions.setdefault(session_id, {'last_seen': time.time(), 'frames': {}, 'files': {}})
+
+    def touch(self, session_id: str):
+        with self._lock:
+            self._session(session_id)['last_seen'] = time.time()
+
+    def _memory_bytes(self, session_id: str = None) -> int:
+        sessions = [self._sessions.get(session_id, {'frames': {}})] if session_id else self._sessions.values()
+        return sum(size for session in sessions for size in session['frames'].values())
+
+    def store_frame(self, session_id: str, name: str, df: pd.DataFrame):
+        """Ghi nhận một DataFrame sắp được giữ trong session; trả về chính nó hoặc một SpilledFrame."""
+        size = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            session = self._session(session_id)
+            session['frames'].pop(name, None)
+            self._drop_file(session, name)
+            spill = (
+                size > self.spill_threshold
+                or self._memory_bytes(session_id) + size > self.session_budget
+                or self._memory_bytes() + size > self.process_budget
+            )
+            if not spill:
+                session['frames'][name] = size
+                return df
+        os.makedirs(self.spool_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(suffix=".parquet", dir=self.spool_dir)
+        os.close(fd)
+        df.to_parquet(path, index=False)
+        self.register_file(session_id, name, path)
+        return SpilledFrame(path, rows=len(df), columns=len(df.columns))
+
+    def register_file(self, session_id: str, name: str, path: str):
+        """Gắn một file tạm (ví dụ file download) với session để được dọn khi session bị bỏ rơi."""
+        with self._lock:
+            session = self._session(session_id)
+            self._drop_file(session, name, keep=path)
+            session['files'][name] = path
+
+    def release(self, session_id: str, name: str):
+        with self._lock:
+            session = self._session(session_id)
+            session['frames'].pop(name, None)
+            self._drop_file(session, name)
+
+    @staticmethod
+    def _drop_file(session: dict, name: str, keep: str = None):
+        path = session['files'].pop(name, None)
+        if path and path != keep and os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def sweep(self, force: bool = False):
+        """Xóa dữ liệu của các session quá TTL và các file tạm mồ côi (không session nào còn giữ)."""
+        now = time.time()
+        with self._lock:
+            if not force and now - self._last_sweep < SESSION_SWEEP_INTERVAL:
+                return
+            self._last_sweep = now
+            live_files = set()
+            for session_id, session in list(self._sessions.items()):
+                if now - session['last_seen'] > self.ttl:
+                    for name in list(session['files']):
+                        self._drop_file(session, name)
+                    del self._sessions[session_id]
+                    continue
+                for path in session['files'].values():
+                    live_files.add(path)
+                    # Làm mới mtime để process khác không coi file của session còn sống là mồ côi
+                    if os.path.exists(path):
+                        os.utime(path, None)
+        for path in glob.glob(os.path.join(self.spool_dir, "*")):
+            try:
+                if path not in live_files and os.path.isfile(path) and now - os.path.getmtime(path) > self.ttl:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            disk = 0
+            for session in self._sessions.values():
+                for path in session['files'].values():
+                    if os.path.exists(path):
+                        disk += os.path.getsize(path)
+            return {"sessions": len(self._sessions), "memory_bytes": self._memory_bytes(), "disk_bytes": disk}
+
+
+governor = MemoryGovernor(EXPORT_SPOOL_DIR, SESSION_MEMORY_BUDGET, PROCESS_MEMORY_BUDGET, SPILL_THRESHOLD_BYTES, SESSION_ARTIFACT_TTL)
@@ -0,0 +1,133 @@
+# utils/jobs.py
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from utils.config import EXPORT_WORKERS, LARGE_EXPORT_WORKERS, JOB_RETENTION, JOB_ABANDON_TIMEOUT, QUERY_WATCHDOG_INTERVAL
+from utils.cancellation import query_registry, owned_by
+
+class Job:
+    """Một yêu cầu export chạy nền, có trạng thái và tiến độ để trang web theo dõi."""
+    QUEUED, COUNTING, FETCHING, ENCODING, DONE, FAILED = 'queued', 'counting', 'fetching', 'encoding', 'done', 'failed'
+    FINAL_STATES = (DONE, FAILED)
+
+    def __init__(self, kind: str, data_source: str, lane: str = 'small'):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.data_source = data_source
+        self.lane = lane
+        self.state = self.QUEUED
+        self.rows = 0
+        self.result = None
+        self.preview = None
+        self.error = None
+        self.traceback = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.touched_at = self.created_at
+
+    @property
+    def finished(self) -> bool:
+        return self.state in self.FINAL_STATES
+
+    def update(self, state: str = None, rows: int = None):
+        if state is not None:
+            self.state = state
+        if rows is not None:
+            self.rows = rows
+
+    def add_rows(self, count: int):
+        self.rows += count
+
+    def touch(self):
+        """Đánh dấu job vẫn đang được trang web theo dõi."""
+        self.touched_at = time.time()
+
+
+class JobManager:
+    """
+    Hàng đợi job export dùng chung cho toàn bộ process.
+    Sử dụng mẫu Singleton để mọi session dùng chung một worker pool có giới hạn.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = super(JobManager, cls).__new__(cls)
+                # Mỗi lane có worker pool riêng để export nhỏ không phải xếp hàng sau export lớn
+                cls._instance._executors = {
+                    'small': ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="export-job"),
+                    'large': ThreadPoolExecutor(max_workers=LARGE_EXPORT_WORKERS, thread_name_prefix="export-job-large"),
+                }
+                cls._instance._jobs = {}
+                cls._instance._lock = threading.Lock()
+                threading.Thread(target=cls._instance._reap_abandoned, name="job-reaper", daemon=True).start()
+        return cls._instance
+
+    def submit(self, kind: str, data_source: str, func, lane: str = 'small') -> Job:
+        """Đưa một job vào hàng đợi của `lane` ('small' hoặc 'large'). `func` nhận đối tượng Job và trả về kết quả."""
+        job = Job(kind, data_source, lane)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._executors[lane].submit(self._run, job, func)
+        return job
+
+    def _run(self, job: Job, func):
+        job.started_at = time.time()
+        try:
+            # Các truy vấn của job được đăng ký theo id của job để có thể hủy
+            with owned_by(job.id):
+                query_registry.check()
+                job.result = func(job)
+            job.state = Job.DONE
+        except Exception as e:
+            job.error = e
+            job.traceback = traceback.format_exc()
+            job.state = Job.FAILED
+        finally:
+            job.finished_at = time.time()
+            query_registry.release(job.id)
+
+    def cancel(self, job_id: str):
+        """Hủy một job: job chưa chạy sẽ dừng ngay khi bắt đầu, truy vấn đang chạy bị KILL QUERY."""
+        job = self.get(job_id)
+        if job is not None and not job.finished:
+            query_registry.cancel(job.id)
+
+    def _reap_abandoned(self):
+        """Hủy các job mà không trang web nào còn theo dõi (tab đã đóng hoặc đã rời trang)."""
+        while True:
+            time.sleep(QUERY_WATCHDOG_INTERVAL)
+            now = time.time()
+            with self._lock:
+                abandoned = [job.id for job in self._jobs.values() if not job.finished and now - job.touched_at > JOB_ABANDON_TIMEOUT]
+            for job_id in abandoned:
+                query_registry.cancel(job_id)
+
+    def get(self, job_id: str):
+        if not job_id:
+            return None
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def discard(self, job_id: str):
+        """Bỏ một job đã kết thúc sau khi kết quả của nó đã được sử dụng."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.finished:
+                del self._jobs[job_id]
+
+    def active_count(self, lane: str = None) -> int:
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.finished and lane in (None, job.lane))
+
+    def _prune(self):
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished and now - job.finished_at > JOB_RETENTION]
+        for job_id in expired:
+            del self._jobs[job_id]
@@ -1,19 +1,41 @@
 # utils/managers.py
 import streamlit as st
+import time
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, nullcontext
+from datetime import date, timedelta
 from sqlalchemy import text
-from sqlalchemy.exc import OperationalError, ProgrammingError
-from utils.database import DatabaseManager # Đảm bảo bạn có file này
+from utils.database import DatabaseManager, DatabaseConfigError # Đảm bảo bạn có file này
+from utils.config import (
+    MAX_EXPORT_ROWS, MAX_EXPORT_DAYS, MAX_EXPORT_MONTHS, EXPORT_CHUNK_SIZE, SHARD_WORKERS, FUSED_EXPORT, PARTITION_SETTLE_DAYS, SINGLE_FLIGHT_ENABLED,
+    PREVIEW_PAGE_SIZE, STATEMENT_TIMEOUT
+)
+from utils.dates import split_date_range
+from utils.frames import compact_frame, session_frame
+from utils.metrics import metrics
+from utils.singleflight import single_flight
+from utils.cancellation import query_registry, current_owner, owned_by, QueryCancelledError, QueryTimeoutError
+from utils.cache import result_cache, partition_cache, make_cache_key
+from utils.jobs import Job, JobManager
+from utils.admission import admission, Decision
+from utils.export import export_to_spool, discard_spool
+from utils.session import log_dev_error, store_preview, store_download, current_session_id
+from utils.governor import governor
+from utils.usage import usage_log
+from utils.plans import slow_queries
 from data_logic import kwl_data, kw_pfm_data, product_tracking_data
+from data_logic.registry import statements
 
 
 class ValidationManager:
     """Chịu trách nhiệm xác thực tất cả các đầu vào của người dùng."""
-    def __init__(self, workspace_id, storefront_input, start_date, end_date):
+    def __init__(self, workspace_id, storefront_input, start_date, end_date, data_source: str = None):
         self.workspace_id = workspace_id
         self.storefront_input = storefront_input
         self.start_date = start_date
         self.end_date = end_date
+        self.data_source = data_source
         self.errors = []
 
     def validate(self):
@@ -43,77 +65,706 @@ class ValidationManager:
     def _validate_dates(self):
         if self.start_date > self.end_date:
             self.errors.append("Start date cannot be after end date.")
-        else:
-            ids = [s.strip() for s in self.storefront_input.split(',') if s.strip()]
-            num_storefronts = len(ids)
-            date_range_days = (self.end_date - self.start_date).days
-            max_days_allowed = 60 if num_storefronts <= 2 else 30
-            if date_range_days > max_days_allowed:
-                self.errors.append(f"With {num_storefronts} storefront(s), the max period is {max_days_allowed} days.")
+        # Giới hạn theo chi phí thực tế do AdmissionController quyết định; ở đây chỉ chặn khoảng ngày bất hợp lý
+        elif (self.end_date - self.start_date).days + 1 > MAX_EXPORT_DAYS:
+            self.errors.append(f"The max period is {MAX_EXPORT_DAYS} days.")
+        elif len(split_date_range(self.start_date.strftime('%Y-%m-%d'), self.end_date.strftime('%Y-%m-%d'))) > MAX_EXPORT_MONTHS:
+            self.errors.append(f"The period can cover at most {MAX_EXPORT_MONTHS} calendar months.")
 
 class DataManager:
     """Chịu trách nhiệm cho tất cả các hoạt động truy vấn CSDL."""
-    QUERY_MAP = {'kwl': kwl_data.get_query, 'kw_pfm': kw_pfm_data.get_query, 'pt': product_tracking_data.get_query}
+    MODULE_MAP = {'kwl': kwl_data, 'kw_pfm': kw_pfm_data, 'pt': product_tracking_data}
 
     def __init__(self, data_source: str):
         self.data_source = data_source
         self.db_manager = DatabaseManager()
-        if data_source not in self.QUERY_MAP: raise ValueError(f"Unknown data source: {data_source}")
-        self.get_query_func = self.QUERY_MAP[data_source]
+        if data_source not in self.MODULE_MAP: raise ValueError(f"Unknown data source: {data_source}")
+        self.shard_by = getattr(self.MODULE_MAP[data_source], 'SHARD_BY', None)
+        self.order_by = getattr(self.MODULE_MAP[data_source], 'ORDER_BY', None)
+        self.schema = getattr(self.MODULE_MAP[data_source], 'SCHEMA', {})
+        self.column_blocks = getattr(self.MODULE_MAP[data_source], 'COLUMN_BLOCKS', {})
+        self.page_key = getattr(self.MODULE_MAP[data_source], 'PAGE_KEY', None)
+        self.statement_timeout = getattr(self.MODULE_MAP[data_source], 'STATEMENT_TIMEOUT', STATEMENT_TIMEOUT)
+        # Có thể bị AdmissionController hạ xuống khi server bận
+        self.shard_workers = SHARD_WORKERS
+        # True: không đọc result cache (dữ liệu chưa chốt) mà truy vấn lại, ví dụ export delta cần dữ liệu mới hơn watermark
+        self.refresh = False
+        statements.register(data_source, self.MODULE_MAP[data_source].query_params, self.column_blocks)
+
+    @classmethod
+    def schema_for(cls, data_source: str) -> dict:
+        return getattr(cls.MODULE_MAP.get(data_source), 'SCHEMA', {})
+
+    @classmethod
+    def available_columns(cls, data_source: str) -> list:
+        """Các cột có thể chọn khi export (rỗng nếu nguồn dữ liệu không hỗ trợ chọn cột)."""
+        return list(getattr(cls.MODULE_MAP.get(data_source), 'COLUMNS', []))
+
+    def _columns(self, query_type: str, columns: list = None):
+        if query_type != 'data' or not columns:
+            return None
+        # Cột dùng để sắp xếp luôn được truy vấn (ORDER BY trong SQL và khi ghép shard), rồi bỏ khỏi kết quả ở _select
+        if self.order_by and self.order_by[0] not in columns:
+            columns = list(columns) + [self.order_by[0]]
+        return columns
+
+    def _statement(self, query_type: str, params: dict, limit: int = None):
+        """Câu lệnh đã biên dịch (dùng chung giữa các lần gọi) và tham số để bind, xem data_logic/registry.py."""
+        return statements.statement(self.data_source, query_type, params, self._columns(query_type, params.get('columns')), limit)
 
     def _fetch(self, query_type: str, params: dict, limit: int = None):
-        query_str = self.get_query_func(query_type)
-        if not query_str or not query_str.strip(): raise FileNotFoundError(f"SQL query for '{self.data_source}' ('{query_type}') is empty.")
-        if limit: query_str += f" LIMIT {int(limit)}"
-        with self.db_manager.get_session() as db:
-            return pd.read_sql(text(query_str), db.connection(), params=params)
+        with metrics.stage(f"fetch_{query_type}", self.data_source, limit=limit) as record:
+            df = self._load(query_type, params, limit, record)
+            record['rows'] = len(df)
+            return df
 
-    def get_count(self, params: dict):
+    def _load(self, query_type: str, params: dict, limit: int, record: dict):
+        cache = self._cache_for(params)
+        cache_key = make_cache_key(self.data_source, query_type, params, limit)
+        cached = cache.get(cache_key) if self._reads(cache) else None
+        record['cache'] = 'hit' if cached is not None else 'miss'
+        if cached is not None:
+            return compact_frame(cached, self.schema) if query_type == 'data' else cached
+        if limit and self._reads(cache):
+            # Nếu toàn bộ dữ liệu đã có trong cache thì cắt lấy phần preview, không cần truy vấn lại
+            full = cache.get(make_cache_key(self.data_source, query_type, params))
+            if full is not None:
+                record['cache'] = 'hit'
+                return compact_frame(full.head(int(limit)).reset_index(drop=True), self.schema)
+        statement, bound = self._statement(query_type, params, limit=limit)
+        with self._coalesce(cache, cache_key):
+            # Một truy vấn giống hệt (session/process khác) có thể vừa ghi kết quả trong lúc chờ khóa
+            if self._reads(cache) and cache.contains(cache_key):
+                coalesced = cache.get(cache_key)
+                if coalesced is not None:
+                    record['cache'] = 'coalesced'
+                    return compact_frame(coalesced, self.schema) if query_type == 'data' else coalesced
+            with self.db_manager.get_session() as db:
+                with metrics.stage(f"sql_{query_type}", self.data_source) as sql_record:
+                    with query_registry.track(db.connection(), self.data_source, self.statement_timeout):
+                        df = pd.read_sql(statement, db.connection(), params=bound)
+                    sql_record['rows'] = len(df)
+                slow_queries.record(self.data_source, query_type, statement, bound, sql_record['wall_ms'] / 1000)
+            if query_type == 'data':
+                with metrics.stage("frame", self.data_source, rows=len(df)) as frame_record:
+                    df = compact_frame(df, self.schema)
+                    frame_record['bytes'] = int(df.memory_usage(deep=True).sum())
+            cache.put(cache_key, df)
+        return df
+
+    @staticmethod
+    def _coalesce(cache, cache_key: str):
+        """Khóa single-flight theo cache key; chỉ có tác dụng khi kết quả được cache để chia sẻ."""
+        if SINGLE_FLIGHT_ENABLED and cache.enabled:
+            return single_flight.exclusive(cache_key)
+        return nullcontext()
+
+    def _is_closed(self, params: dict) -> bool:
+        """Shard có nằm trọn trong khoảng thời gian đã chốt (dữ liệu không còn thay đổi) hay không."""
+        if not self.shard_by or not partition_cache.enabled:
+            return False
+        cutoff = (date.today() - timedelta(days=PARTITION_SETTLE_DAYS)).strftime('%Y-%m-%d')
+        return params['end_date'] < cutoff
+
+    def _cache_for(self, params: dict):
+        return partition_cache if self._is_closed(params) else result_cache
+
+    def _reads(self, cache) -> bool:
+        """Có dùng kết quả đã cache hay không. Khi refresh, dữ liệu chưa chốt luôn được truy vấn lại (kết quả mới vẫn được ghi vào cache)."""
+        return not (self.refresh and cache is result_cache)
+
+    def _shard_params(self, params: dict):
+        """
+        Tách params thành các shard theo tháng. Shard đã chốt được tách tiếp theo từng storefront
+        để mỗi phân vùng (storefront, tháng) được cache riêng và dùng lại cho các lần export khác.
+        Trả về [params] nếu nguồn dữ liệu không hỗ trợ chia shard.
+        """
+        if not self.shard_by:
+            return [params]
+        shards = []
+        for start, end in split_date_range(params['start_date'], params['end_date']):
+            shard = {**params, 'start_date': start, 'end_date': end}
+            if self._is_closed(shard) and len(params['storefront_ids']) > 1:
+                shards.extend({**shard, 'storefront_ids': [storefront_id]} for storefront_id in sorted(params['storefront_ids']))
+            else:
+                shards.append(shard)
+        return shards
+
+    def _iter_shards(self, query_type: str, shards: list):
+        """
+        Chạy các shard song song trên thread pool và trả kết quả theo đúng thứ tự. Số shard truy vấn cùng lúc
+        của cả process bị chặn bởi kích thước connection pool (xem _shard_task).
+        """
+        workers = max(1, min(len(shards), self.shard_workers, self.db_manager.max_connections))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"shard-{self.data_source}") as executor:
+            yield from executor.map(self._shard_task(lambda shard: self._fetch(query_type, shard)), shards)
+
+    def _shard_task(self, func):
+        """
+        Chạy `func` trên thread của shard: giữ chủ sở hữu truy vấn (job) của thread hiện tại và chiếm một slot
+        trong DatabaseManager.shard_slots, để tổng số shard đang truy vấn của cả process không vượt quá connection pool.
+        """
+        owner = current_owner.get()
+        slots = self.db_manager.shard_slots
+        def run(shard):
+            with owned_by(owner):
+                # Vẫn dừng được nếu job bị hủy trong lúc chờ slot
+                while not slots.acquire(timeout=1):
+                    query_registry.check()
+                try:
+                    query_registry.check()
+                    return func(shard)
+                finally:
+                    slots.release()
+        return run
+
+    def _count_shard(self, params: dict):
+        if self._is_closed(params):
+            # Phân vùng dữ liệu đã có trong cache thì số dòng chính là kết quả đếm
+            num_rows = partition_cache.row_count(make_cache_key(self.data_source, 'data', params))
+            if num_rows is not None:
+                return num_rows
         count_df = self._fetch('count', params)
         return count_df.iloc[0, 0] if not count_df.empty else 0
 
+    def get_count(self, params: dict):
+        shards = self._shard_params(params)
+        if len(shards) == 1:
+            return self._count_shard(params)
+        workers = max(1, min(len(shards), self.shard_workers, self.db_manager.max_connections))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"shard-{self.data_source}") as executor:
+            return int(sum(executor.map(self._shard_task(self._count_shard), shards)))
+
+    def cached_count(self, params: dict):
+        """Số dòng của `params` nếu đã biết từ cache (kết quả hoặc lần đếm trước của mọi shard), không truy vấn CSDL; None nếu chưa biết."""
+        total = 0
+        for shard in self._shard_params(params):
+            cache = self._cache_for(shard)
+            if not self._reads(cache):
+                return None
+            num_rows = cache.row_count(make_cache_key(self.data_source, 'data', shard))
+            if num_rows is None:
+                count_df = cache.get(make_cache_key(self.data_source, 'count', shard))
+                if count_df is None:
+                    return None
+                num_rows = int(count_df.iloc[0, 0]) if not count_df.empty else 0
+            total += num_rows
+        return int(total)
+
+    def supports_delta(self) -> bool:
+        """Nguồn có truy vấn watermark và kết quả group theo tháng (export delta chỉ cần tính lại các tháng bị ảnh hưởng)."""
+        return self.shard_by == "month" and "watermark" in self.MODULE_MAP[self.data_source].query_params
+
+    def get_watermark(self, params: dict):
+        """Thời điểm created_datetime mới nhất trong phạm vi `params` (chuỗi ISO), None nếu không có dữ liệu."""
+        statement, bound = self._statement('watermark', params)
+        with metrics.stage("sql_watermark", self.data_source):
+            with self.db_manager.get_session() as db:
+                with query_registry.track(db.connection(), self.data_source, self.statement_timeout):
+                    value = db.connection().execute(statement, bound).scalar()
+        if value is None:
+            return None
+        return value.isoformat(sep=' ') if hasattr(value, 'isoformat') else str(value)
+
+    @staticmethod
+    def _select(df: pd.DataFrame, params: dict):
+        """Chỉ giữ các cột người dùng đã chọn: bỏ cột sắp xếp/PAGE_KEY được thêm vào truy vấn (xem _columns)."""
+        columns = params.get('columns')
+        if not columns:
+            return df
+        extra = [column for column in df.columns if column not in columns]
+        return df.drop(columns=extra) if extra else df
+
     def get_data(self, params: dict, limit: int = None):
-        return self._fetch('data', params, limit=limit)
+        shards = self._shard_params(params)
+        if limit or len(shards) == 1:
+            return self._select(self._fetch('data', params, limit=limit), params)
+        # Ghép các shard làm mất kiểu category (mỗi shard có tập giá trị khác nhau) nên cần áp dụng lại schema
+        df = pd.concat(list(self._iter_shards('data', shards)), ignore_index=True)
+        return self._select(self._sort(compact_frame(df, self.schema)), params)
+
+    def get_page(self, params: dict, cursor: tuple = None, page_size: int = PREVIEW_PAGE_SIZE):
+        """
+        Phân trang keyset theo PAGE_KEY: trả về các dòng đứng sau `cursor` (sắp xếp theo key)
+        và cursor của trang kế tiếp (None nếu đây là trang cuối).
+        Nếu kết quả đầy đủ đã có trong cache (thường do job export vừa ghi) thì phân trang trên đó, không truy vấn lại.
+        Giá trị NULL của key đứng trước mọi giá trị khác (như ORDER BY tăng dần của MySQL/SingleStore/SQLite).
+        """
+        if not self.page_key:
+            raise ValueError(f"Data source '{self.data_source}' does not support pagination.")
+        with metrics.stage("page", self.data_source) as record:
+            cached = self._cached_result(params)
+            record['cache'] = 'hit' if cached is not None else 'miss'
+            df = self._page_from_frame(cached, cursor, page_size) if cached is not None else self._page_from_sql(params, cursor, page_size)
+            record['rows'] = len(df)
+        # Trang chỉ dùng để hiển thị và được giữ trong session
+        df = session_frame(compact_frame(df, self.schema), self.schema)
+        # Đổi kiểu numpy sang kiểu Python để driver CSDL bind được tham số
+        next_cursor = tuple(None if pd.isna(v) else v.item() if hasattr(v, 'item') else v
+                            for v in df.iloc[-1][list(self.page_key)]) if len(df) == page_size else None
+        return self._select(df, params), next_cursor
+
+    def _cached_result(self, params: dict):
+        """Kết quả đầy đủ của `params` nếu đã có trong cache (toàn bộ truy vấn hoặc mọi shard) và chứa đủ PAGE_KEY."""
+        frames = []
+        for shard in self._shard_params(params):
+            cache = self._cache_for(shard)
+            df = cache.get(make_cache_key(self.data_source, 'data', shard)) if self._reads(cache) else None
+            if df is None:
+                return None
+            frames.append(df)
+        df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+        # Export chỉ chọn vài cột có thể không chứa các cột key
+        return df if all(key in df.columns for key in self.page_key) else None
+
+    def _page_from_frame(self, df: pd.DataFrame, cursor: tuple, page_size: int):
+        keys = list(self.page_key)
+        plain = {key: df[key].astype(object) if isinstance(df[key].dtype, pd.CategoricalDtype) else df[key] for key in keys}
+        order = pd.DataFrame(plain).sort_values(keys, na_position='first', kind='stable').index
+        if cursor is not None:
+            # Tương ứng điều kiện (k1, k2, ...) > (c1, c2, ...) trong _page_from_sql
+            after = pd.Series(False, index=df.index)
+            equal = pd.Series(True, index=df.index)
+            for key, value in zip(keys, cursor):
+                column = plain[key]
+                if value is None:
+                    greater, same = column.notna(), column.isna()
+                else:
+                    filled = column.where(column.notna(), value)
+                    greater = column.notna() & (filled > value)
+                    same = column.notna() & (filled == value)
+                after |= equal & greater
+                equal &= same
+            order = order[after.loc[order].to_numpy()]
+        return df.loc[order[:page_size]].reset_index(drop=True)
+
+    def _page_from_sql(self, params: dict, cursor: tuple, page_size: int):
+        columns = params.get('columns')
+        if columns:
+            columns = list(columns) + [key for key in self.page_key if key not in columns]
+        keys = [f"`{key}`" for key in self.page_key]
+        query_str, page_params = statements.compile(self.data_source, 'data', params, self._columns('data', columns))
+        page_params['_page_size'] = int(page_size)
+        where = "TRUE"
+        if cursor is not None:
+            # (k1, k2, ...) > (c1, c2, ...) viết dạng mở rộng để không phụ thuộc hỗ trợ so sánh tuple của CSDL.
+            # `col > NULL` và `col = NULL` luôn sai nên cursor NULL được so sánh bằng IS NULL / IS NOT NULL
+            def same(j):
+                return f"{keys[j]} IS NULL" if cursor[j] is None else f"{keys[j]} = :_cursor_{j}"
+            def greater(i):
+                return f"{keys[i]} IS NOT NULL" if cursor[i] is None else f"{keys[i]} > :_cursor_{i}"
+            terms = ["(" + " AND ".join([same(j) for j in range(i)] + [greater(i)]) + ")" for i in range(len(keys))]
+            page_params.update({f"_cursor_{i}": value for i, value in enumerate(cursor) if value is not None})
+            where = " OR ".join(terms)
+        statement = text(
+            f"SELECT * FROM ({query_str}\n) AS page_source"
+            f" WHERE {where} ORDER BY {', '.join(keys)} LIMIT :_page_size"
+        )
+        started = time.perf_counter()
+        with self.db_manager.get_session() as db:
+            with query_registry.track(db.connection(), self.data_source, self.statement_timeout):
+                df = pd.read_sql(statement, db.connection(), params=page_params)
+        slow_queries.record(self.data_source, 'page', statement, page_params, time.perf_counter() - started)
+        return df
+
+    def _sort(self, df: pd.DataFrame):
+        if not self.order_by or df.empty:
+            return df
+        column, ascending = self.order_by
+        return df.sort_values(column, ascending=ascending, ignore_index=True)
+
+    def iter_data(self, params: dict, chunk_size: int = EXPORT_CHUNK_SIZE):
+        """
+        Đọc dữ liệu theo từng chunk để bộ nhớ không tăng theo số dòng: qua server-side cursor, hoặc khi gộp truy vấn
+        (single-flight) thì ghi hết kết quả vào cache trước rồi đọc lại file cache theo chunk.
+        Nơi nhận nên đóng generator (contextlib.closing) khi dừng giữa chừng để trả lại kết nối ngay.
+        """
+        with closing(self._iter_chunks(params, chunk_size)) as chunks:
+            for chunk in chunks:
+                yield self._select(chunk, params)
+
+    def _iter_chunks(self, params: dict, chunk_size: int):
+        shards = self._shard_params(params)
+        if len(shards) > 1:
+            # Các shard đã được cache riêng; nguồn cần sắp xếp lại phải ghép toàn bộ trước khi trả về
+            frames = [self.get_data(params)] if self.order_by else self._iter_shards('data', shards)
+            for df in frames:
+                yield from self._slice(df, chunk_size)
+            return
+        cache = self._cache_for(params)
+        cache_key = make_cache_key(self.data_source, 'data', params)
+        cached = cache.iter_chunks(cache_key, chunk_size) if self._reads(cache) else None
+        if cached is None and SINGLE_FLIGHT_ENABLED and cache.enabled:
+            # Khóa single-flight chỉ được giữ trong lúc truy vấn và ghi kết quả vào cache, không giữ trong lúc nơi nhận
+            # xử lý các chunk: generator có thể bị treo giữa chừng (nơi nhận lỗi) và giữ khóa đến khi bị thu hồi
+            with single_flight.exclusive(cache_key):
+                if not (self._reads(cache) and cache.contains(cache_key)):
+                    for _ in self._stream(params, cache.writer(cache_key, self.schema), chunk_size):
+                        pass
+            cached = cache.iter_chunks(cache_key, chunk_size)
+        if cached is not None:
+            for chunk in cached:
+                yield compact_frame(chunk, self.schema)
+            return
+        # Không dùng cache (hoặc không ghi được vào cache): stream thẳng từ CSDL
+        yield from self._stream(params, cache.writer(cache_key, self.schema), chunk_size)
+
+    def _stream(self, params: dict, cache_writer, chunk_size: int):
+        """Đọc kết quả từ CSDL theo từng chunk qua server-side cursor, đồng thời ghi vào cache."""
+        statement, bound = self._statement('data', params)
+        try:
+            with self.db_manager.get_session() as db:
+                connection = db.connection().execution_options(stream_results=True, max_row_buffer=chunk_size)
+                # Chỉ tính thời gian chờ CSDL trả chunk, không tính thời gian nơi nhận xử lý chunk (ghi file)
+                sql_seconds, started = 0.0, time.perf_counter()
+                with query_registry.track(connection, self.data_source, self.statement_timeout):
+                    for chunk in pd.read_sql(statement, connection, params=bound, chunksize=chunk_size):
+                        sql_seconds += time.perf_counter() - started
+                        # Dừng ngay giữa các chunk nếu job đã bị hủy
+                        query_registry.check()
+                        chunk = compact_frame(chunk, self.schema)
+                        cache_writer.write(chunk)
+                        yield chunk
+                        started = time.perf_counter()
+                sql_seconds += time.perf_counter() - started
+            slow_queries.record(self.data_source, 'data', statement, bound, sql_seconds)
+        except BaseException:
+            cache_writer.abort()
+            raise
+        cache_writer.commit()
+
+    @staticmethod
+    def _slice(df: pd.DataFrame, chunk_size: int):
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+
+def build_params(data_source: str, inputs: dict) -> dict:
+    """Chuyển đầu vào đã được xác thực thành params cho truy vấn (không phụ thuộc Streamlit)."""
+    return {
+        "workspace_id": int(inputs.get('workspace_id')),
+        "storefront_ids": [int(eid.strip()) for eid in inputs.get('storefront_input').split(',') if eid.strip()],
+        "start_date": inputs.get('start_date').strftime('%Y-%m-%d'),
+        "end_date": inputs.get('end_date').strftime('%Y-%m-%d'),
+        "data_source": data_source,
+        "export_format": inputs.get('export_format', 'csv'),
+        # Chỉ thêm khi người dùng chọn cột, để lần export đầy đủ giữ nguyên cache key như trước
+        **({"columns": list(inputs['columns'])} if inputs.get('columns') else {}),
+        **_filter_options(data_source, inputs.get('options', {}))
+    }
+
+def _filter_options(data_source: str, options: dict) -> dict:
+    """Đổi giá trị "không lọc" của form (FILTER_ANY, ví dụ 'All', -1) thành None."""
+    any_values = getattr(DataManager.MODULE_MAP.get(data_source), 'FILTER_ANY', {})
+    return {key: None if key in any_values and value == any_values[key] else value for key, value in options.items()}
+
+def current_load() -> dict:
+    """Tải hiện tại của process cho AdmissionController: job lớn đang chạy/chờ và tỉ lệ kết nối đang dùng."""
+    try:
+        pool = DatabaseManager().engine.pool
+        pool_ratio = pool.checkedout() / max(DatabaseManager().max_connections, 1)
+    except Exception:
+        pool_ratio = 0
+    return {'large_active': JobManager().active_count('large'), 'pool_ratio': pool_ratio}
+
+class ExportTooLargeError(Exception):
+    """Số dòng export vượt quá giới hạn MAX_EXPORT_ROWS."""
+    def __init__(self, num_row: int):
+        super().__init__(f"Data is too large ({num_row:,}+ rows). The limit is {MAX_EXPORT_ROWS:,} rows.")
+        self.num_row = num_row
 
 class ExportProcessManager:
     """Điều phối toàn bộ quy trình từ input đến khi sẵn sàng export."""
+    # Các stage có job chạy nền; trang web chỉ theo dõi trạng thái thay vì chờ trong spinner
+    JOB_STAGES = ('counting', 'loading_preview', 'exporting_full')
+    # Loại job được chấp nhận ở mỗi stage ('fused' chạy xuyên suốt từ preview đến export)
+    STAGE_JOB_KINDS = {
+        'counting': ('counting',),
+        'loading_preview': ('loading_preview', 'fused'),
+        'exporting_full': ('exporting_full', 'fused'),
+    }
+    PREVIEW_ROWS = 500
+
     def __init__(self, data_source: str, inputs: dict):
         self.data_source = data_source
         self.inputs = inputs
         self.params = {}
 
     def run(self):
-        validator = ValidationManager(self.inputs.get('workspace_id'), self.inputs.get('storefront_input'), self.inputs.get('start_date'), self.inputs.get('end_date'))
+        validator = ValidationManager(self.inputs.get('workspace_id'), self.inputs.get('storefront_input'), self.inputs.get('start_date'), self.inputs.get('end_date'), self.data_source)
         errors = validator.validate()
         if errors:
             st.session_state.user_message = {"type": "error", "text": "\n\n".join(errors)}
             st.session_state.stage = 'initial'
             return
         self._build_params()
-        try:
-            with st.spinner("Checking data size..."):
-                data_manager = DataManager(self.data_source)
-                num_row = data_manager.get_count(self.params)
-                st.session_state.params['num_row'] = num_row
+        usage_log.record(self.data_source, self.params, self.inputs.get('preset'))
+        # Truy vấn của lần chạy trước không còn cần nữa: giải phóng kết nối ngay
+        JobManager().cancel(st.session_state.get('job_id'))
+        discard_spool(st.session_state.download_info)
+        governor.release(current_session_id(), 'download')
+        st.session_state.download_info = {}
+        st.session_state.admission = {}
+        if FUSED_EXPORT:
+            # Chỉ một lần truy vấn: preview, đếm dòng và file export đều lấy từ cùng một luồng dữ liệu.
+            # Số dòng đã có trong cache được dùng để tiếp nhận (và từ chối) trước khi stream
+            num_row = self._cached_count()
+            st.session_state.params['num_row'] = num_row
             if num_row == 0:
                 st.session_state.user_message = {"type": "warning", "text": "No data found."}
                 st.session_state.stage = 'initial'
-            elif num_row > 50000:
-                st.session_state.user_message = {"type": "error", "text": f"Data is too large ({num_row:,} rows)."}
+                return
+            decision = self._admit(self.data_source, num_row)
+            if decision.action == Decision.REJECT:
+                st.session_state.user_message = {"type": "error", "text": decision.reason}
                 st.session_state.stage = 'initial'
+            elif num_row is None and decision.estimated_rows > MAX_EXPORT_ROWS:
+                # Ước tính vượt giới hạn: đếm thật trước thay vì stream đến khi chạm giới hạn (_apply_count sẽ từ chối nếu đúng)
+                st.session_state.stage = 'counting'
+                self._submit_job('counting', self.data_source, self.params)
             else:
                 st.session_state.stage = 'loading_preview'
-        except (OperationalError, ProgrammingError, Exception) as e:
+                self._submit_job('fused', self.data_source, st.session_state.params)
+        else:
+            st.session_state.stage = 'counting'
+            self._submit_job('counting', self.data_source, self.params)
+
+    @classmethod
+    def advance(cls, data_source: str):
+        """
+        Theo dõi job của stage hiện tại: tạo job nếu chưa có, áp dụng kết quả khi job kết thúc.
+        Trả về job đang chạy, hoặc None nếu stage vừa được chuyển tiếp.
+        """
+        stage = st.session_state.stage
+        if stage == 'exporting_full' and st.session_state.download_info.get('path'):
+            # File export đã được ghi sẵn bởi job 'fused'
+            st.session_state.stage = 'download_ready'
+            return None
+        job = JobManager().get(st.session_state.get('job_id'))
+        if job is not None:
+            job.touch()
+        if job is None or job.kind not in cls.STAGE_JOB_KINDS[stage]:
+            job = cls._submit_job(stage, data_source, st.session_state.params)
+        if stage == 'loading_preview' and job.kind == 'fused' and job.preview is not None and job.state != Job.FAILED:
+            store_preview(session_frame(job.preview, DataManager.schema_for(job.data_source)))
+            job.preview = None
+            st.session_state.stage = 'loaded'
+            if job.finished:
+                cls._finish(job)
+            return None
+        if not job.finished:
+            return job
+        cls._finish(job)
+        return None
+
+    @classmethod
+    def step(cls, data_source: str):
+        """
+        Chạy stage machine cho đến khi gặp một job đang chạy hoặc một stage không cần job.
+        Trả về job đang chạy nền (để hiển thị tiến độ), hoặc None.
+        """
+        for _ in range(len(cls.JOB_STAGES) + 1):
+            stage = st.session_state.stage
+            if stage in cls.JOB_STAGES:
+                job = cls.advance(data_source)
+                if job is not None:
+                    return job
+            elif stage == 'loaded' and st.session_state.df_preview is not None:
+                return cls.watch_background()
+            else:
+                return None
+        return None
+
+    @classmethod
+    def is_busy(cls) -> bool:
+        """Session còn job chạy nền cần theo dõi (vùng kết quả phải tự cập nhật)."""
+        if st.session_state.get('stage') in cls.JOB_STAGES:
+            return True
+        job = JobManager().get(st.session_state.get('job_id'))
+        return job is not None and not job.finished
+
+    @classmethod
+    def watch_background(cls):
+        """Ở stage 'loaded': trả về job 'fused' còn đang chạy nền, hoặc áp dụng kết quả nếu nó đã kết thúc."""
+        job = JobManager().get(st.session_state.get('job_id'))
+        if job is None or job.kind != 'fused':
+            return None
+        job.touch()
+        if not job.finished:
+            return job
+        cls._finish(job)
+        return None
+
+    @classmethod
+    def _finish(cls, job: Job):
+        """Áp dụng kết quả của một job đã kết thúc vào session state."""
+        stage = st.session_state.stage
+        st.session_state.job_id = None
+        # Kết quả đã được chuyển vào session: không giữ thêm bản sao trong JobManager
+        JobManager().discard(job.id)
+        if job.state == Job.FAILED:
+            cls.report_failure(job)
+            st.session_state.stage = 'initial'
+        elif job.kind == 'fused':
+            cls._apply_fused(job, stage)
+        elif stage == 'counting':
+            cls._apply_count(job.result, job.data_source)
+        elif stage == 'loading_preview':
+            store_preview(session_frame(job.result, DataManager.schema_for(job.data_source)))
+            st.session_state.stage = 'loaded'
+        elif stage == 'exporting_full':
+            store_download(job.result)
+            st.session_state.stage = 'download_ready'
+
+    @staticmethod
+    def report_failure(job: Job):
+        """Thông báo lỗi của một job thất bại cho người dùng (lỗi kỹ thuật được ghi vào Dev Log)."""
+        if isinstance(job.error, (ExportTooLargeError, QueryTimeoutError)):
+            st.session_state.user_message = {"type": "error", "text": str(job.error)}
+        elif isinstance(job.error, QueryCancelledError):
+            st.session_state.user_message = {"type": "warning", "text": "The export was stopped because the page was not open. Please run it again."}
+        else:
+            log_dev_error(job.error, job.traceback)
             st.session_state.user_message = {"type": "error", "text": "A technical error occurred. See Dev Log."}
+
+    @classmethod
+    def _apply_fused(cls, job: Job, stage: str):
+        st.session_state.params['num_row'] = job.result['rows']
+        if job.result['rows'] == 0:
+            discard_spool(job.result)
+            st.session_state.user_message = {"type": "warning", "text": "No data found."}
             st.session_state.stage = 'initial'
+            return
+        store_download(job.result)
+        if stage == 'exporting_full':
+            st.session_state.stage = 'download_ready'
 
-    def _build_params(self):
-        self.params = {
-            "workspace_id": int(self.inputs.get('workspace_id')),
-            "storefront_ids": [int(eid.strip()) for eid in self.inputs.get('storefront_input').split(',')],
-            "start_date": self.inputs.get('start_date').strftime('%Y-%m-%d'),
-            "end_date": self.inputs.get('end_date').strftime('%Y-%m-%d'),
-            "data_source": self.data_source,
-            **self.inputs.get('options', {})
+    @classmethod
+    def _apply_count(cls, num_row: int, data_source: str):
+        st.session_state.params['num_row'] = num_row
+        if num_row == 0:
+            st.session_state.user_message = {"type": "warning", "text": "No data found."}
+            st.session_state.stage = 'initial'
+        elif cls._admit(data_source, num_row).action == Decision.REJECT:
+            st.session_state.user_message = {"type": "error", "text": st.session_state.admission['reason']}
+            st.session_state.stage = 'initial'
+        else:
+            st.session_state.stage = 'loading_preview'
+            cls._submit_job('loading_preview', data_source, st.session_state.params)
+
+    @staticmethod
+    def _admit(data_source: str, num_row: int = None) -> Decision:
+        """Quyết định cách chạy export theo chi phí ước tính và tải hiện tại, lưu vào session."""
+        params = st.session_state.params
+        decision = admission.decide(data_source, DataManager.MODULE_MAP[data_source], params, current_load(), num_row)
+        st.session_state.admission = decision.to_dict()
+        if decision.action != Decision.REJECT:
+            params['export_format'] = decision.export_format
+            if decision.reason:
+                st.session_state.user_message = {"type": "info", "text": decision.reason}
+        return decision
+
+    @classmethod
+    def _submit_job(cls, kind: str, data_source: str, params: dict):
+        tasks = {
+            'counting': cls._count_task,
+            'loading_preview': cls._preview_task,
+            'exporting_full': cls._export_task,
+            'fused': cls._fused_task,
         }
-        st.session_state.params = self.params
\ No newline at end of file
+        try:
+            data_manager, params = DataManager(data_source), dict(params)
+        except DatabaseConfigError as e:
+            st.error(str(e))
+            st.stop()
+        # Đếm và preview luôn nhỏ; export đầy đủ chạy theo quyết định của AdmissionController
+        decision = st.session_state.get('admission') or {}
+        lane = decision.get('lane', 'small') if kind in ('fused', 'exporting_full') else 'small'
+        data_manager.shard_workers = decision.get('shard_workers', data_manager.shard_workers)
+        def run(job: Job):
+            with metrics.stage(f"job_{kind}", data_source, queue_wait_ms=round((job.started_at - job.created_at) * 1000, 2)) as record:
+                result = tasks[kind](job, data_manager, params)
+                record['rows'] = job.rows
+                return result
+        job = JobManager().submit(kind, data_source, run, lane=lane)
+        st.session_state.job_id = job.id
+        return job
+
+    @staticmethod
+    def _count_task(job: Job, data_manager: DataManager, params: dict):
+        job.update(state=Job.COUNTING)
+        return int(data_manager.get_count(params))
+
+    @classmethod
+    def _preview_task(cls, job: Job, data_manager: DataManager, params: dict):
+        job.update(state=Job.FETCHING)
+        df = data_manager.get_data(params, limit=cls.PREVIEW_ROWS)
+        job.update(rows=len(df))
+        return df
+
+    @staticmethod
+    def _export_task(job: Job, data_manager: DataManager, params: dict):
+        row_bytes = []
+        def tracked(chunks):
+            for chunk in chunks:
+                job.update(state=Job.ENCODING)
+                job.add_rows(len(chunk))
+                ExportProcessManager._sample_row_bytes(chunk, row_bytes)
+                yield chunk
+                job.update(state=Job.FETCHING)
+        job.update(state=Job.FETCHING)
+        # Đóng generator ngay khi export lỗi: traceback của job giữ frame này, generator treo sẽ giữ kết nối đến khi job bị xóa
+        with closing(data_manager.iter_data(params)) as chunks:
+            result = export_to_spool(tracked(chunks), data_manager.data_source, params.get('export_format', 'csv'), data_manager.schema)
+        ExportProcessManager._observe(data_manager, params, result['rows'], row_bytes)
+        return result
+
+    @staticmethod
+    def _sample_row_bytes(chunk: pd.DataFrame, row_bytes: list):
+        """Đo độ rộng dòng trên chunk đầu tiên (đủ để ước tính, không tốn chi phí cho các chunk sau)."""
+        if not row_bytes and len(chunk):
+            row_bytes.append(chunk.memory_usage(deep=True).sum() / len(chunk))
+
+    @staticmethod
+    def _observe(data_manager: DataManager, params: dict, rows: int, row_bytes: list):
+        module = DataManager.MODULE_MAP[data_manager.data_source]
+        admission.observe(data_manager.data_source, module, params, rows, int(row_bytes[0] * rows) if row_bytes else None)
+
+    @classmethod
+    def _fused_task(cls, job: Job, data_manager: DataManager, params: dict):
+        """Stream dữ liệu một lần: công bố preview ngay khi đủ dòng, đếm và ghi phần còn lại ra file export."""
+        preview_parts, published, row_bytes = [], [], []
+        def publish_preview():
+            # Session có thể lấy preview đi (đặt lại job.preview = None) nên dùng cờ riêng
+            published.append(True)
+            job.preview = pd.concat(preview_parts, ignore_index=True) if preview_parts else pd.DataFrame()
+            preview_parts.clear()
+        def tracked(chunks):
+            for chunk in chunks:
+                job.add_rows(len(chunk))
+                if job.rows > MAX_EXPORT_ROWS:
+                    raise ExportTooLargeError(job.rows)
+                cls._sample_row_bytes(chunk, row_bytes)
+                if not published:
+                    preview_parts.append(chunk.iloc[:cls.PREVIEW_ROWS - sum(len(part) for part in preview_parts)])
+                    if sum(len(part) for part in preview_parts) >= cls.PREVIEW_ROWS:
+                        publish_preview()
+                job.update(state=Job.ENCODING)
+                yield chunk
+                job.update(state=Job.FETCHING)
+            if not published:
+                publish_preview()
+        job.update(state=Job.FETCHING)
+        with closing(data_manager.iter_data(params)) as chunks:
+            result = export_to_spool(tracked(chunks), data_manager.data_source, params.get('export_format', 'csv'), data_manager.schema)
+        cls._observe(data_manager, params, result['rows'], row_bytes)
+        return result
+
+    def _cached_count(self):
+        try:
+            return DataManager(self.data_source).cached_count(self.params)
+        except DatabaseConfigError:
+            return None
+
+    def _build_params(self):
+        self.params = build_params(self.data_source, self.inputs)
+        st.session_state.params = self.params
@@ -0,0 +1,168 @@
+# utils/metrics.py
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from utils.config import METRICS_MAX_RECORDS, METRICS_JSONL_PATH, METRICS_PROM_PATH, METRICS_PROM_INTERVAL
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def _peak_rss_mb():
+    """Đỉnh bộ nhớ (RSS) của cả process kể từ khi khởi động (không giảm), đơn vị MB."""
+    if resource is None:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+def current_rss_bytes():
+    """Bộ nhớ RSS hiện tại của process (Linux), hoặc None nếu không đọc được."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class MetricsRecorder:
+    """
+    Ghi nhận thời gian, số dòng, dung lượng và bộ nhớ của từng bước (stage) trong quá trình export.
+    Dùng chung cho toàn bộ process; giữ các bản ghi gần nhất trong bộ nhớ.
+    """
+    def __init__(self, max_records: int = METRICS_MAX_RECORDS, jsonl_path: str = None, prom_path: str = None,
+                 prom_interval: float = METRICS_PROM_INTERVAL):
+        self.records = deque(maxlen=max_records)
+        self.jsonl_path = jsonl_path
+        self.prom_path = prom_path
+        self.prom_interval = prom_interval
+        self._collectors = []
+        self._lock = threading.Lock()
+        # File Prometheus được ghi lại tối đa một lần mỗi prom_interval giây, bởi một timer duy nhất
+        self._prom_lock = threading.Lock()
+        self._prom_timer = None
+        self._prom_written_at = 0.0
+
+    def register_collector(self, collector):
+        """Đăng ký một hàm trả về thêm các dòng Prometheus (ví dụ số liệu connection pool)."""
+        self._collectors.append(collector)
+
+    @contextmanager
+    def stage(self, name: str, data_source: str = None, **fields):
+        """
+        Đo một bước. Có thể gán thêm 'rows', 'bytes'... vào dict được yield trong khi chạy.
+        'rss_delta_mb' là chênh lệch RSS của process giữa lúc bắt đầu và kết thúc bước
+        (bao gồm cả các thread khác chạy song song).
+        """
+        record = {"stage": name, "data_source": data_source, **fields}
+        start = time.perf_counter()
+        start_rss = current_rss_bytes()
+        try:
+            yield record
+            record.setdefault("status", "ok")
+        except BaseException:
+            record["status"] = "error"
+            raise
+        finally:
+            record["wall_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            end_rss = current_rss_bytes()
+            if start_rss is not None and end_rss is not None:
+                record["rss_delta_mb"] = round((end_rss - start_rss) / (1024 * 1024), 1)
+            self.add(record)
+
+    def add(self, record: dict):
+        record.setdefault("timestamp", time.time())
+        record.setdefault("process_peak_rss_mb", _peak_rss_mb())
+        with self._lock:
+            self.records.append(record)
+            if self.jsonl_path:
+                with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, default=str) + "\n")
+        if self.prom_path:
+            self._schedule_prometheus_file()
+
+    def summary(self):
+        """Tổng hợp p50/p95 thời gian, tổng số dòng/bytes theo (stage, data_source)."""
+        with self._lock:
+            records = list(self.records)
+        groups = {}
+        for record in records:
+            groups.setdefault((record["stage"], record.get("data_source") or ""), []).append(record)
+        rows = []
+        for (stage, data_source), items in sorted(groups.items()):
+            walls = [item["wall_ms"] for item in items]
+            rows.append({
+                "stage": stage,
+                "data_source": data_source,
+                "count": len(items),
+                "errors": sum(1 for item in items if item.get("status") == "error"),
+                "p50_ms": _percentile(walls, 0.5),
+                "p95_ms": _percentile(walls, 0.95),
+                "rows": sum(item.get("rows") or 0 for item in items),
+                "bytes": sum(item.get("bytes") or 0 for item in items),
+            })
+        return rows
+
+    def to_jsonl(self) -> str:
+        with self._lock:
+            return "".join(json.dumps(record, default=str) + "\n" for record in self.records)
+
+    def to_prometheus(self) -> str:
+        """Xuất số liệu tổng hợp theo định dạng Prometheus text exposition."""
+        lines = [
+            "# HELP export_stage_duration_ms Export stage wall time in milliseconds.",
+            "# TYPE export_stage_duration_ms summary",
+        ]
+        totals = []
+        for row in self.summary():
+            labels = f'stage="{row["stage"]}",data_source="{row["data_source"]}"'
+            lines.append(f'export_stage_duration_ms{{{labels},quantile="0.5"}} {row["p50_ms"]}')
+            lines.append(f'export_stage_duration_ms{{{labels},quantile="0.95"}} {row["p95_ms"]}')
+            lines.append(f'export_stage_duration_ms_count{{{labels}}} {row["count"]}')
+            totals.append((labels, row))
+        for metric, key, help_text in (
+            ("export_stage_rows_total", "rows", "Rows processed by export stage."),
+            ("export_stage_bytes_total", "bytes", "Bytes produced by export stage."),
+            ("export_stage_errors_total", "errors", "Failed export stage executions."),
+        ):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            lines.extend(f"{metric}{{{labels}}} {row[key]}" for labels, row in totals)
+        peak = _peak_rss_mb()
+        if peak is not None:
+            lines.append("# HELP export_process_peak_rss_mb Peak resident memory of the process in MB.")
+            lines.append("# TYPE export_process_peak_rss_mb gauge")
+            lines.append(f"export_process_peak_rss_mb {peak}")
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+    def _schedule_prometheus_file(self):
+        """Hẹn ghi lại file Prometheus; các bản ghi đến trong lúc chờ được gộp vào cùng một lần ghi."""
+        with self._prom_lock:
+            if self._prom_timer is not None:
+                return
+            delay = max(0.0, self._prom_written_at + self.prom_interval - time.monotonic())
+            self._prom_timer = threading.Timer(delay, self._write_prometheus_file)
+            self._prom_timer.daemon = True
+            self._prom_timer.start()
+
+    def _write_prometheus_file(self):
+        with self._prom_lock:
+            self._prom_timer = None
+            self._prom_written_at = time.monotonic()
+            # File tạm riêng cho mỗi process/thread để không ghi đè lên nhau
+            tmp_path = f"{self.prom_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(self.to_prometheus())
+            os.replace(tmp_path, self.prom_path)
+
+
+metrics = MetricsRecorder(jsonl_path=METRICS_JSONL_PATH, prom_path=METRICS_PROM_PATH)
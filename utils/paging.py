@@ -0,0 +1,61 @@
+# utils/paging.py
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from utils.config import PREVIEW_PAGE_SIZE, PAGE_CACHE_PAGES
+from utils.cache import normalize_params
+from utils.managers import DataManager
+
+class PageBrowser:
+    """
+    Duyệt kết quả theo trang cho một session: giữ cursor của các trang đã xem,
+    cache vài trang gần nhất và tải trước trang kế tiếp trong nền.
+    """
+    # Dùng chung cho mọi session; tách khỏi JobManager để việc duyệt trang không chiếm chỗ của job export
+    _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="page-prefetch")
+
+    def __init__(self, data_source: str, params: dict, page_size: int = PREVIEW_PAGE_SIZE, max_pages: int = PAGE_CACHE_PAGES):
+        self.data_source = data_source
+        self.params = dict(params)
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.cursors = [None]  # cursor bắt đầu của từng trang đã biết
+        self.last_page = None
+        self._pages = OrderedDict()  # chỉ số trang -> Future[(df, next_cursor)]
+        self._data_manager = DataManager(data_source)
+
+    @classmethod
+    def supports(cls, data_source: str) -> bool:
+        module = DataManager.MODULE_MAP.get(data_source)
+        return bool(getattr(module, 'PAGE_KEY', None))
+
+    def matches(self, params: dict) -> bool:
+        return normalize_params(self.params) == normalize_params(params)
+
+    def _future(self, index: int):
+        if index in self._pages:
+            self._pages.move_to_end(index)
+            return self._pages[index]
+        future = self._executor.submit(self._data_manager.get_page, self.params, self.cursors[index], self.page_size)
+        self._pages[index] = future
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+        return future
+
+    def page(self, index: int):
+        """Trả về DataFrame của trang `index` (bắt đầu từ 0) và tải trước trang kế tiếp."""
+        try:
+            df, next_cursor = self._future(index).result()
+        except Exception:
+            # Không giữ lại kết quả lỗi để lần sau có thể thử lại
+            self._pages.pop(index, None)
+            raise
+        if next_cursor is None:
+            self.last_page = index
+        else:
+            if len(self.cursors) == index + 1:
+                self.cursors.append(next_cursor)
+            self._future(index + 1)
+        return df
+
+    def has_next(self, index: int) -> bool:
+        return self.last_page is None or index < self.last_page
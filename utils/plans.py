@@ -0,0 +1,130 @@
+# utils/plans.py
+"""
+EXPLAIN plan của các câu lệnh trong data_logic/registry.py: lấy plan, chuẩn hóa để so sánh giữa các lần chạy
+và nhận diện các thao tác tốn kém (quét toàn bảng, broadcast join).
+
+Hỗ trợ SingleStore (EXPLAIN dạng text, một cột), MySQL (EXPLAIN dạng bảng) và SQLite (EXPLAIN QUERY PLAN, CSDL thay thế
+khi benchmark). Chỉ dùng EXPLAIN: câu lệnh không được thực thi nên có thể lấy plan của truy vấn nặng bất cứ lúc nào.
+"""
+import hashlib
+import re
+import threading
+import time
+from collections import Counter, deque
+from sqlalchemy import text
+from utils.config import SLOW_QUERY_SECONDS, SLOW_QUERY_MAX
+from utils.database import DatabaseManager
+
+# Các thao tác được theo dõi: (loại, regex trên dòng plan chưa chuẩn hóa; group 1 là tên bảng)
+_FINDINGS = (
+    # SQLite: "SCAN t" (không qua index); MySQL: type=ALL; SingleStore: TableScan/ColumnStoreScan (không phải IndexSeek/IndexRangeScan)
+    ("full_scan", re.compile(r"^\s*SCAN (\w+)(?!.*\bUSING\b)")),
+    ("full_scan", re.compile(r"\btable=(\w+) type=ALL\b")),
+    ("full_scan", re.compile(r"\b(?:TableScan|ColumnStoreScan) (?:\w+\.)?(\w+)")),
+    # SingleStore: Broadcast/BroadcastLeft... (một phía của join được gửi tới mọi partition)
+    ("broadcast", re.compile(r"\bBroadcast\w*\b(?:.*?\b(?:TableScan|ColumnStoreScan|IndexSeek|IndexRangeScan) (?:\w+\.)?(\w+))?")),
+)
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_EST_ROWS_RE = re.compile(r"\best_rows:(\d+(?:\.\d+)?)")
+
+def sql_digest(sql: str) -> str:
+    return hashlib.sha256(sql.encode('utf-8')).hexdigest()[:12]
+
+def normalize_line(line: str) -> str:
+    """Bỏ các con số (ước lượng số dòng, id nội bộ) để plan chỉ khác nhau khi cấu trúc thay đổi."""
+    return _NUMBER_RE.sub("?", line.rstrip())
+
+def findings(lines) -> list:
+    """Các thao tác tốn kém trong plan, dạng '<loại>:<bảng>' (có thể lặp lại nếu xuất hiện nhiều lần)."""
+    found = []
+    for line in lines:
+        for kind, pattern in _FINDINGS:
+            match = pattern.search(line)
+            if match:
+                found.append(f"{kind}:{match.group(1) or '?'}")
+    return sorted(found)
+
+def _sqlite_lines(rows) -> list:
+    # (id, parent, notused, detail): thụt lề theo độ sâu để giữ cấu trúc cây
+    depth, lines = {0: -1}, []
+    for row in rows:
+        depth[row[0]] = depth.get(row[1], -1) + 1
+        lines.append("  " * depth[row[0]] + str(row[3]))
+    return lines
+
+def explain(connection, sql: str, bound: dict) -> dict:
+    """Lấy plan của `sql` với tham số `bound` trên `connection` (SQLAlchemy)."""
+    dialect = connection.dialect.name
+    result = connection.execute(text(f"{'EXPLAIN QUERY PLAN' if dialect == 'sqlite' else 'EXPLAIN'} {sql}"), bound)
+    columns = list(result.keys())
+    rows = result.fetchall()
+    cost = None
+    if dialect == 'sqlite':
+        # SQLite không đưa ra ước lượng chi phí
+        lines = _sqlite_lines(rows)
+    elif len(columns) == 1:
+        lines = [str(row[0]) for row in rows]
+        estimates = [float(v) for line in lines for v in _EST_ROWS_RE.findall(line)]
+        cost = sum(estimates) if estimates else None
+    else:
+        records = [dict(zip(columns, row)) for row in rows]
+        lines = [f"{r.get('select_type')} table={r.get('table')} type={r.get('type')} key={r.get('key')} {r.get('Extra') or ''}".rstrip()
+                 for r in records]
+        cost = float(sum(r.get('rows') or 0 for r in records))
+    return {
+        "dialect": dialect,
+        "sql_digest": sql_digest(sql),
+        "raw": lines,
+        "plan": [normalize_line(line) for line in lines],
+        "cost": cost,
+        "findings": findings(lines),
+    }
+
+def compare(before: dict, after: dict, cost_tolerance: float = 0.5) -> list:
+    """
+    Các hồi quy của plan `after` so với `before`: thao tác tốn kém mới xuất hiện và chi phí ước lượng
+    tăng quá `cost_tolerance` (tỉ lệ). Plan thay đổi nhưng không có hồi quy thì không được báo.
+    """
+    regressions = []
+    added = Counter(after['findings']) - Counter(before['findings'])
+    for finding, count in sorted(added.items()):
+        kind, table = finding.split(":", 1)
+        regressions.append(f"new {kind.replace('_', ' ')} on {table}" + (f" (x{count})" if count > 1 else ""))
+    if before.get('cost') and after.get('cost') is not None and after['cost'] > before['cost'] * (1 + cost_tolerance):
+        regressions.append(f"estimated cost {before['cost']:,.0f} -> {after['cost']:,.0f} (x{after['cost'] / before['cost']:.2f})")
+    return regressions
+
+class SlowQueryLog:
+    """Các truy vấn chậm gần nhất (câu lệnh và tham số) để xem lại plan trong chế độ nhà phát triển."""
+
+    def __init__(self, threshold: float = SLOW_QUERY_SECONDS, max_entries: int = SLOW_QUERY_MAX):
+        self.threshold = threshold
+        self._entries = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+
+    def record(self, data_source: str, query_type: str, statement, bound: dict, seconds: float):
+        if seconds < self.threshold:
+            return
+        with self._lock:
+            self._entries.append({
+                "timestamp": time.time(),
+                "data_source": data_source,
+                "query_type": query_type,
+                "sql": str(statement),
+                "bound": dict(bound),
+                "seconds": round(seconds, 2),
+            })
+
+    def entries(self) -> list:
+        """Mới nhất trước."""
+        with self._lock:
+            return list(reversed(self._entries))
+
+    def explain(self, entry: dict) -> dict:
+        """Plan của một truy vấn chậm (lấy một lần rồi giữ lại trong entry)."""
+        if 'plan' not in entry:
+            with DatabaseManager().get_session() as db:
+                entry['plan'] = explain(db.connection(), entry['sql'], entry['bound'])
+        return entry['plan']
+
+slow_queries = SlowQueryLog()
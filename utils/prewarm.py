@@ -0,0 +1,100 @@
+# utils/prewarm.py
+"""
+Tính trước (prewarm) kết quả của các export phổ biến nhất theo nhật ký sử dụng (utils/usage.py),
+trong khung giờ thấp điểm và với số truy vấn đồng thời giới hạn, để giờ cao điểm được phục vụ từ cache.
+
+Khoảng ngày được tính lại từ preset tại thời điểm prewarm, nên "Last month" chạy vào ngày 1 sẽ là tháng vừa kết thúc.
+Dữ liệu đã chốt (ví dụ "Last month") nằm trong partition cache (TTL dài); dữ liệu gần đây nằm trong result cache
+(RESULT_CACHE_TTL), nên khung giờ prewarm nên kết thúc không quá xa giờ bắt đầu làm việc.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from utils.config import PREWARM_WORKERS, PREWARM_WINDOW, PREWARM_TOP_N, RESULT_CACHE_ENABLED, PARTITION_CACHE_ENABLED
+from utils.dates import DATE_FORMAT, date_presets
+from utils.managers import DataManager
+from utils.metrics import metrics
+from utils.usage import usage_log
+
+def parse_window(window: str):
+    """'HH:MM-HH:MM' -> (time bắt đầu, time kết thúc). Khung giờ có thể qua nửa đêm (ví dụ 22:00-05:00)."""
+    try:
+        start, end = (datetime.strptime(part.strip(), "%H:%M").time() for part in window.split("-"))
+    except ValueError:
+        raise ValueError(f"Invalid prewarm window '{window}', expected HH:MM-HH:MM.")
+    if start == end:
+        raise ValueError(f"Invalid prewarm window '{window}': start and end are the same.")
+    return start, end
+
+def window_bounds(window: str, now: datetime):
+    """Khung giờ đang diễn ra (nếu `now` nằm trong khung) hoặc khung giờ kế tiếp: (datetime bắt đầu, datetime kết thúc)."""
+    start_time, end_time = parse_window(window)
+    def bounds(day):
+        return datetime.combine(day, start_time), datetime.combine(day + timedelta(days=1) if end_time <= start_time else day, end_time)
+    for day in (now.date() - timedelta(days=1), now.date()):
+        start, end = bounds(day)
+        if now < end:
+            return start, end
+    return bounds(now.date() + timedelta(days=1))
+
+def prewarm_params(combo: dict, today=None):
+    """Params truy vấn của một tổ hợp trong nhật ký, với khoảng ngày tính từ preset. None nếu preset không còn tồn tại."""
+    dates = date_presets(today).get(combo.get('preset'))
+    if dates is None:
+        return None
+    params = {key: value for key, value in combo.items() if key != 'preset'}
+    params.update(start_date=dates[0].strftime(DATE_FORMAT), end_date=dates[1].strftime(DATE_FORMAT))
+    return params
+
+def prewarm(combos: list, workers: int = PREWARM_WORKERS, deadline: float = None, log=print) -> list:
+    """
+    Chạy truy vấn data của từng tổ hợp (danh sách (số lần, tổ hợp) từ UsageLog.top) để ghi kết quả vào cache.
+    Tối đa `workers` truy vấn cùng lúc, mỗi truy vấn không chia shard song song. Tổ hợp chưa bắt đầu khi đã quá
+    `deadline` (epoch) sẽ bị bỏ qua. Prewarm chạy trong process riêng, không thấy tải của ứng dụng Streamlit,
+    nên việc không tranh tài nguyên với người dùng dựa vào khung giờ thấp điểm và giới hạn `workers`.
+    """
+    def warm(item):
+        count, combo = item
+        result = {"combo": combo, "uses": count}
+        params = prewarm_params(combo)
+        if params is None:
+            return {**result, "status": "skipped", "reason": "unknown preset"}
+        if deadline is not None and time.time() >= deadline:
+            return {**result, "status": "skipped", "reason": "outside the prewarm window"}
+        started = time.perf_counter()
+        try:
+            data_manager = DataManager(params['data_source'])
+            data_manager.shard_workers = 1
+            with metrics.stage("prewarm", params['data_source']) as record:
+                rows = len(data_manager.get_data(params))
+                record['rows'] = rows
+        except Exception as e:
+            result.update(status="failed", error=f"{type(e).__name__}: {e}")
+        else:
+            result.update(status="warmed", rows=rows)
+        result['seconds'] = round(time.perf_counter() - started, 2)
+        log(f"[{result['status']}] {combo['data_source']} ws{combo.get('workspace_id')} {combo['preset']} "
+            f"({count} uses): {result.get('rows', result.get('error'))}")
+        return result
+
+    if not (RESULT_CACHE_ENABLED or PARTITION_CACHE_ENABLED):
+        log("Result and partition caches are disabled; nothing to prewarm.")
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="prewarm") as executor:
+        return list(executor.map(warm, combos))
+
+def run_scheduler(top_n: int = PREWARM_TOP_N, workers: int = PREWARM_WORKERS, window: str = PREWARM_WINDOW, once: bool = False, log=print):
+    """Mỗi ngày, trong khung giờ `window`, prewarm `top_n` tổ hợp phổ biến nhất. `once`: chỉ chạy một khung giờ."""
+    while True:
+        start, end = window_bounds(window, datetime.now())
+        wait = (start - datetime.now()).total_seconds()
+        if wait > 0:
+            log(f"Next prewarm window: {start:%Y-%m-%d %H:%M} - {end:%H:%M}")
+            time.sleep(wait)
+        combos = usage_log.top(top_n)
+        log(f"Prewarming {len(combos)} combination(s) with {workers} worker(s) until {end:%H:%M}")
+        results = prewarm(combos, workers, deadline=end.timestamp(), log=log)
+        if once:
+            return results
+        # Chờ hết khung giờ hiện tại rồi mới tính khung giờ của ngày kế tiếp
+        time.sleep(max(0, (end - datetime.now()).total_seconds()))
@@ -0,0 +1,60 @@
+# utils/projection.py
+import re
+
+# Các marker trong file SQL:
+#   -- columns:begin / -- columns:end      danh sách cột của SELECT cuối cùng (mỗi cột một dòng)
+#   -- block:<tên>:begin / -- block:<tên>:end   đoạn SQL (CTE/join) chỉ cần khi có cột phụ thuộc vào nó
+#   <điều kiện> -- filter:<tham số>         dòng điều kiện chỉ giữ lại khi bộ lọc <tham số> được chọn
+_COLUMNS_RE = re.compile(r"^[ \t]*-- columns:begin[ \t]*\n(.*?)^[ \t]*-- columns:end[ \t]*$", re.S | re.M)
+_BLOCK_RE = re.compile(r"^[ \t]*-- block:(\w+):begin[ \t]*\n(.*?)^[ \t]*-- block:\1:end[ \t]*\n?", re.S | re.M)
+_ALIAS_RE = re.compile(r"\bas\s+(\w+)\s*$", re.I)
+_FILTER_RE = re.compile(r"^[^\n]*-- filter:(\w+)[ \t]*(?:\n|$)", re.M)
+
+def column_name(select_line: str) -> str:
+    """Tên cột kết quả của một dòng trong SELECT (alias, hoặc tên cột không kèm tên bảng)."""
+    expression = select_line.strip().strip(',').strip()
+    alias = _ALIAS_RE.search(expression)
+    if alias:
+        return alias.group(1)
+    if re.fullmatch(r"[\w.]+", expression):
+        return expression.rsplit('.', 1)[-1]
+    return expression
+
+def select_columns(sql: str) -> list:
+    """Danh sách cột kết quả được khai báo giữa hai marker columns:begin/end."""
+    match = _COLUMNS_RE.search(sql)
+    if not match:
+        return []
+    return [column_name(line) for line in match.group(1).splitlines() if line.strip()]
+
+def project_query(sql: str, columns, blocks: dict = None) -> str:
+    """
+    Chỉ giữ lại các cột được chọn trong SELECT cuối cùng và bỏ các block (CTE/join)
+    mà không cột nào được chọn phụ thuộc vào. `blocks`: tên block -> các cột cần block đó.
+    Nếu `columns` rỗng thì trả về truy vấn đầy đủ.
+    """
+    if not columns:
+        return sql
+    match = _COLUMNS_RE.search(sql)
+    if not match:
+        raise ValueError("This query does not support column selection.")
+    lines = {column_name(line): line.strip().strip(',').strip() for line in match.group(1).splitlines() if line.strip()}
+    unknown = [c for c in columns if c not in lines]
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(unknown)}")
+    # Giữ thứ tự cột như trong file SQL, không phụ thuộc thứ tự người dùng chọn
+    selected = [expression for name, expression in lines.items() if name in columns]
+    sql = sql[:match.start(1)] + "    " + "\n    , ".join(selected) + "\n" + sql[match.end(1):]
+    needed = {name for name, depends in (blocks or {}).items() if set(depends) & set(columns)}
+    return _BLOCK_RE.sub(lambda m: m.group(0) if m.group(1) in needed else "", sql)
+
+def filter_names(sql: str) -> set:
+    """Các bộ lọc tùy chọn (marker filter:<tham số>) trong truy vấn."""
+    return set(_FILTER_RE.findall(sql))
+
+def specialize_filters(sql: str, active) -> str:
+    """
+    Bỏ các dòng điều kiện của bộ lọc không được chọn thay vì dùng điều kiện `(:x is null or col = :x)`,
+    để mỗi tổ hợp bộ lọc là một câu lệnh riêng và CSDL chọn được plan phù hợp cho từng tổ hợp.
+    """
+    return _FILTER_RE.sub(lambda m: m.group(0) if m.group(1) in active else "", sql)
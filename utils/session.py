@@ -1,5 +1,12 @@
 # utils/session.py
+import os
 import streamlit as st
+from datetime import datetime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from utils.export import discard_spool
+from utils.governor import governor, SpilledFrame
+from utils.jobs import JobManager
+from utils.database import start_warm_up
 
 def initialize_session():
     """Khởi tạo các giá trị cần thiết trong session state nếu chúng chưa tồn tại."""
@@ -9,10 +16,86 @@ def initialize_session():
         'params': {},
         'df_preview': None,
         'download_info': {},
+        'job_id': None,
+        'bundle_job_id': None,
+        'bundle_info': {},
+        'admission': {},
+        'page_browser': None,
+        'page_index': 0,
         'user_message': None,
         'dev_logs': [],
         'dev_mode_activated': False
     }
     for key, value in defaults.items():
         if key not in st.session_state:
-            st.session_state[key] = value
\ No newline at end of file
+            st.session_state[key] = value
+    # Engine và các kết nối được tạo sẵn một lần cho cả process, không chặn lần render đầu tiên
+    start_warm_up()
+    governor.touch(current_session_id())
+    governor.sweep()
+    _expire_missing_artifacts()
+
+def current_session_id() -> str:
+    """ID của session Streamlit hiện tại (dùng để theo dõi dữ liệu mà session đang giữ)."""
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else "default"
+
+def _expire_missing_artifacts():
+    """Nếu preview/file export đã bị dọn (session bỏ rơi quá lâu) thì đưa session về trạng thái ban đầu."""
+    preview = st.session_state.df_preview
+    path = st.session_state.download_info.get('path')
+    if (isinstance(preview, SpilledFrame) and not preview.exists()) or (path and not os.path.exists(path)):
+        clear_results()
+        st.session_state.user_message = {"type": "warning", "text": "Your previous results have expired. Please run the export again."}
+    bundle_path = st.session_state.bundle_info.get('path')
+    if bundle_path and not os.path.exists(bundle_path):
+        clear_bundle()
+        st.session_state.user_message = {"type": "warning", "text": "Your previous bundle has expired. Please run it again."}
+
+def store_preview(df):
+    """Lưu preview vào session; preview lớn hoặc vượt ngân sách bộ nhớ sẽ được spill ra đĩa."""
+    st.session_state.df_preview = governor.store_frame(current_session_id(), 'df_preview', df)
+
+def store_download(download_info: dict):
+    """Lưu thông tin file export và gắn file với session để được dọn khi session bị bỏ rơi."""
+    st.session_state.download_info = download_info
+    if download_info.get('path'):
+        governor.register_file(current_session_id(), 'download', download_info['path'])
+
+def store_bundle(download_info: dict):
+    """Lưu file zip của bundle export (tách riêng khỏi download_info của trang export đơn)."""
+    st.session_state.bundle_info = download_info
+    governor.register_file(current_session_id(), 'bundle', download_info['path'])
+
+def clear_bundle():
+    """Hủy bundle đang chạy và xóa file zip của bundle trước."""
+    JobManager().cancel(st.session_state.get('bundle_job_id'))
+    st.session_state.bundle_job_id = None
+    discard_spool(st.session_state.get('bundle_info', {}))
+    governor.release(current_session_id(), 'bundle')
+    st.session_state.bundle_info = {}
+
+def clear_results():
+    """Xóa preview, file export và đưa session về stage 'initial'."""
+    session_id = current_session_id()
+    # Hủy job còn đang chạy để truy vấn không tiếp tục giữ kết nối
+    JobManager().cancel(st.session_state.get('job_id'))
+    st.session_state.job_id = None
+    discard_spool(st.session_state.get('download_info', {}))
+    governor.release(session_id, 'df_preview')
+    governor.release(session_id, 'download')
+    st.session_state.stage = 'initial'
+    st.session_state.params = {}
+    st.session_state.df_preview = None
+    st.session_state.download_info = {}
+    st.session_state.page_browser = None
+    st.session_state.page_index = 0
+
+def log_dev_error(error: Exception, traceback_text: str):
+    """Ghi lỗi kỹ thuật vào Developer Log của session hiện tại."""
+    st.session_state.dev_logs.append({
+        'timestamp': datetime.now().strftime('%H:%M:%S'),
+        'error_type': type(error).__name__,
+        'message': str(error),
+        'traceback': traceback_text,
+    })
@@ -0,0 +1,71 @@
+# utils/singleflight.py
+import hashlib
+import os
+import threading
+from contextlib import contextmanager
+from utils.config import RESULT_CACHE_DIR
+
+try:
+    import fcntl
+except ImportError:  # Windows: chỉ gộp trong cùng process
+    fcntl = None
+
+class SingleFlight:
+    """
+    Gộp các truy vấn giống hệt nhau đang chạy đồng thời.
+    Lời gọi đầu tiên giữ khóa theo key (khóa luồng trong process + lock file giữa các process);
+    các lời gọi sau chờ khóa rồi đọc kết quả mà lời gọi đầu đã ghi vào cache.
+    """
+    LOCK_STRIPES = 1024
+
+    def __init__(self, lock_dir: str):
+        self.lock_dir = lock_dir
+        self.waits = 0
+        self._guard = threading.Lock()
+        self._locks = {}
+        os.makedirs(lock_dir, exist_ok=True)
+
+    @contextmanager
+    def exclusive(self, key: str):
+        with self._guard:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            if not entry[0].acquire(blocking=False):
+                self._record_wait()
+                entry[0].acquire()
+            try:
+                with self._file_lock(key):
+                    yield
+            finally:
+                entry[0].release()
+        finally:
+            with self._guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key]
+
+    @contextmanager
+    def _file_lock(self, key: str):
+        if fcntl is None:
+            yield
+            return
+        # Dùng số lượng lock file cố định (theo hash của key) để thư mục không phình ra theo số truy vấn
+        stripe = int(hashlib.sha256(key.encode('utf-8')).hexdigest(), 16) % self.LOCK_STRIPES
+        with open(os.path.join(self.lock_dir, f"{stripe:04d}.lock"), 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self._record_wait()
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _record_wait(self):
+        with self._guard:
+            self.waits += 1
+
+
+single_flight = SingleFlight(os.path.join(RESULT_CACHE_DIR, "locks"))
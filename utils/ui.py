@@ -1,27 +1,31 @@
 # utils/ui.py
 import streamlit as st
 from datetime import datetime, timedelta
+from utils.export import EXPORT_FORMATS, available_formats, open_spool
+from utils.governor import as_frame
+import traceback
+from utils.session import clear_results, clear_bundle, store_bundle, log_dev_error
+from utils.paging import PageBrowser
+from utils.managers import DataManager, ExportProcessManager, ValidationManager
+from utils.admission import Decision
+from utils.bundle import BundleExport
+from utils.jobs import Job, JobManager
+from utils.metrics import metrics
+from utils.usage import usage_log
+from utils.config import JOB_POLL_INTERVAL
+from utils.dates import CUSTOM_RANGE, date_presets
 
 def create_input_form(source_key: str, show_kw_pfm_options: bool = False):
     """Tạo form nhập liệu chuẩn."""
     ws_key = f"ws_id_{source_key}"
     sf_key = f"sf_id_{source_key}"
     
-    today = datetime.now().date()
-    yesterday = today - timedelta(days=1)
-    date_options = {
-        "Last 30 days": {"start": today - timedelta(days=30), "end": yesterday},
-        "This month": {"start": today.replace(day=1), "end": yesterday},
-        "Last month": {
-            "start": (today.replace(day=1) - timedelta(days=1)).replace(day=1),
-            "end": today.replace(day=1) - timedelta(days=1)
-        },
-        "Custom time range": None
-    }
+    yesterday = datetime.now().date() - timedelta(days=1)
+    date_options = {**date_presets(), CUSTOM_RANGE: None}
     start_date, end_date, pfm_options = None, None, {}
 
     with st.container():
-        main_cols = st.columns(3)
+        main_cols = st.columns(4)
         with main_cols[0]:
             workspace_id = st.text_input("Workspace ID *", key=ws_key)
         with main_cols[1]:
@@ -31,15 +35,25 @@ def create_input_form(source_key: str, show_kw_pfm_options: bool = False):
                 "Select time range *", options=list(date_options.keys()), index=0, key=f"date_preset_{source_key}"
             )
 
-        if selected_option == "Custom time range":
+        if selected_option == CUSTOM_RANGE:
             custom_date_cols = st.columns(2)
             with custom_date_cols[0]:
                 start_date = st.date_input("Start Date", value=yesterday, max_value=yesterday, key=f"start_date_{source_key}")
             with custom_date_cols[1]:
                 end_date = st.date_input("End Date", value=yesterday, max_value=yesterday, key=f"end_date_{source_key}")
         else:
-            dates = date_options[selected_option]
-            start_date, end_date = dates["start"], dates["end"]
+            start_date, end_date = date_options[selected_option]
+
+        with main_cols[3]:
+            export_format = st.selectbox(
+                "Export format", options=available_formats(), format_func=lambda key: EXPORT_FORMATS[key][0], key=f"export_format_{source_key}"
+            )
+
+        available_columns = DataManager.available_columns(source_key)
+        columns = st.multiselect(
+            "Columns (leave empty to export all)", options=available_columns, key=f"columns_{source_key}",
+            help="Only the selected columns are queried and exported, which makes large exports faster."
+        ) if available_columns else []
         
         if show_kw_pfm_options:
             st.write("---")
@@ -53,58 +67,224 @@ def create_input_form(source_key: str, show_kw_pfm_options: bool = False):
                 pfm_options['product_position'] = st.number_input("Product Position", min_value=-1, value=-1, key=f'product_pos_{source_key}')
 
     st.write("---")
-    return workspace_id, storefront_input, start_date, end_date, pfm_options
+    return workspace_id, storefront_input, start_date, end_date, pfm_options, export_format, columns
 
-def display_user_message():
-    """Hiển thị thông báo (lỗi, cảnh báo) cho người dùng nếu có."""
+def display_user_message(keep: bool = False):
+    """
+    Hiển thị thông báo (lỗi, cảnh báo) cho người dùng nếu có.
+    `keep`: giữ thông báo cho lần cập nhật sau (vùng kết quả đang tự cập nhật theo job).
+    """
     if 'user_message' in st.session_state and st.session_state.user_message:
         msg = st.session_state.user_message
         if msg['type'] == 'error':
             st.error(msg['text'])
         elif msg['type'] == 'warning':
             st.warning(msg['text'])
-        st.session_state.user_message = None
+        elif msg['type'] == 'info':
+            st.info(msg['text'])
+        if not keep:
+            st.session_state.user_message = None
+
+def start_export(data_source: str, inputs: dict):
+    """Bắt đầu một lần export mới từ form của trang."""
+    st.session_state.user_message = None
+    if st.session_state.params.get('data_source') != data_source:
+        st.session_state.stage = 'initial'
+    # Preset khoảng ngày đã chọn được ghi vào nhật ký sử dụng (prewarm cache)
+    inputs = {**inputs, 'preset': st.session_state.get(f"date_preset_{data_source}")}
+    ExportProcessManager(data_source, inputs).run()
+
+def _is_polling(data_sources: tuple) -> bool:
+    return st.session_state.params.get('data_source') in data_sources and ExportProcessManager.is_busy()
+
+def render_export_results(data_sources: tuple):
+    """
+    Vùng kết quả export (stage machine) dùng chung cho các trang, chạy trong một fragment:
+    khi có job chạy nền chỉ vùng này được cập nhật định kỳ thay vì chạy lại cả trang.
+    """
+    polling = _is_polling(tuple(data_sources))
+    st.fragment(_export_results, run_every=JOB_POLL_INTERVAL if polling else None)(tuple(data_sources), polling)
+
+def _export_results(data_sources: tuple, polling: bool):
+    data_source = st.session_state.params.get('data_source')
+    job = ExportProcessManager.step(data_source) if data_source in data_sources else None
+    if _is_polling(data_sources) != polling:
+        # Job vừa bắt đầu/kết thúc: chạy lại cả trang để đăng ký lại fragment với chu kỳ cập nhật mới
+        st.rerun()
+    display_user_message(keep=polling)
+    if data_source not in data_sources:
+        return
+    stage = st.session_state.stage
+    if stage == 'loaded' and st.session_state.df_preview is not None:
+        display_data_summary_and_preview(st.session_state.df_preview, st.session_state.params)
+        display_export_buttons()
+    elif stage == 'download_ready':
+        display_download_section()
+    if job is not None:
+        # Với job 'fused', phần dữ liệu còn lại vẫn đang được đếm/ghi sau khi đã có preview
+        display_job_status(job)
 
 def display_data_summary_and_preview(df_preview, params):
     """Hiển thị tóm tắt và bảng dữ liệu xem trước."""
+    df_preview = as_frame(df_preview)
     st.success("✅ Preview loaded successfully!")
     with st.expander("**Data Summary**", expanded=True):
         cols = st.columns(4)
-        cols[0].metric("Total Rows", f"{params.get('num_row', 0):,}")
+        num_row = params.get('num_row', 0)
+        cols[0].metric("Total Rows", f"{num_row:,}" if num_row is not None else "Counting...")
         cols[1].metric("Total Columns", len(df_preview.columns))
         cols[2].metric("Date Range", f"{(datetime.strptime(params['end_date'], '%Y-%m-%d') - datetime.strptime(params['start_date'], '%Y-%m-%d')).days + 1} days")
         cols[3].metric("Storefronts", len(params.get('storefront_ids', [])))
     st.subheader("Preview Data (first 500 rows)")
     st.dataframe(df_preview, use_container_width=True, height=350)
+    if PageBrowser.supports(params.get('data_source')) and st.toggle("Browse all rows page by page", key="browse_pages"):
+        display_page_browser(params)
+
+def display_page_browser(params):
+    """Hiển thị kết quả theo từng trang (truy vấn keyset, trang kế tiếp được tải trước)."""
+    browser = st.session_state.page_browser
+    if browser is None or not browser.matches(params):
+        browser = st.session_state.page_browser = PageBrowser(params['data_source'], params)
+        st.session_state.page_index = 0
+    index = st.session_state.page_index
+    try:
+        with st.spinner("Loading page..."):
+            df_page = browser.page(index)
+    except Exception as e:
+        log_dev_error(e, traceback.format_exc())
+        st.error("Could not load this page. See Dev Log.")
+        return
+    first_row = index * browser.page_size + 1
+    st.caption(f"Page {index + 1}: rows {first_row:,}-{first_row + len(df_page) - 1:,}" if len(df_page) else f"Page {index + 1}: no rows")
+    st.dataframe(df_page, use_container_width=True, height=350)
+    cols = st.columns(3)
+    cols[0].button("⏮ First", disabled=index == 0, use_container_width=True, on_click=_go_to_page, args=(0,))
+    cols[1].button("◀ Previous", disabled=index == 0, use_container_width=True, on_click=_go_to_page, args=(index - 1,))
+    cols[2].button("Next ▶", disabled=not browser.has_next(index), use_container_width=True, on_click=_go_to_page, args=(index + 1,))
+
+def _go_to_page(index: int):
+    st.session_state.page_index = index
+
+def display_job_status(job):
+    """Hiển thị trạng thái và tiến độ của job export đang chạy nền."""
+    labels = {
+        'queued': "Waiting for a free worker...",
+        'counting': "Checking data size...",
+        'fetching': "Fetching data...",
+        'encoding': "Writing export file...",
+    }
+    text = labels.get(job.state, job.state)
+    if job.state == 'queued' and job.lane == 'large':
+        text = "Large export: waiting for capacity (small exports are not affected)..."
+
+    if job.rows:
+        text += f" ({job.rows:,} rows fetched)"
+    st.info(f"⏳ {text}")
 
 def display_export_buttons():
     """Hiển thị các nút để Export hoặc bắt đầu lại."""
+    # Dùng callback: trạng thái mới được áp dụng trước khi vùng kết quả chạy lại, không cần st.rerun()
     cols = st.columns(2)
     with cols[0]:
-        if st.button("🚀 Export Full Data", use_container_width=True, type="primary"):
-            st.session_state.stage = 'exporting_full'
-            st.rerun()
+        st.button("🚀 Export Full Data", use_container_width=True, type="primary", on_click=_start_full_export)
     with cols[1]:
-        if st.button("🔄 Start New Export", use_container_width=True):
-            st.session_state.stage = 'initial'
-            st.session_state.params = {}
-            st.session_state.df_preview = None
-            st.rerun()
+        st.button("🔄 Start New Export", use_container_width=True, on_click=clear_results)
+
+def _start_full_export():
+    st.session_state.stage = 'exporting_full'
 
 def display_download_section():
     """Hiển thị nút Download và nút bắt đầu lại."""
     st.success("✅ Your full data export is ready to download!")
     info = st.session_state.get('download_info', {})
+    path = info.get('path')
     st.download_button(
-        label="📥 Download CSV Now",
-        data=info.get('data', b''),
+        label=f"📥 Download {info.get('label', 'CSV')} Now",
+        # File chỉ được đọc từ đĩa khi người dùng bấm nút
+        data=(lambda: open_spool(path)) if path else b'',
         file_name=info.get('file_name', 'export.csv'),
-        mime='text/csv',
+        mime=info.get('mime', 'text/csv'),
         use_container_width=True,
         type="primary",
     )
-    if st.button("🔄 Start New Export", use_container_width=True):
-        st.session_state.stage = 'initial'
-        st.session_state.params = {}
-        st.session_state.df_preview = None
-        st.rerun()
\ No newline at end of file
+    st.button("🔄 Start New Export", use_container_width=True, on_click=clear_results)
+
+def start_bundle(data_sources: list, inputs: dict):
+    """Bắt đầu một bundle export (nhiều nguồn, cùng đầu vào) từ form của trang Bundle Export."""
+    st.session_state.user_message = None
+    clear_bundle()
+    errors = [] if data_sources else ["Select at least one data source."]
+    errors += ValidationManager(inputs.get('workspace_id'), inputs.get('storefront_input'), inputs.get('start_date'), inputs.get('end_date')).validate()
+    if errors:
+        st.session_state.user_message = {"type": "error", "text": "\n\n".join(errors)}
+        return
+    bundle = BundleExport(data_sources, inputs)
+    decision = bundle.admit()
+    if decision.action == Decision.REJECT:
+        st.session_state.user_message = {"type": "error", "text": decision.reason}
+        return
+    if decision.reason:
+        st.session_state.user_message = {"type": "info", "text": decision.reason}
+    for source, params in bundle.params.items():
+        usage_log.record(source, params, st.session_state.get("date_preset_bundle"))
+    def run(job):
+        with metrics.stage("job_bundle", ",".join(data_sources), queue_wait_ms=round((job.started_at - job.created_at) * 1000, 2)) as record:
+            result = bundle.run(job)
+            record['rows'] = job.rows
+            return result
+    job = JobManager().submit('bundle', ",".join(data_sources), run, lane=decision.lane)
+    st.session_state.bundle_job_id = job.id
+
+def _bundle_running() -> bool:
+    job = JobManager().get(st.session_state.get('bundle_job_id'))
+    return job is not None and not job.finished
+
+def render_bundle_results():
+    """Vùng kết quả của bundle export; như render_export_results, chỉ tự cập nhật khi bundle đang chạy."""
+    polling = _bundle_running()
+    st.fragment(_bundle_results, run_every=JOB_POLL_INTERVAL if polling else None)(polling)
+
+def _bundle_results(polling: bool):
+    job = JobManager().get(st.session_state.get('bundle_job_id'))
+    if job is not None:
+        job.touch()
+        if job.finished:
+            _finish_bundle(job)
+            job = None
+    if (job is not None) != polling:
+        st.rerun()
+    display_user_message(keep=polling)
+    if job is not None:
+        display_job_status(job)
+    elif st.session_state.bundle_info.get('path'):
+        display_bundle_download()
+
+def _finish_bundle(job):
+    st.session_state.bundle_job_id = None
+    JobManager().discard(job.id)
+    if job.state == Job.FAILED:
+        ExportProcessManager.report_failure(job)
+    elif job.result['rows'] == 0:
+        clear_bundle()
+        st.session_state.user_message = {"type": "warning", "text": "No data found."}
+    else:
+        store_bundle(job.result)
+
+def display_bundle_download():
+    """Hiển thị các file trong bundle, nút Download file zip và nút bắt đầu lại."""
+    info = st.session_state.bundle_info
+    st.success("✅ Your bundle is ready to download!")
+    st.dataframe(
+        [{"Source": f['data_source'], "File": f['file_name'], "Rows": f['rows']} for f in info.get('files', [])],
+        hide_index=True, use_container_width=True,
+    )
+    path = info.get('path')
+    st.download_button(
+        label=f"📥 Download ZIP ({info.get('size', 0) / 1024 ** 2:.1f} MB)",
+        data=(lambda: open_spool(path)) if path else b'',
+        file_name=info.get('file_name', 'bundle.zip'),
+        mime=info.get('mime', 'application/zip'),
+        use_container_width=True,
+        type="primary",
+    )
+    st.button("🔄 Start New Bundle", use_container_width=True, on_click=clear_bundle)
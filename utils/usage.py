@@ -0,0 +1,112 @@
+# utils/usage.py
+import json
+import os
+import threading
+import time
+from collections import Counter
+from utils.config import USAGE_LOG_PATH, USAGE_LOOKBACK_DAYS, USAGE_LOG_MAX_BYTES
+from utils.dates import CUSTOM_RANGE
+
+# Các params (ngoài khoảng ngày) xác định nội dung export; giữ nguyên để chạy lại đúng truy vấn khi prewarm
+_SCOPE_KEYS = ('workspace_id', 'storefront_ids', 'columns', 'device_type', 'display_type', 'product_position')
+_READ_BLOCK = 64 * 1024
+
+def _lines_from_end(f):
+    """Các dòng (bytes) của file nhị phân `f`, từ dòng cuối ngược lên đầu, đọc theo từng khối."""
+    f.seek(0, os.SEEK_END)
+    position, rest = f.tell(), b''
+    while position > 0:
+        size = min(_READ_BLOCK, position)
+        position -= size
+        f.seek(position)
+        lines = (f.read(size) + rest).split(b'\n')
+        rest = lines[0]
+        for line in reversed(lines[1:]):
+            if line.strip():
+                yield line
+    if rest.strip():
+        yield rest
+
+class UsageLog:
+    """Nhật ký các export đã chạy (nguồn, workspace, storefront, preset khoảng ngày) dạng JSON lines, dùng để prewarm cache."""
+
+    def __init__(self, path: str = USAGE_LOG_PATH, max_bytes: int = USAGE_LOG_MAX_BYTES,
+                 lookback_days: int = USAGE_LOOKBACK_DAYS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lookback_days = lookback_days
+        self._lock = threading.Lock()
+
+    def record(self, data_source: str, params: dict, preset: str = None):
+        if not self.path:
+            return
+        entry = {
+            "timestamp": time.time(),
+            "data_source": data_source,
+            "preset": preset or CUSTOM_RANGE,
+            **{key: params[key] for key in _SCOPE_KEYS if key in params},
+        }
+        try:
+            with self._lock:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry, default=str) + "\n")
+                if self.max_bytes and os.path.getsize(self.path) > self.max_bytes:
+                    self._compact()
+        except OSError:
+            pass  # Nhật ký chỉ phục vụ prewarm, không được làm hỏng lần export
+
+    def read(self, since: float = None):
+        """
+        Các bản ghi từ thời điểm `since` (epoch), theo thứ tự ghi; bỏ qua dòng hỏng.
+        File được đọc ngược từ cuối và dừng ở bản ghi đầu tiên cũ hơn `since` (bản ghi được ghi nối tiếp theo thời gian).
+        """
+        return list(reversed(self._read_recent(since)))
+
+    def _read_recent(self, since: float = None, max_bytes: int = None):
+        """Các bản ghi mới nhất trước (tối đa `max_bytes` bytes dữ liệu nếu được đặt)."""
+        entries, total = [], 0
+        try:
+            with open(self.path, 'rb') as f:
+                for line in _lines_from_end(f):
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if since is not None and entry.get('timestamp', 0) < since:
+                        break
+                    total += len(line) + 1
+                    if max_bytes is not None and total > max_bytes:
+                        break
+                    entries.append(entry)
+        except (FileNotFoundError, TypeError):
+            return []
+        return entries
+
+    def _compact(self):
+        """Ghi lại file chỉ với các bản ghi trong `lookback_days` ngày gần nhất, tối đa một nửa `max_bytes` (gọi khi đang giữ lock)."""
+        entries = self._read_recent(since=time.time() - self.lookback_days * 86400, max_bytes=self.max_bytes // 2)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(entry, default=str) + "\n" for entry in reversed(entries))
+        os.replace(tmp_path, self.path)
+
+    def top(self, n: int, lookback_days: int = USAGE_LOOKBACK_DAYS):
+        """
+        `n` tổ hợp (nguồn, preset, workspace, storefront, cột, bộ lọc) được export nhiều nhất trong `lookback_days` ngày.
+        Export với khoảng ngày tự nhập không được tính vì không lặp lại được.
+        Trả về danh sách (số lần, tổ hợp), tổ hợp là dict gồm data_source, preset và các params xác định nội dung.
+        """
+        counts = Counter()
+        for entry in self.read(since=time.time() - lookback_days * 86400):
+            if entry.get('preset') == CUSTOM_RANGE:
+                continue
+            scope = {key: entry[key] for key in ('data_source', 'preset', *_SCOPE_KEYS) if key in entry}
+            if 'storefront_ids' in scope:
+                scope['storefront_ids'] = sorted(scope['storefront_ids'])
+            if 'columns' in scope:
+                scope['columns'] = sorted(scope['columns'])
+            counts[json.dumps(scope, sort_keys=True)] += 1
+        return [(count, json.loads(key)) for key, count in counts.most_common(n)]
+
+usage_log = UsageLog()